@@ -5,3 +5,4 @@ admin.site.register(models.Administrador)
 admin.site.register(models.Configuracio)
 admin.site.register(models.Country)
 admin.site.register(models.CarbonIntensity)
+admin.site.register(models.VersionStamp)
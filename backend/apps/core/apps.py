@@ -5,3 +5,6 @@ class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.core'
     verbose_name = 'GAISSA Tools Core'
+
+    def ready(self):
+        from . import signals  # noqa: F401
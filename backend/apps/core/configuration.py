@@ -0,0 +1,29 @@
+"""
+Snapshot of the ``Configuracio`` singleton.
+
+It is read on every request (tool permission checks), so it is served from a per-process snapshot.
+Saving or deleting the configuration bumps its version stamp in the database (see signals.py): the
+process that saved it reloads it on its next read, and every other process after at most
+``CONFIGURATION_SNAPSHOT_TTL`` seconds.
+"""
+from django.conf import settings
+
+from apps.core.models import Configuracio
+from apps.core.snapshots import ProcessSnapshot
+
+
+def _load_configuracio():
+    return Configuracio.objects.first()
+
+
+configuracio_snapshot = ProcessSnapshot(
+    'core.configuracio', _load_configuracio, ttl=getattr(settings, 'CONFIGURATION_SNAPSHOT_TTL', 5),
+)
+
+
+def get_configuracio():
+    """
+    Current configuration (None if it has not been created yet).
+    The instance is shared by the whole process: read it, do not modify and save it.
+    """
+    return configuracio_snapshot.get()
@@ -0,0 +1,91 @@
+"""
+Sparse fieldsets shared by the GAISSA tools APIs.
+
+Clients can restrict the payload of list and detail endpoints with two query parameters:
+
+- ``?fields=id,nom`` renders only the listed top-level fields.
+- ``?expand=intervals`` controls which embedded (nested) payloads are rendered. When ``expand``
+  is given, embedded fields not listed are left out; when only ``fields`` is given, embedded
+  fields are rendered only if they are listed in either parameter.
+
+Without any of these parameters the full payload is rendered, so existing clients are not affected.
+Serializers declare their embedded fields in ``Meta.embedded_fields`` and views use the same
+fieldset to skip the ``select_related`` / ``prefetch_related`` of relations that will not be rendered.
+"""
+
+
+class SparseFieldset:
+    """Fields and embedded relations requested by the client."""
+
+    FIELDS_PARAM = 'fields'
+    EXPAND_PARAM = 'expand'
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = frozenset(fields) if fields is not None else None
+        self.expand = frozenset(expand) if expand is not None else None
+
+    @classmethod
+    def from_query_params(cls, query_params):
+        return cls(
+            fields=cls._parse(query_params.get(cls.FIELDS_PARAM)),
+            expand=cls._parse(query_params.get(cls.EXPAND_PARAM)),
+        )
+
+    @staticmethod
+    def _parse(value):
+        if value is None:
+            return None
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    @property
+    def is_default(self):
+        return self.fields is None and self.expand is None
+
+    def renders(self, name):
+        """Whether a plain (non embedded) field is rendered."""
+        return self.fields is None or name in self.fields
+
+    def embeds(self, name):
+        """Whether an embedded field is rendered."""
+        if self.is_default:
+            return True
+        return name in (self.expand or ()) or name in (self.fields or ())
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Drops the fields not requested in the ``sparse_fieldset`` of the serializer context.
+    Embedded fields are the ones listed in ``Meta.embedded_fields``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fieldset = self.context.get('sparse_fieldset')
+        if fieldset is None or fieldset.is_default:
+            return
+
+        embedded_fields = getattr(self.Meta, 'embedded_fields', ())
+        for name in list(self.fields):
+            rendered = fieldset.embeds(name) if name in embedded_fields else fieldset.renders(name)
+            if not rendered:
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """
+    Parses ``?fields=`` / ``?expand=`` for read actions and passes them to the serializer.
+    Views can check ``self.sparse_fieldset`` in ``get_queryset`` to avoid eager loading
+    relations that will not be rendered.
+    """
+    sparse_fieldset_actions = ('list', 'retrieve')
+
+    @property
+    def sparse_fieldset(self):
+        if getattr(self, 'action', None) not in self.sparse_fieldset_actions:
+            return SparseFieldset()
+        return SparseFieldset.from_query_params(self.request.query_params)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['sparse_fieldset'] = self.sparse_fieldset
+        return context
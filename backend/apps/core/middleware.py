@@ -0,0 +1,105 @@
+import re
+
+import brotli
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import compress_sequence, compress_string
+
+re_accepts_encoding = _lazy_re_compile(r'(?:^|,)\s*(?P<encoding>[a-z*]+)\s*(?:;\s*q\s*=\s*(?P<q>[0-9.]+))?', re.I)
+
+# Minimum size (in bytes) of the non streaming responses that get compressed
+DEFAULT_MIN_SIZE = 1024
+# Above quality 5 brotli costs much more CPU than what it saves in size
+DEFAULT_BROTLI_QUALITY = 5
+
+
+def accepted_encodings(accept_encoding):
+    """Encodings accepted by the client (the ones with q=0 are excluded)."""
+    encodings = set()
+    for match in re_accepts_encoding.finditer(accept_encoding):
+        try:
+            q = float(match['q']) if match['q'] else 1.0
+        except ValueError:
+            continue
+        if q > 0:
+            encodings.add(match['encoding'].lower())
+    return encodings
+
+
+def brotli_compress_sequence(sequence, quality):
+    # Each chunk is flushed, like compress_sequence does with gzip, so the client can decode what has
+    # been sent so far instead of waiting for the compressor to fill its window
+    compressor = brotli.Compressor(quality=quality)
+    for item in sequence:
+        data = compressor.process(item) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compresses the responses with brotli or gzip, depending on the Accept-Encoding of the client
+    (brotli is preferred when both are accepted).
+
+    Same behaviour as django.middleware.gzip.GZipMiddleware, but:
+    - Responses smaller than COMPRESSION_MIN_SIZE are sent uncompressed.
+    - Streaming responses are compressed chunk by chunk, without buffering the whole body.
+    """
+    max_random_bytes = 100
+
+    def process_response(self, request, response):
+        # It's not worth attempting to compress really short responses.
+        if not response.streaming and len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE):
+            return response
+
+        # Avoid gzipping if we've already got a content-encoding.
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encodings = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if 'br' in encodings:
+            encoding = 'br'
+        elif 'gzip' in encodings:
+            encoding = 'gzip'
+        else:
+            return response
+
+        quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY)
+        if response.streaming:
+            if response.is_async:
+                # Async streaming bodies are left uncompressed (no async brotli compressor).
+                return response
+            if encoding == 'br':
+                response.streaming_content = brotli_compress_sequence(response.streaming_content, quality)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=self.max_random_bytes,
+                )
+            # Delete the `Content-Length` header for streaming content, because
+            # we won't know the compressed size until we stream it.
+            del response.headers['Content-Length']
+        else:
+            if encoding == 'br':
+                compressed_content = brotli.compress(response.content, quality=quality)
+            else:
+                compressed_content = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+            # Return the compressed content only if it's actually shorter.
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # If there is a strong ETag, make it weak to fulfill the requirements
+        # of RFC 9110 Section 8.8.1 while also allowing conditional request
+        # matches on ETags.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+
+        return response
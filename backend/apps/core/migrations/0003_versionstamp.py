@@ -0,0 +1,24 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_country_country_code_alter_country_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionStamp',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Name')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Version')),
+            ],
+            options={
+                'verbose_name': 'Version Stamp',
+                'verbose_name_plural': 'Version Stamps',
+            },
+        ),
+    ]
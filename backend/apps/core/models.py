@@ -57,3 +57,18 @@ class CarbonIntensity(models.Model):
         
     def __str__(self):
         return f"{self.country.name} - {self.data_year}: {self.carbon_intensity} kgCO2/kWh"
+
+
+class VersionStamp(models.Model):
+    """
+    Named counter bumped on every write to a group of models (see apps/core/versioning.py)
+    """
+    name = models.CharField(max_length=100, primary_key=True, verbose_name=_('Name'))
+    version = models.PositiveBigIntegerField(default=0, verbose_name=_('Version'))
+
+    class Meta:
+        verbose_name = _('Version Stamp')
+        verbose_name_plural = _('Version Stamps')
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
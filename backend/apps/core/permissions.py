@@ -1,6 +1,6 @@
 from rest_framework import permissions
 from django.core.exceptions import ObjectDoesNotExist
-from apps.core.models import Configuracio
+from apps.core.configuration import get_configuracio
 
 
 class IsAuthenticated(permissions.IsAuthenticated):
@@ -36,10 +36,13 @@ class IsToolEnabled(permissions.BasePermission):
     
     def has_permission(self, request, view):
         try:
-            config = Configuracio.objects.get()
+            # Served from the per-process configuration snapshot (no query on the request path)
+            config = get_configuracio()
+            if config is None:
+                return True  # Default to enabled if config doesn't exist
             return getattr(config, self.tool_setting, True)  # Default to True if tool setting doesn't exist
         except Exception:
-            return True  # Default to enabled if config doesn't exist
+            return True
 
 
 class IsGAISSAROIAnalyzerEnabled(IsToolEnabled):
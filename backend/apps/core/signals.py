@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.configuration import configuracio_snapshot
+from apps.core.models import Configuracio
+
+
+@receiver(post_save, sender=Configuracio)
+@receiver(post_delete, sender=Configuracio)
+def configuracio_modificada(sender, **kwargs):
+    configuracio_snapshot.invalidate()
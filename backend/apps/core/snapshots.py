@@ -0,0 +1,57 @@
+import threading
+import time
+
+from django.db import transaction
+
+from apps.core.versioning import bump_version, get_version
+
+
+class ProcessSnapshot:
+    """
+    Value computed by ``loader`` and kept in memory by each process.
+
+    The value is served for ``ttl`` seconds without any check. Once the TTL expires, the ``VersionStamp``
+    named ``version_name`` (see versioning.py) is read from the database and the value is only reloaded if
+    the version changed since it was loaded. ``invalidate()`` bumps the version in the current transaction:
+    the current process reloads on its next read, and every other process after at most ``ttl`` seconds
+    once the transaction commits.
+    """
+
+    def __init__(self, version_name, loader, ttl=30):
+        self.version_name = version_name
+        self.loader = loader
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._version = None
+        self._loaded = False
+        self._checked_at = None
+
+    def get(self):
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at < self.ttl:
+            return self._value
+
+        with self._lock:
+            # The version is read before loading: a write committed in between is reloaded on the next check
+            version = get_version(self.version_name)
+            if not self._loaded or version != self._version:
+                self._value = self.loader()
+                self._version = version
+                self._loaded = True
+            self._checked_at = time.monotonic()
+            return self._value
+
+    def expire(self):
+        """Checks the version on the next read of this process, without waiting for the TTL."""
+        self._checked_at = None
+
+    def invalidate(self):
+        """
+        Marks the value as changed. The version is bumped in the current transaction, and this process
+        checks it on its next read and again once the transaction commits (other threads of the process
+        may have read the version from before the commit in between).
+        """
+        bump_version(self.version_name)
+        self.expire()
+        transaction.on_commit(self.expire)
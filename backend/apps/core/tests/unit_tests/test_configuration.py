@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from apps.core import snapshots
+from apps.core.configuration import configuracio_snapshot, get_configuracio
+from apps.core.models import Configuracio
+from apps.core.permissions import IsGAISSALabelEnabled
+from apps.core.snapshots import ProcessSnapshot
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class GAISSALabelView(APIView):
+    authentication_classes = []
+    permission_classes = [IsGAISSALabelEnabled]
+
+    def get(self, request):
+        return Response({})
+
+
+class ConfiguracioSnapshotTest(TestCase):
+    """Unit tests for the per-process snapshot of the configuration"""
+
+    def setUp(self):
+        self.configuracio = Configuracio.objects.create(ultimaSincronitzacio=timezone.now())
+        self.clock = Clock()
+        patcher = mock.patch.object(snapshots, 'time', SimpleNamespace(monotonic=self.clock))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_saving_process(self):
+        """Test that the process that saves the configuration reads the change right away"""
+        self.assertTrue(get_configuracio().gaissa_label_enabled)
+        with self.assertNumQueries(0):
+            get_configuracio()
+
+        self.configuracio.gaissa_label_enabled = False
+        self.configuracio.save()
+        self.assertFalse(get_configuracio().gaissa_label_enabled)
+
+        request = APIRequestFactory().get('/')
+        self.assertEqual(GAISSALabelView.as_view()(request).status_code, 403)
+
+    def test_other_process(self):
+        """Test that another process, with its own snapshot, sees the change once its TTL expires"""
+        # The snapshot of another process: same version stamp, its own value in memory
+        other_process = ProcessSnapshot(configuracio_snapshot.version_name, configuracio_snapshot.loader, ttl=5)
+        self.assertTrue(other_process.get().gaissa_label_enabled)
+
+        # Saved by this process
+        self.configuracio.gaissa_label_enabled = False
+        self.configuracio.save()
+        self.assertFalse(get_configuracio().gaissa_label_enabled)
+
+        # Within its TTL the other process does not check the version
+        self.clock.now += 4
+        with self.assertNumQueries(0):
+            self.assertTrue(other_process.get().gaissa_label_enabled)
+
+        self.clock.now += 2
+        self.assertFalse(other_process.get().gaissa_label_enabled)
+        # Once reloaded, only the version is checked when the TTL expires again
+        self.clock.now += 6
+        with self.assertNumQueries(1):
+            self.assertFalse(other_process.get().gaissa_label_enabled)
+
+    def test_deleted(self):
+        """Test that deleting the configuration is seen by the other processes"""
+        other_process = ProcessSnapshot(configuracio_snapshot.version_name, configuracio_snapshot.loader, ttl=5)
+        self.assertIsNotNone(other_process.get())
+        self.configuracio.delete()
+        self.clock.now += 6
+        self.assertIsNone(other_process.get())
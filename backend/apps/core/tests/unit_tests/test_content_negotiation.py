@@ -0,0 +1,150 @@
+import datetime
+import gzip
+import json
+from decimal import Decimal
+
+import brotli
+import msgpack
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from apps.core.middleware import CompressionMiddleware, accepted_encodings
+
+BODY = b'{"metrica": "accuracy", "valor": 0.95}\n' * 100
+CHUNKS = [b'model,accuracy\n'] + [f'model{i},0.{i:02d}\n'.encode() for i in range(50)]
+
+
+class EchoView(APIView):
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request):
+        return Response({
+            'nom': 'model',
+            'valor': Decimal('0.5'),
+            'data': datetime.date(2024, 1, 31),
+            'etiquetes': ['a', 'b'],
+        })
+
+    def post(self, request):
+        return Response(request.data)
+
+
+class CompressionMiddlewareTest(SimpleTestCase):
+    """Unit tests for the selection of brotli or gzip in CompressionMiddleware"""
+
+    def compress(self, response, accept_encoding):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response).process_response(request, response)
+
+    def test_accepted_encodings(self):
+        """Test that the encodings with q=0 are excluded"""
+        self.assertEqual(accepted_encodings('gzip, deflate, br'), {'gzip', 'deflate', 'br'})
+        self.assertEqual(accepted_encodings('br;q=0, gzip;q=0.5'), {'gzip'})
+        self.assertEqual(accepted_encodings(''), set())
+
+    def test_brotli_is_preferred(self):
+        """Test that brotli is used when the client accepts both brotli and gzip"""
+        response = self.compress(HttpResponse(BODY), 'gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), BODY)
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_gzip(self):
+        """Test that gzip is used when the client does not accept brotli"""
+        response = self.compress(HttpResponse(BODY), 'gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), BODY)
+
+    def test_not_compressed(self):
+        """Test that the response is left as is without an accepted encoding, or when it is small"""
+        response = self.compress(HttpResponse(BODY), 'identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, BODY)
+
+        response = self.compress(HttpResponse(BODY[:100]), 'br')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        with override_settings(COMPRESSION_MIN_SIZE=10):
+            response = self.compress(HttpResponse(BODY[:100]), 'br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_etag_is_weakened(self):
+        """Test that the strong ETag of a compressed response becomes weak"""
+        response = HttpResponse(BODY)
+        response['ETag'] = '"1-abc"'
+        self.assertEqual(self.compress(response, 'br')['ETag'], 'W/"1-abc"')
+
+    def test_streaming_brotli_is_flushed_per_chunk(self):
+        """Test that every streamed chunk can be decoded as soon as it is sent"""
+        response = self.compress(StreamingHttpResponse(iter(CHUNKS)), 'br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertFalse(response.has_header('Content-Length'))
+
+        decompressor = brotli.Decompressor()
+        received = b''
+        compressed = iter(response.streaming_content)
+        for i, chunk in enumerate(CHUNKS):
+            received += decompressor.process(next(compressed))
+            self.assertEqual(received, b''.join(CHUNKS[:i + 1]))
+        for data in compressed:
+            received += decompressor.process(data)
+        self.assertEqual(received, b''.join(CHUNKS))
+
+    def test_streaming_gzip(self):
+        """Test that a streaming response is compressed with gzip chunk by chunk"""
+        response = self.compress(StreamingHttpResponse(iter(CHUNKS)), 'gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+        compressed = list(response.streaming_content)
+        self.assertGreater(len(compressed), 1)
+        self.assertEqual(gzip.decompress(b''.join(compressed)), b''.join(CHUNKS))
+
+
+class MessagePackNegotiationTest(SimpleTestCase):
+    """Unit tests for the MessagePack renderer and parser"""
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = EchoView.as_view()
+
+    def test_json_by_default(self):
+        """Test that JSON is still rendered when MessagePack is not requested"""
+        response = self.view(self.factory.get('/', HTTP_ACCEPT='application/json'))
+        response.render()
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_accept_header(self):
+        """Test that MessagePack is rendered for Accept: application/msgpack, with the same payload as JSON"""
+        response = self.view(self.factory.get('/', HTTP_ACCEPT='application/msgpack'))
+        response.render()
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        json_response = self.view(self.factory.get('/', HTTP_ACCEPT='application/json'))
+        json_response.render()
+        self.assertEqual(msgpack.unpackb(response.content, raw=False), json.loads(json_response.content))
+
+    def test_format_parameter(self):
+        """Test that MessagePack is rendered for ?format=msgpack"""
+        response = self.view(self.factory.get('/', {'format': 'msgpack'}))
+        response.render()
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+
+    def test_request_body(self):
+        """Test that a MessagePack request body is parsed"""
+        data = {'nom': 'model', 'valors': [1, 2.5, None], 'binari': False}
+        request = self.factory.post(
+            '/', msgpack.packb(data), content_type='application/msgpack', HTTP_ACCEPT='application/msgpack',
+        )
+        response = self.view(request)
+        response.render()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(msgpack.unpackb(response.content, raw=False), data)
+
+    def test_invalid_request_body(self):
+        """Test that a body that is not MessagePack is rejected with 400"""
+        request = self.factory.post('/', b'\xc1', content_type='application/msgpack')
+        self.assertEqual(self.view(request).status_code, 400)
@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.test import TestCase
+
+from apps.core.models import VersionStamp
+from apps.core.versioning import bump_version, get_version
+
+
+class VersionStampTest(TestCase):
+    """Unit tests for the version stamps of the versioned endpoints and snapshots"""
+
+    def test_bump_version(self):
+        """Test that a stamp starts at 0 and grows on every bump"""
+        self.assertEqual(get_version('test'), 0)
+        bump_version('test')
+        first = get_version('test')
+        self.assertGreater(first, 0)
+        bump_version('test')
+        self.assertGreater(get_version('test'), first)
+        self.assertEqual(VersionStamp.objects.filter(name='test').count(), 1)
+        self.assertEqual(get_version('other'), 0)
+
+    def test_rolled_back_version_is_not_reused(self):
+        """Test that the version of a rolled back bump is not given again by the next bump"""
+        bump_version('test')
+        try:
+            with transaction.atomic():
+                bump_version('test')
+                rolled_back = get_version('test')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertLess(get_version('test'), rolled_back)
+
+        bump_version('test')
+        self.assertNotEqual(get_version('test'), rolled_back)
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.25 on 2026-10-19 17:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gaissalabel', '0009_qualificar_experiments'),
+        ('gaissa_roi_analyzer', '0004_alter_mltactic_pipeline_stage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roianalysis',
+            name='gaissalabel_model',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='gaissa_roi_analyses', to='gaissalabel.model', verbose_name='GAISSALabel Model'),
+        ),
+    ]
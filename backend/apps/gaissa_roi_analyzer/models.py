@@ -176,6 +176,8 @@ class ROIAnalysis(models.Model):
     model_architecture = models.ForeignKey(ModelArchitecture, related_name='roi_analyses', on_delete=models.PROTECT, verbose_name=_('Model Architecture'))
     tactic_parameter_option = models.ForeignKey(TacticParameterOption, related_name='roi_analyses', on_delete=models.PROTECT, verbose_name=_('Tactic Parameter Option'))
     country = models.ForeignKey('core.Country', on_delete=models.PROTECT, related_name='roi_analyses', verbose_name=_('Country of Deployment'), null=True)
+    # GAISSALabel model the analysis is about, if any (model architectures are not GAISSALabel models)
+    gaissalabel_model = models.ForeignKey('gaissalabel.Model', on_delete=models.SET_NULL, related_name='gaissa_roi_analyses', verbose_name=_('GAISSALabel Model'), null=True, blank=True)
 
     class Meta:
         verbose_name = _('ROI Analysis')
@@ -8,34 +8,36 @@ from .models import (
     AnalysisMetricValue, EnergyAnalysisMetricValue, ExpectedMetricReduction
 )
 from apps.core.models import Country
+from apps.gaissalabel.models import Model as GAISSALabelModel
+from apps.core.fieldsets import SparseFieldsetSerializerMixin
 from .calculators.roi_metrics_calculator import ROIMetricsCalculator
 
 
-class MLPipelineStageSerializer(serializers.ModelSerializer):
+class MLPipelineStageSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = MLPipelineStage
         fields = '__all__'
 
 
-class ModelArchitectureSerializer(serializers.ModelSerializer):
+class ModelArchitectureSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ModelArchitecture
         fields = '__all__'
 
 
-class TacticSourceSerializer(serializers.ModelSerializer):
+class TacticSourceSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = TacticSource
         fields = '__all__'
 
 
-class ROIMetricSerializer(serializers.ModelSerializer):
+class ROIMetricSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ROIMetric
         fields = '__all__'
 
 
-class MLTacticSerializer(serializers.ModelSerializer):
+class MLTacticSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     pipeline_stage_name = serializers.CharField(source='pipeline_stage.name', read_only=True)
     sources = TacticSourceSerializer(many=True, read_only=True)
     source_ids = serializers.PrimaryKeyRelatedField(
@@ -70,9 +72,10 @@ class MLTacticSerializer(serializers.ModelSerializer):
             'applicable_metrics', 'applicable_metric_ids',
             'compatible_architectures', 'compatible_architecture_ids'
         ]
+        embedded_fields = ('sources', 'applicable_metrics', 'compatible_architectures')
 
 
-class TacticParameterOptionSerializer(serializers.ModelSerializer):
+class TacticParameterOptionSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     tactic_name = serializers.CharField(source='tactic.name', read_only=True)
     pipeline_stage_name = serializers.CharField(source='tactic.pipeline_stage.name', read_only=True)
     tactic_id = serializers.PrimaryKeyRelatedField(
@@ -85,7 +88,7 @@ class TacticParameterOptionSerializer(serializers.ModelSerializer):
         read_only_fields = ['tactic'] # tactic is set via tactic_id
 
 
-class AnalysisMetricValueSerializer(serializers.ModelSerializer):
+class AnalysisMetricValueSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     metric_name = serializers.CharField(source='metric.name', read_only=True)
     metric_id = serializers.PrimaryKeyRelatedField(
         queryset=ROIMetric.objects.all(), write_only=True, source='metric'
@@ -97,7 +100,7 @@ class AnalysisMetricValueSerializer(serializers.ModelSerializer):
         read_only_fields = ['metric'] # metric is set via metric_id
 
 
-class EnergyAnalysisMetricValueSerializer(serializers.ModelSerializer):
+class EnergyAnalysisMetricValueSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     metric_name = serializers.CharField(source='metric.name', read_only=True)
     metric_id = serializers.PrimaryKeyRelatedField(
         queryset=ROIMetric.objects.all(), write_only=True, source='metric'
@@ -111,6 +114,7 @@ class EnergyAnalysisMetricValueSerializer(serializers.ModelSerializer):
         fields = ['id', 'analysis', 'metric', 'metric_id', 'metric_name', 'baselineValue', 
                  'energy_cost_rate', 'implementation_cost', 'cost_savings']
         read_only_fields = ['metric'] # metric is set via metric_id
+        embedded_fields = ('cost_savings',)
 
     def get_implementation_cost(self, obj):
         """Format implementation_cost to remove trailing zeros"""
@@ -144,7 +148,7 @@ class EnergyAnalysisMetricValueSerializer(serializers.ModelSerializer):
             return {'error': str(e)}
 
 
-class ROIAnalysisSerializer(serializers.ModelSerializer):
+class ROIAnalysisSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     model_architecture_name = serializers.CharField(source='model_architecture.name', read_only=True)
     tactic_parameter_option_details = TacticParameterOptionSerializer(source='tactic_parameter_option', read_only=True)
     metric_values = AnalysisMetricValueSerializer(many=True, read_only=True)
@@ -166,6 +170,9 @@ class ROIAnalysisSerializer(serializers.ModelSerializer):
     country_id = serializers.PrimaryKeyRelatedField(
         queryset=Country.objects.all(), write_only=True, source='country', required=False
     )
+    gaissalabel_model_id = serializers.PrimaryKeyRelatedField(
+        queryset=GAISSALabelModel.objects.all(), write_only=True, source='gaissalabel_model', required=False, allow_null=True
+    )
     # For creating metric values alongside analysis
     metric_values_data = serializers.ListField(
         child=serializers.DictField(), write_only=True, required=False
@@ -177,9 +184,10 @@ class ROIAnalysisSerializer(serializers.ModelSerializer):
             'id', 'model_architecture', 'model_architecture_id', 'model_architecture_name',
             'tactic_parameter_option', 'tactic_parameter_option_id', 'tactic_parameter_option_details',
             'metric_values', 'metric_values_data', 'metrics_analysis', 'dateRegistration', 'country', 
-            'country_id', 'source', 'analysis_type'
+            'country_id', 'source', 'analysis_type', 'gaissalabel_model', 'gaissalabel_model_id'
         ]
-        read_only_fields = ['model_architecture', 'tactic_parameter_option', 'country']
+        read_only_fields = ['model_architecture', 'tactic_parameter_option', 'country', 'gaissalabel_model']
+        embedded_fields = ('tactic_parameter_option_details', 'metric_values', 'metrics_analysis')
     
     def get_metrics_analysis(self, obj):
         # Get the num_inferences from the context if available, otherwise use default
@@ -370,7 +378,7 @@ class ROIAnalysisSerializer(serializers.ModelSerializer):
         return analysis
 
 
-class AnalysisListSerializer(serializers.ModelSerializer):
+class AnalysisListSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     A simplified return serializer for ROI Analysis list views.
     """
@@ -505,7 +513,7 @@ class ROIAnalysisResearchSerializer(ROIAnalysisSerializer):
         return analysis
 
 
-class ExpectedMetricReductionSerializer(serializers.ModelSerializer):
+class ExpectedMetricReductionSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     model_architecture_name = serializers.CharField(source='model_architecture.name', read_only=True)
     tactic_parameter_option_details = TacticParameterOptionSerializer(source='tactic_parameter_option', read_only=True)
     metric_name = serializers.CharField(source='metric.name', read_only=True)
@@ -529,3 +537,4 @@ class ExpectedMetricReductionSerializer(serializers.ModelSerializer):
             'metric', 'metric_id', 'metric_name', 'expectedReductionValue'
         ]
         read_only_fields = ['model_architecture', 'tactic_parameter_option', 'metric']
+        embedded_fields = ('tactic_parameter_option_details',)
@@ -4,6 +4,7 @@ from rest_framework.test import APITestCase
 from decimal import Decimal
 import json
 
+from apps.core.configuration import get_configuracio
 from apps.gaissa_roi_analyzer.models import *
 from .test_setup import TestGAISSAAPISetup
 
@@ -569,4 +570,52 @@ class ErrorHandlingAPITest(TestGAISSAAPISetup):
         invalid_data = {'name': ''}  # Empty name should fail
         response = self.client.post(url, invalid_data, format='json')
         
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class SparseFieldsetAPITest(APITestCase):
+    """Integration tests for ?fields= / ?expand= on list endpoints"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.stage = MLPipelineStage.objects.create(name="Training")
+        self.metric = ROIMetric.objects.create(name="Energy Consumption", unit="W", is_energy_related=True)
+        self.arch = ModelArchitecture.objects.create(name="ResNet50")
+        for name in ("Weight Pruning", "Quantization"):
+            tactic = MLTactic.objects.create(name=name, pipeline_stage=self.stage)
+            tactic.applicable_metrics.add(self.metric)
+            tactic.compatible_architectures.add(self.arch)
+
+    def test_fields_parameter_restricts_payload(self):
+        """Test GET /api/roi/tactics/?fields=id,name"""
+        url = reverse('roi_tactics-list')
+        response = self.client.get(url, {'fields': 'id,name'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        for tactic in response.data:
+            self.assertEqual(set(tactic.keys()), {'id', 'name'})
+
+    def test_excluded_relations_are_not_prefetched(self):
+        """Test that relations left out of the response are not queried"""
+        url = reverse('roi_tactics-list')
+
+        # The tool configuration check is served from the configuration snapshot once loaded
+        get_configuracio()
+
+        # Tactics list only
+        with self.assertNumQueries(1):
+            self.client.get(url, {'fields': 'id,name'})
+
+        # Tactics list + one prefetch per embedded relation
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+    def test_expand_parameter_keeps_listed_relations(self):
+        """Test GET /api/roi/tactics/?expand=applicable_metrics"""
+        url = reverse('roi_tactics-list')
+        response = self.client.get(url, {'expand': 'applicable_metrics'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('pipeline_stage_name', response.data[0])
+        self.assertEqual(response.data[0]['applicable_metrics'][0]['name'], 'Energy Consumption')
+        self.assertNotIn('sources', response.data[0])
@@ -6,6 +6,7 @@ from decimal import Decimal
 from apps.gaissa_roi_analyzer.models import *
 from apps.gaissa_roi_analyzer.serializers import *
 from apps.core.models import Country
+from apps.core.fieldsets import SparseFieldset
 
 # NOTE: Simple CRUD serializers are not tested here as they contain only basic field  
 # validation that is adequately covered by other tests.
@@ -765,4 +766,54 @@ class ROIAnalysisResearchSerializerTest(TestCase):
         }
         
         serializer = ROIAnalysisResearchSerializer(data=valid_data)
-        self.assertTrue(serializer.is_valid(), serializer.errors)
\ No newline at end of file
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+
+class SparseFieldsetSerializerTest(TestCase):
+    """Unit tests for ?fields= / ?expand= handling in the serializers"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.stage = MLPipelineStage.objects.create(name="Training")
+        self.source = TacticSource.objects.create(
+            title="Research Paper",
+            url="https://arxiv.org/abs/1111.2222"
+        )
+        self.metric = ROIMetric.objects.create(name="Energy Consumption", unit="W", is_energy_related=True)
+        self.arch = ModelArchitecture.objects.create(name="ResNet50")
+        self.tactic = MLTactic.objects.create(name="Weight Pruning", pipeline_stage=self.stage)
+        self.tactic.sources.add(self.source)
+        self.tactic.applicable_metrics.add(self.metric)
+        self.tactic.compatible_architectures.add(self.arch)
+
+    def serialize(self, fieldset=None):
+        context = {'sparse_fieldset': fieldset} if fieldset else {}
+        return MLTacticSerializer(self.tactic, context=context).data
+
+    def test_default_fieldset_renders_everything(self):
+        """Test that without parameters the full payload is rendered"""
+        data = self.serialize(SparseFieldset())
+        self.assertEqual(data, self.serialize())
+
+    def test_fields_restricts_top_level_fields(self):
+        """Test that ?fields= keeps only the listed fields and drops embedded ones"""
+        data = self.serialize(SparseFieldset(fields=['id', 'name']))
+        self.assertEqual(set(data.keys()), {'id', 'name'})
+
+    def test_expand_controls_embedded_fields(self):
+        """Test that ?expand= keeps plain fields and only the listed embedded ones"""
+        data = self.serialize(SparseFieldset(expand=['sources']))
+        self.assertIn('pipeline_stage_name', data)
+        self.assertEqual(len(data['sources']), 1)
+        self.assertNotIn('applicable_metrics', data)
+        self.assertNotIn('compatible_architectures', data)
+
+    def test_fields_and_expand_combined(self):
+        """Test that embedded fields listed in ?expand= are added to a sparse ?fields= selection"""
+        data = self.serialize(SparseFieldset(fields=['id'], expand=['applicable_metrics']))
+        self.assertEqual(set(data.keys()), {'id', 'applicable_metrics'})
+
+    def test_many_serializer_applies_fieldset_to_children(self):
+        """Test that the fieldset is applied to every item of a list"""
+        context = {'sparse_fieldset': SparseFieldset(fields=['name'])}
+        data = MLTacticSerializer(MLTactic.objects.all(), many=True, context=context).data
+        self.assertEqual(data, [{'name': 'Weight Pruning'}])
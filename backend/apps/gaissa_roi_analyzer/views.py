@@ -16,9 +16,10 @@ from .serializers import (
     ExpectedMetricReductionSerializer
 )
 from apps.core import permissions
+from apps.core.fieldsets import SparseFieldsetViewMixin
 
 
-class MLPipelineStageView(viewsets.ModelViewSet):
+class MLPipelineStageView(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for ML pipeline stages."""
     queryset = MLPipelineStage.objects.all()
     serializer_class = MLPipelineStageSerializer
@@ -30,7 +31,7 @@ class MLPipelineStageView(viewsets.ModelViewSet):
     ordering = ['id']
 
 
-class ModelArchitectureView(viewsets.ModelViewSet):
+class ModelArchitectureView(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for ML model architectures in ROI analysis."""
     queryset = ModelArchitecture.objects.all()
     serializer_class = ModelArchitectureSerializer
@@ -81,7 +82,7 @@ class ModelArchitectureView(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class TacticSourceView(viewsets.ModelViewSet):
+class TacticSourceView(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for tactic sources/references."""
     queryset = TacticSource.objects.all()
     serializer_class = TacticSourceSerializer
@@ -93,7 +94,7 @@ class TacticSourceView(viewsets.ModelViewSet):
     ordering = ['id']
 
 
-class MLTacticView(viewsets.ModelViewSet):
+class MLTacticView(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for ML optimization tactics."""
     queryset = MLTactic.objects.all()
     serializer_class = MLTacticSerializer
@@ -109,12 +110,15 @@ class MLTacticView(viewsets.ModelViewSet):
         queryset = super().get_queryset()
         
         # Optimize: Use select_related for ForeignKey and prefetch_related for ManyToMany
+        # Relations left out of the response by the client are not loaded
         if self.action in ['list', 'retrieve']:
-            queryset = queryset.select_related('pipeline_stage').prefetch_related(
-                'sources',
-                'applicable_metrics',
-                'compatible_architectures'
-            )
+            fieldset = self.sparse_fieldset
+            if fieldset.renders('pipeline_stage_name'):
+                queryset = queryset.select_related('pipeline_stage')
+            queryset = queryset.prefetch_related(*[
+                relation for relation in ('sources', 'applicable_metrics', 'compatible_architectures')
+                if fieldset.embeds(relation)
+            ])
         
         analysis_type = self.request.query_params.get('analysis_type')
         if analysis_type:
@@ -166,7 +170,7 @@ class MLTacticView(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class TacticParameterOptionView(viewsets.ModelViewSet):
+class TacticParameterOptionView(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for tactic parameter options."""
     queryset = TacticParameterOption.objects.all()
     serializer_class = TacticParameterOptionSerializer
@@ -182,7 +186,9 @@ class TacticParameterOptionView(viewsets.ModelViewSet):
         
         # Optimize: Use select_related for nested ForeignKeys (tactic and pipeline_stage)
         if self.action in ['list', 'retrieve']:
-            queryset = queryset.select_related('tactic', 'tactic__pipeline_stage')
+            fieldset = self.sparse_fieldset
+            if fieldset.renders('tactic_name') or fieldset.renders('pipeline_stage_name'):
+                queryset = queryset.select_related('tactic', 'tactic__pipeline_stage')
         
         tactic_id = self.kwargs.get('tactic_id')
         
@@ -227,7 +233,7 @@ class TacticParameterOptionView(viewsets.ModelViewSet):
         return queryset
 
 
-class ROIMetricView(viewsets.ModelViewSet):
+class ROIMetricView(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for ROI metrics."""
     queryset = ROIMetric.objects.all()
     serializer_class = ROIMetricSerializer
@@ -239,7 +245,7 @@ class ROIMetricView(viewsets.ModelViewSet):
     ordering = ['id']
 
 
-class ROIAnalysisViewSet(viewsets.ModelViewSet):
+class ROIAnalysisViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for ROI analyses."""
     queryset = ROIAnalysis.objects.all().order_by('-roianalysiscalculation__dateRegistration', '-id')
     
@@ -258,21 +264,28 @@ class ROIAnalysisViewSet(viewsets.ModelViewSet):
         
         # Optimize: Eagerly load all related data to avoid N+1 queries
         if self.action in ['list', 'retrieve']:
+            fieldset = self.sparse_fieldset
+
             # Use select_related for ForeignKey and OneToOne relationships
-            queryset = queryset.select_related(
-                'model_architecture',
-                'tactic_parameter_option',
-                'tactic_parameter_option__tactic',
-                'tactic_parameter_option__tactic__pipeline_stage',
-                'country',
-                'roianalysiscalculation',
-                'roianalysisresearch',
-                'roianalysisresearch__source'
-            )
+            # The subclass relations are always needed to resolve the analysis type
+            queryset = queryset.select_related('roianalysiscalculation', 'roianalysisresearch')
+            if fieldset.renders('model_architecture_name'):
+                queryset = queryset.select_related('model_architecture')
+            if any(fieldset.renders(name) for name in ('tactic_name', 'parameter_name', 'parameter_value')) \
+                    or fieldset.embeds('tactic_parameter_option_details'):
+                queryset = queryset.select_related(
+                    'tactic_parameter_option',
+                    'tactic_parameter_option__tactic',
+                    'tactic_parameter_option__tactic__pipeline_stage',
+                )
+            if fieldset.renders('country'):
+                queryset = queryset.select_related('country')
+            if fieldset.renders('source'):
+                queryset = queryset.select_related('roianalysisresearch__source')
             
             # Only prefetch metric_values for detail view (retrieve action)
             # AnalysisListSerializer doesn't use metric_values
-            if self.action == 'retrieve':
+            if self.action == 'retrieve' and fieldset.embeds('metric_values'):
                 queryset = queryset.prefetch_related(
                     'metric_values',
                     'metric_values__metric',
@@ -364,7 +377,7 @@ class ROIAnalysisViewSet(viewsets.ModelViewSet):
         return context
 
 
-class AnalysisMetricValueView(viewsets.ModelViewSet):
+class AnalysisMetricValueView(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for analysis metric values."""
     queryset = AnalysisMetricValue.objects.all()
     serializer_class = AnalysisMetricValueSerializer
@@ -377,12 +390,12 @@ class AnalysisMetricValueView(viewsets.ModelViewSet):
     def get_queryset(self):
         """Optimize queryset with select_related for related objects."""
         queryset = super().get_queryset()
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve'] and self.sparse_fieldset.renders('metric_name'):
             queryset = queryset.select_related('metric')
         return queryset
 
 
-class EnergyAnalysisMetricValueView(viewsets.ModelViewSet):
+class EnergyAnalysisMetricValueView(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for energy analysis metric values."""
     queryset = EnergyAnalysisMetricValue.objects.all()
     serializer_class = EnergyAnalysisMetricValueSerializer
@@ -396,13 +409,17 @@ class EnergyAnalysisMetricValueView(viewsets.ModelViewSet):
         """Optimize queryset with select_related for related objects."""
         queryset = super().get_queryset()
         if self.action in ['list', 'retrieve']:
-            # Include nested relationships for the analysis
-            queryset = queryset.select_related(
-                'analysis',
-                'analysis__model_architecture',
-                'analysis__tactic_parameter_option',
-                'metric'
-            )
+            fieldset = self.sparse_fieldset
+            if fieldset.renders('metric_name'):
+                queryset = queryset.select_related('metric')
+            # Include nested relationships for the analysis (only used to compute cost savings)
+            if fieldset.embeds('cost_savings'):
+                queryset = queryset.select_related(
+                    'analysis',
+                    'analysis__model_architecture',
+                    'analysis__tactic_parameter_option',
+                    'metric'
+                )
         return queryset
     
     def get_serializer_context(self):
@@ -419,7 +436,7 @@ class EnergyAnalysisMetricValueView(viewsets.ModelViewSet):
         return context
 
 
-class ExpectedMetricReductionView(viewsets.ModelViewSet):
+class ExpectedMetricReductionView(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for expected metric reductions."""
     queryset = ExpectedMetricReduction.objects.all()
     serializer_class = ExpectedMetricReductionSerializer
@@ -433,12 +450,16 @@ class ExpectedMetricReductionView(viewsets.ModelViewSet):
         """Optimize queryset with select_related for related objects."""
         queryset = super().get_queryset()
         if self.action in ['list', 'retrieve']:
-            queryset = queryset.select_related(
-                'model_architecture',
-                'tactic_parameter_option',
-                'tactic_parameter_option__tactic',  # For tactic_name in nested serializer
-                'metric'
-            )
+            fieldset = self.sparse_fieldset
+            if fieldset.renders('model_architecture_name'):
+                queryset = queryset.select_related('model_architecture')
+            if fieldset.embeds('tactic_parameter_option_details'):
+                queryset = queryset.select_related(
+                    'tactic_parameter_option',
+                    'tactic_parameter_option__tactic',  # For tactic_name in nested serializer
+                )
+            if fieldset.renders('metric_name'):
+                queryset = queryset.select_related('metric')
         return queryset
 
 
@@ -1,12 +1,29 @@
 from django.contrib import admin
-from . import models
+from . import cataleg, models
+
+
+class CatalegAdmin(admin.ModelAdmin):
+    """Admin of the catalogue rows that rate the experiments: each edit recomputes the ratings once."""
+
+    def save_model(self, request, obj, form, change):
+        with cataleg.modificacio():
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with cataleg.modificacio():
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with cataleg.modificacio():
+            super().delete_queryset(request, queryset)
+
 
 admin.site.register(models.Model)
 admin.site.register(models.Entrenament)
 admin.site.register(models.Inferencia)
-admin.site.register(models.Metrica)
-admin.site.register(models.Qualificacio)
-admin.site.register(models.Interval)
+admin.site.register(models.Metrica, CatalegAdmin)
+admin.site.register(models.Qualificacio, CatalegAdmin)
+admin.site.register(models.Interval, CatalegAdmin)
 admin.site.register(models.ResultatEntrenament)
 admin.site.register(models.ResultatInferencia)
 admin.site.register(models.InfoAddicional)
@@ -15,3 +32,5 @@ admin.site.register(models.ValorInfoInferencia)
 admin.site.register(models.EinaCalcul)
 admin.site.register(models.TransformacioMetrica)
 admin.site.register(models.TransformacioInformacio)
+admin.site.register(models.Estadistica)
+admin.site.register(models.MesuraInferencia)
@@ -5,3 +5,6 @@ class GAISSALabelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.gaissalabel'
     verbose_name = 'GAISSALabel'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,108 @@
+"""
+Adaptive repetition of energy measurements.
+
+A single measurement is noisy and a fixed large number of repetitions wastes time on stable endpoints.
+After some warm-up rounds (discarded), measurements are taken in batches until the Student's t confidence
+interval of the energy per inference is narrow enough (relative to its mean), the time budget runs out or
+the maximum number of samples is reached.
+"""
+import math
+import time
+
+import numpy as np
+from scipy import stats
+
+STOP_CONVERGED = 'convergencia'
+STOP_TIME = 'temps'
+STOP_SAMPLES = 'mostres'
+STOP_CANCELLED = 'cancellacio'
+
+
+class RepetitionPolicy:
+    """
+    Args:
+    warmup : measurements run first and discarded
+    batch : measurements between two checks of the interval
+    relative_width : target width of the interval (upper - lower) relative to the mean
+    confidence : confidence level of the interval
+    time_budget : seconds after which no more measurements are started (warm-up included)
+    min_samples / max_samples : bounds of the number of samples
+    """
+
+    def __init__(self, warmup=1, batch=3, relative_width=0.1, confidence=0.95, time_budget=300,
+                 min_samples=3, max_samples=30):
+        self.warmup = warmup
+        self.batch = batch
+        self.relative_width = relative_width
+        self.confidence = confidence
+        self.time_budget = time_budget
+        self.min_samples = max(min_samples, 2)
+        self.max_samples = max(max_samples, self.min_samples)
+
+
+def confidence_interval(samples, confidence):
+    """Mean and lower / upper bounds of the t confidence interval of the samples (at least 2)."""
+    samples = np.asarray(samples, dtype=float)
+    mean = samples.mean()
+    half_width = stats.t.ppf((1 + confidence) / 2, len(samples) - 1) * samples.std(ddof=1) / math.sqrt(len(samples))
+    return float(mean), float(mean - half_width), float(mean + half_width)
+
+
+def relative_width(mean, lower, upper):
+    if upper == lower:
+        return 0.0
+    return (upper - lower) / abs(mean) if mean else math.inf
+
+
+def repeat_until_stable(measure, policy, cancelled=None, clock=time.monotonic):
+    """
+    Runs ``measure(warmup)`` (which returns the energy per inference of one measurement) following the policy.
+    ``cancelled`` (optional) is checked before every measurement. Returns the report of the estimate.
+    """
+    start = clock()
+
+    def stop_reason(samples):
+        if cancelled is not None and cancelled():
+            return STOP_CANCELLED
+        if clock() - start >= policy.time_budget:
+            return STOP_TIME
+        if len(samples) >= policy.max_samples:
+            return STOP_SAMPLES
+        return None
+
+    samples = []
+    for _ in range(policy.warmup):
+        reason = stop_reason(samples)
+        if reason:
+            break
+        measure(True)
+    else:
+        reason = None
+
+    while reason is None:
+        for _ in range(policy.batch):
+            reason = stop_reason(samples)
+            if reason:
+                break
+            samples.append(measure(False))
+        if reason is None and len(samples) >= policy.min_samples:
+            if relative_width(*confidence_interval(samples, policy.confidence)) <= policy.relative_width:
+                reason = STOP_CONVERGED
+
+    report = {
+        'estimacio': None,
+        'limitInferior': None,
+        'limitSuperior': None,
+        'ampladaRelativa': None,
+        'confianca': policy.confidence,
+        'numMostres': len(samples),
+        'motiuAturada': reason,
+        'durada': clock() - start,
+    }
+    if len(samples) >= 2:
+        mean, lower, upper = confidence_interval(samples, policy.confidence)
+        report.update(estimacio=mean, limitInferior=lower, limitSuperior=upper,
+                      ampladaRelativa=relative_width(mean, lower, upper))
+    elif samples:
+        report['estimacio'] = float(samples[0])
+    return report
@@ -1,42 +1,149 @@
+import time
+
 import requests
-import csv
 from codecarbon import OfflineEmissionsTracker
 
-output_dir = '.'
-output_file = 'emissions.csv'
+from .adaptive_repetition import repeat_until_stable
+from .interleaved_comparison import compare_interleaved
+from .load_generator import LoadResult, generate_load
 
 
-def query(endpoint, payload):
-    response = requests.post(endpoint, json=payload)
+def query(endpoint, payload, timeout=None):
+    response = requests.post(endpoint, json=payload, timeout=timeout)
     print(payload)
     print(response.status_code)
     return response.json()
 
 
-def get_efficiency_results(endpoint, data, transformacions):
-    # Definir tracker i realitzar la query
+def measure(funcio):
+    # Mesura les emissions mentre s'executa la funció. Retorna els valors de CodeCarbon i el resultat de la funció.
+    # (sense fitxer: les dades de cada mesura es queden en memòria, aïllades de les altres mesures)
     tracker = OfflineEmissionsTracker(
         country_iso_code="CAN",
-        output_file=output_file,
-        output_dir=output_dir,
+        save_to_file=False,
     )
-    payload = {
-        "input_text": data,
-    }
     tracker.start()
-    print(query(endpoint, payload))
-    tracker.stop()
+    try:
+        resultat = funcio()
+    finally:
+        tracker.stop()
+
+    # Recuperar resultats de la mesura (el tracker no llença excepcions en aturar-se)
+    dades = getattr(tracker, 'final_emissions_data', None)
+    if dades is None:
+        raise RuntimeError("No s'han pogut obtenir les dades de CodeCarbon")
+    return dades.values, resultat
 
-    # Recuperar resultats (transformant-los de CSV a array de JSONs)
-    dataCSV = []
-    with open(output_dir + '/' + output_file, 'r') as csv_file:
-        csv_reader = csv.DictReader(csv_file)
-        for row in csv_reader:
-            dataCSV.append(row)
 
-    # Transformar valors a mètriques de l'aplicació i retornar resultats
+def transform_results(valors, transformacions):
+    # Transformar valors a mètriques de l'aplicació
     resultats = {}
     for (metrica, transformacio) in transformacions.items():
-        resultats[metrica] = dataCSV[-1].get(transformacio)
+        resultats[metrica] = valors.get(transformacio)
+    return resultats
+
+
+def get_efficiency_results(endpoint, data, transformacions, timeout=None):
+    # Mesura d'una sola petició a l'endpoint
+    payload = {
+        "input_text": data,
+    }
+    valors, resposta = measure(lambda: query(endpoint, payload, timeout))
+    print(resposta)
+    return transform_results(valors, transformacions)
+
+
+def get_load_efficiency_results(endpoint, data, transformacions, profile, timeout=None):
+    # Mesura de l'endpoint sota càrrega (veure load_generator.py). Retorna els resultats i l'informe de la càrrega.
+    payload = {
+        "input_text": data,
+    }
+    valors, carrega = measure(lambda: generate_load(endpoint, payload, profile, timeout))
+    if not carrega.successes:
+        raise RuntimeError("Cap de les peticions a l'endpoint ha tingut èxit")
+    informe = carrega.report(energy=valors.get('energy_consumed'), emissions=valors.get('emissions'))
+    return transform_results(valors, transformacions), informe
+
 
+def mean_results(llista_resultats):
+    # Mitjana de cada mètrica sobre diverses mesures (els valors no numèrics es prenen de l'última)
+    resultats = {}
+    for metrica in llista_resultats[-1]:
+        valors = [r[metrica] for r in llista_resultats if isinstance(r.get(metrica), (int, float))]
+        resultats[metrica] = sum(valors) / len(valors) if valors else llista_resultats[-1][metrica]
     return resultats
+
+
+def get_repeated_efficiency_results(endpoint, data, transformacions, policy, profile=None, timeout=None, cancelled=None):
+    # Mesures repetides fins que l'interval de confiança de l'energia per inferència és prou estret
+    # (veure adaptive_repetition.py). Cada mesura és una sola petició o, amb perfil, una càrrega.
+    # Retorna la mitjana dels resultats, l'informe de la càrrega (de totes les mesures) i el de les repeticions.
+    payload = {
+        "input_text": data,
+    }
+    mostres = []  # (valors de CodeCarbon, càrrega) de les mesures que no són d'escalfament
+
+    def measure_once(escalfament):
+        if profile is not None:
+            valors, carrega = measure(lambda: generate_load(endpoint, payload, profile, timeout))
+            inferencies = carrega.successes
+        else:
+            valors, resposta = measure(lambda: query(endpoint, payload, timeout))
+            carrega = None
+            inferencies = 1
+        if not inferencies:
+            raise RuntimeError("Cap de les peticions a l'endpoint ha tingut èxit")
+        if not escalfament:
+            mostres.append((valors, carrega))
+        return (valors.get('energy_consumed') or 0) / inferencies
+
+    informeRepeticions = repeat_until_stable(measure_once, policy, cancelled=cancelled)
+    if not mostres:
+        raise RuntimeError("No s'ha pogut fer cap mesura dins del temps disponible")
+
+    resultats = mean_results([transform_results(valors, transformacions) for valors, carrega in mostres])
+    informeCarrega = None
+    if profile is not None:
+        informeCarrega = LoadResult.combine([carrega for valors, carrega in mostres]).report(
+            energy=sum(valors.get('energy_consumed') or 0 for valors, carrega in mostres),
+            emissions=sum(valors.get('emissions') or 0 for valors, carrega in mostres),
+        )
+    return resultats, informeCarrega, informeRepeticions
+
+
+def get_compared_efficiency_results(endpoints, data, transformacions, rounds, warmup=0, profile=None, timeout=None,
+                                    cancelled=None):
+    # Mesura dels endpoints en rondes intercalades amb la mateixa entrada (veure interleaved_comparison.py).
+    # El primer és la base. Cada mesura és una sola petició o, amb perfil, una càrrega.
+    # Retorna els resultats mitjans de la base i l'informe de la comparació (energia en J per inferència)
+    payload = {
+        "input_text": data,
+    }
+    mostres = [[] for _ in endpoints]  # Resultats de les mesures que no són d'escalfament, per endpoint
+
+    def measure_once(index, escalfament):
+        if profile is not None:
+            valors, carrega = measure(lambda: generate_load(endpoints[index], payload, profile, timeout))
+            inferencies = carrega.successes
+            latencia = sum(carrega.latencies) / inferencies if inferencies else None
+        else:
+            def timed_query():
+                inici = time.perf_counter()
+                query(endpoints[index], payload, timeout)
+                return time.perf_counter() - inici
+            valors, latencia = measure(timed_query)
+            inferencies = 1
+        if not inferencies:
+            raise RuntimeError(f"Cap de les peticions a l'endpoint {endpoints[index]} ha tingut èxit")
+        if not escalfament:
+            mostres[index].append(transform_results(valors, transformacions))
+        # kWh -> J, la unitat dels valors base de l'analitzador de ROI
+        return (valors.get('energy_consumed') or 0) * 3600000 / inferencies, latencia
+
+    informe = compare_interleaved(measure_once, len(endpoints), rounds, warmup=warmup, cancelled=cancelled)
+    if not informe['numRondes']:
+        raise RuntimeError("No s'ha pogut completar cap ronda de mesures")
+    for endpoint, resultats_endpoint, informe_endpoint in zip(endpoints, mostres, informe['endpoints']):
+        informe_endpoint['endpoint'] = endpoint
+        informe_endpoint['resultats'] = mean_results(resultats_endpoint[:informe['numRondes']])
+    return informe['endpoints'][0]['resultats'], informe
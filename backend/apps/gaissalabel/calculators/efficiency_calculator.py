@@ -1,11 +1,43 @@
-from .calculator_codecarbon_adapter import get_efficiency_results
-from ..models import TransformacioMetrica
+from .calculator_codecarbon_adapter import (
+    get_efficiency_results, get_load_efficiency_results, get_repeated_efficiency_results,
+    get_compared_efficiency_results
+)
+from ..cataleg import mapatge_eina
+from ..models import Metrica
 
 
-def calculateEfficiency(endpoint, data):
-    # Agafem les transformacions de les mètriques x CodeCarbon
-    transformacions_objs = TransformacioMetrica.objects.filter(eina__nom='CodeCarbon')
-    transformacions = {transf.metrica.id: transf.valor for transf in transformacions_objs}
+def _transformacions():
+    # Transformacions de les mètriques d'inferència x CodeCarbon (compilades i en memòria, sense consultes)
+    mapatge = mapatge_eina('CodeCarbon', Metrica.INF)
+    return mapatge.columnes_metriques if mapatge else {}
+
+
+def calculateEfficiency(endpoint, data, timeout=None):
+    transformacions = _transformacions()
 
     # Fem servir el generador de resultats d'eficiència basat en CodeCarbon
-    return get_efficiency_results(endpoint, data, transformacions)
+    # (timeout: segons màxims de la petició a l'endpoint)
+    return get_efficiency_results(endpoint, data, transformacions, timeout)
+
+
+def calculateLoadEfficiency(endpoint, data, profile, timeout=None):
+    # Com calculateEfficiency, però amb l'endpoint sota la càrrega del perfil (LoadProfile)
+    # Retorna els resultats i l'informe de la càrrega (rendiment, latències i energia per petició)
+    return get_load_efficiency_results(endpoint, data, _transformacions(), profile, timeout)
+
+
+def calculateRepeatedEfficiency(endpoint, data, policy, profile=None, timeout=None, cancelled=None):
+    # Mesures repetides (d'una petició o de la càrrega del perfil) fins que l'energia per inferència és estable
+    # Retorna els resultats mitjans, l'informe de la càrrega (o None) i l'informe de les repeticions
+    return get_repeated_efficiency_results(
+        endpoint, data, _transformacions(), policy, profile=profile, timeout=timeout, cancelled=cancelled
+    )
+
+
+def calculateComparedEfficiency(endpoints, data, rounds, warmup=0, profile=None, timeout=None, cancelled=None):
+    # Comparació A/B: els endpoints (el primer és la base) es mesuren en rondes intercalades
+    # Retorna els resultats mitjans de la base i l'informe de la comparació (energia, latència i reducció)
+    return get_compared_efficiency_results(
+        endpoints, data, _transformacions(), rounds, warmup=warmup, profile=profile, timeout=timeout,
+        cancelled=cancelled,
+    )
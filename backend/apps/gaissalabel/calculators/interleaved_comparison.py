@@ -0,0 +1,86 @@
+"""
+Interleaved comparison of the energy efficiency of several endpoints (A/B).
+
+Measuring a baseline and an optimized endpoint one after the other skews the result with thermal drift and
+background load. Here they are measured in rounds with the same payload, each round measuring every endpoint
+once and starting with a different one (AB, BA, ...), so the drift affects all of them alike. Each round
+gives a paired sample, from which the energy reduction of every endpoint against the first (the baseline)
+is estimated with its confidence interval.
+"""
+from .adaptive_repetition import STOP_CANCELLED, confidence_interval
+
+
+def round_order(round_index, count):
+    """Order in which the endpoints (indexes) are measured in a round: rotated every round."""
+    return [(round_index + position) % count for position in range(count)]
+
+
+def estimate(samples, confidence):
+    """Mean of the samples, with its confidence interval when there are at least 2."""
+    estimacio = {'estimacio': None, 'limitInferior': None, 'limitSuperior': None}
+    if len(samples) >= 2:
+        mean, lower, upper = confidence_interval(samples, confidence)
+        estimacio.update(estimacio=mean, limitInferior=lower, limitSuperior=upper)
+    elif samples:
+        estimacio['estimacio'] = float(samples[0])
+    return estimacio
+
+
+def _reduction(value, baseline):
+    if value is None or not baseline:
+        return None
+    return 1 - value / baseline
+
+
+def compare_interleaved(measure, count, rounds, warmup=0, confidence=0.95, cancelled=None):
+    """
+    Runs ``measure(index, warmup)`` for the ``count`` endpoints in ``rounds`` interleaved rounds (after
+    ``warmup`` discarded ones). ``measure`` returns the energy and the latency per inference of one
+    measurement of the endpoint. ``cancelled`` (optional) is checked before every measurement; only complete
+    rounds are used, so the samples stay paired. Returns the report of the comparison.
+    """
+    energies = [[] for _ in range(count)]
+    latencies = [[] for _ in range(count)]
+    reason = None
+    for round_index in range(warmup + rounds):
+        mesures = {}
+        for index in round_order(round_index, count):
+            if cancelled is not None and cancelled():
+                reason = STOP_CANCELLED
+                break
+            mesures[index] = measure(index, round_index < warmup)
+        if reason:
+            break
+        if round_index >= warmup:
+            for index, (energy, latency) in mesures.items():
+                energies[index].append(energy)
+                latencies[index].append(latency)
+
+    endpoints = []
+    for index in range(count):
+        endpoints.append({
+            'energiaPerInferencia': estimate(energies[index], confidence),
+            'latenciaPerInferencia': estimate(latencies[index], confidence),
+        })
+
+    baseline = endpoints[0]['energiaPerInferencia']['estimacio']
+    baseline_latency = endpoints[0]['latenciaPerInferencia']['estimacio']
+    comparacions = []
+    for index in range(1, count):
+        # Reduction of every round (paired samples) and of the means
+        reductions = [_reduction(energy, base) for energy, base in zip(energies[index], energies[0]) if base]
+        comparacions.append({
+            'endpoint': index,
+            'valorBase': baseline,
+            'factorReduccio': _reduction(endpoints[index]['energiaPerInferencia']['estimacio'], baseline),
+            'reduccioPerRonda': estimate(reductions, confidence),
+            'reduccioLatencia': _reduction(endpoints[index]['latenciaPerInferencia']['estimacio'], baseline_latency),
+        })
+
+    return {
+        'numRondes': len(energies[0]),
+        'confianca': confidence,
+        'motiuAturada': reason,
+        'endpoints': endpoints,
+        'comparacions': comparacions,
+    }
@@ -0,0 +1,162 @@
+"""
+Load generation against an inference endpoint.
+
+A single request is dominated by connection setup and idle power, so for a meaningful energy figure the
+endpoint is measured under a sustained workload: several threads share a pooled HTTP session and send
+requests paced by a rate profile (constant or linear ramp), until a number of requests or a duration.
+"""
+import itertools
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+CONSTANT = 'constant'
+RAMP = 'rampa'
+PROFILES = (CONSTANT, RAMP)
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class LoadProfile:
+    """
+    Workload of a measurement.
+
+    Args:
+    concurrency : number of threads sending requests
+    requests : total number of requests (None: until the duration ends)
+    duration : maximum seconds of the workload
+    rate : requests per second (None: as fast as the threads can); for a ramp, the final rate
+    profile : CONSTANT or RAMP (the rate grows linearly from initial_rate to rate along the duration)
+    initial_rate : initial rate of a ramp
+    """
+
+    def __init__(self, concurrency=1, requests=None, duration=60, rate=None, profile=CONSTANT, initial_rate=0):
+        if profile not in PROFILES:
+            raise ValueError(f'Unknown load profile {profile}')
+        if profile == RAMP and not rate:
+            raise ValueError('A ramp needs a final rate')
+        self.concurrency = concurrency
+        self.requests = requests
+        self.duration = duration
+        self.rate = rate
+        self.profile = profile
+        self.initial_rate = initial_rate or 0
+
+    def send_time(self, index):
+        """Seconds from the start at which request ``index`` (from 0) is due."""
+        if not self.rate:
+            return 0.0
+        if self.profile == RAMP:
+            # Requests due until t: r0 t + (r - r0) t^2 / (2 D), solved for t
+            r0 = self.initial_rate
+            a = (self.rate - r0) / (2 * self.duration)
+            if a == 0:
+                return index / r0
+            discriminant = r0 * r0 + 4 * a * index
+            if discriminant < 0:
+                return math.inf  # A decreasing ramp never reaches this request
+            return (-r0 + math.sqrt(discriminant)) / (2 * a)
+        return index / self.rate
+
+
+class LoadResult:
+    """Latencies (seconds) of the successful requests, number of failed ones and elapsed seconds."""
+
+    def __init__(self, latencies, errors, elapsed):
+        self.latencies = latencies
+        self.errors = errors
+        self.elapsed = elapsed
+
+    @classmethod
+    def combine(cls, results):
+        """Single result of several workloads (e.g. the repetitions of a measurement)."""
+        return cls(
+            [latency for result in results for latency in result.latencies],
+            sum(result.errors for result in results),
+            sum(result.elapsed for result in results),
+        )
+
+    @property
+    def successes(self):
+        return len(self.latencies)
+
+    def report(self, energy=None, emissions=None):
+        """
+        Summary of the workload: throughput, latency percentiles and, given the measured energy (kWh) and
+        emissions (kg CO2eq) of the whole workload, their share per successful request.
+        """
+        latencies = np.array(self.latencies)
+        latencia = None
+        if self.successes:
+            latencia = {'mitjana': float(latencies.mean())}
+            for percentile, valor in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+                latencia[f'p{percentile}'] = float(valor)
+
+        def per_request(total):
+            return total / self.successes if total is not None and self.successes else None
+
+        return {
+            'numPeticions': self.successes + self.errors,
+            'numErrors': self.errors,
+            'durada': self.elapsed,
+            'peticionsPerSegon': self.successes / self.elapsed if self.elapsed else None,
+            'latencia': latencia,
+            'energiaPerPeticio': per_request(energy),
+            'emissionsPerPeticio': per_request(emissions),
+        }
+
+
+def generate_load(endpoint, payload, profile, timeout=None):
+    """
+    Sends the payload to the endpoint following the load profile and returns a LoadResult.
+    Failed requests (error status, connection error or timeout) are counted, not raised.
+    """
+    counter = itertools.count()
+    lock = threading.Lock()
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+
+    def worker(session):
+        nonlocal errors
+        while True:
+            index = next(counter)
+            if profile.requests is not None and index >= profile.requests:
+                return
+            due = profile.send_time(index)
+            if due >= profile.duration:
+                return
+            wait = start + due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            if time.perf_counter() - start >= profile.duration:
+                return
+
+            sent = time.perf_counter()
+            try:
+                ok = session.post(endpoint, json=payload, timeout=timeout).ok
+            except requests.RequestException:
+                ok = False
+            latency = time.perf_counter() - sent
+            with lock:
+                if ok:
+                    latencies.append(latency)
+                else:
+                    errors += 1
+
+    with requests.Session() as session:
+        # One pooled connection per thread, kept alive between requests
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=profile.concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        with ThreadPoolExecutor(max_workers=profile.concurrency) as executor:
+            futures = [executor.submit(worker, session) for _ in range(profile.concurrency)]
+        for future in futures:
+            future.result()
+
+    return LoadResult(latencies, errors, time.perf_counter() - start)
@@ -1,43 +1,60 @@
 from ..models import Interval, Qualificacio
-from ..serializers import MetricaAmbLimitsSerializer, IntervalSerializer, QualificacioSerializer
+from ..serializers import IntervalSerializer
 from .rating_calculator_strategy import calculate_ratings
 
 
-def calculateRating(resultats, metriques):
-    # Aconseguir la informació de les mètriques rebudes
-    metriques_info = MetricaAmbLimitsSerializer(metriques, many=True).data
+def calculateBoundaries(ids_metriques):
+    # Intervals de les mètriques donades (en una sola consulta), ordenats de millor a pitjor qualificació
+    intervals = Interval.objects.filter(metrica_id__in=ids_metriques).order_by('metrica_id', 'qualificacio__ordre')
+    boundaries = {id_metrica: [] for id_metrica in ids_metriques}
+    for interval in IntervalSerializer(intervals, many=True).data:
+        boundaries[interval['metrica']].append([interval['limitSuperior'], interval['limitInferior']])
+    return boundaries
+
+
+def getQualificacions():
+    # Possibles qualificacions, de millor a pitjor
+    return list(Qualificacio.objects.order_by('ordre').values_list('id', flat=True))
+
 
+def _calculateRating(resultats, metriques_info, boundaries, qualificacions_valor):
     # Inicialitzar variables a calcular per poder-les donar a la funció de càlcul dels ratings
-    boundaries = {}  # Intervals de les diferents mètriques
-    pesos = {}  # Pesos de les mètriques
+    pesos = {}  # Pesos de les mètriques amb resultat
     resultats_utils = {}  # Resultats que corresponen a mètriques amb pes != 0
 
-    # Recull i càlcul de les dades necessàries
+    # Recull de les dades necessàries (els pesos han d'anar alineats amb els resultats útils)
     for metrica in metriques_info:
         id_metrica = metrica['id']
-
-        # Càlcul dels intervals
-        intervals = Interval.objects.filter(metrica_id=id_metrica).order_by('qualificacio__ordre')
-        intervals_info = IntervalSerializer(intervals, many=True).data
-        boundaries[id_metrica] = [
-            [interval['limitSuperior'], interval['limitInferior']]
-            for interval in intervals_info
-        ]
-
-        # Càlcul dels pesos de la mètrica
-        pesos[id_metrica] = metrica['pes']
-
-        # Càlcul de resultats útils
         if id_metrica in resultats:
+            pesos[id_metrica] = metrica['pes']
             resultats_utils[id_metrica] = resultats[id_metrica]
 
-    # Aconseguir les possibles qualificacions
-    qualificacions = Qualificacio.objects.order_by('ordre')
-    qualificacions_info = QualificacioSerializer(qualificacions, many=True).data
-    qualificacions_valor = [
-        qualificacio['id'] for qualificacio in qualificacions_info
-    ]
+    return calculate_ratings(resultats_utils, boundaries, pesos, qualificacions_valor)
 
-    qualifFinal, qualifMetriques = calculate_ratings(resultats_utils, boundaries, pesos, qualificacions_valor)
 
-    return qualifFinal, qualifMetriques
+def calculateRating(resultats, metriques):
+    # Aconseguir la informació de les mètriques rebudes (només cal l'identificador i el pes)
+    metriques_info = [{'id': metrica.id, 'pes': metrica.pes} for metrica in metriques]
+
+    # Intervals de les diferents mètriques i possibles qualificacions
+    boundaries = calculateBoundaries([metrica['id'] for metrica in metriques_info])
+    qualificacions_valor = getQualificacions()
+
+    return _calculateRating(resultats, metriques_info, boundaries, qualificacions_valor)
+
+
+def calculateRatings(resultats_experiments, metriques):
+    # Com calculateRating, però per a diversos experiments a la vegada ({experiment: resultats}).
+    # Els intervals i les qualificacions es carreguen un sol cop per a tots els experiments.
+    # Els experiments que no es poden qualificar (p.ex. sense cap resultat) tenen (None, {}).
+    metriques_info = [{'id': metrica.id, 'pes': metrica.pes} for metrica in metriques]
+    boundaries = calculateBoundaries([metrica['id'] for metrica in metriques_info])
+    qualificacions_valor = getQualificacions()
+
+    ratings = {}
+    for experiment, resultats in resultats_experiments.items():
+        try:
+            ratings[experiment] = _calculateRating(resultats, metriques_info, boundaries, qualificacions_valor)
+        except (IndexError, ValueError):
+            ratings[experiment] = (None, {})
+    return ratings
@@ -0,0 +1,202 @@
+"""
+Catalogue of GAISSALabel: the configuration that defines how experiments are rated
+(ratings, metrics and their intervals, additional information and calculation tools).
+
+It changes rarely, so every write bumps the ``VERSIO_CATALEG`` version stamp (see signals.py) and
+the read endpoints revalidate and cache against it (apps/core/versioning.py).
+
+The transformations of the calculation tools are compiled into one ``MapatgeEina`` per tool and phase,
+kept in a per-process snapshot checked against the same ``VERSIO_CATALEG`` stamp, so the ingestion paths
+(live measurements, CSV imports) turn the output rows of a tool into results without queries, and every
+process rebuilds them after a catalogue edit.
+
+Admin edits of intervals and transformations are applied as a difference with the stored rows
+(``aplicar_intervals`` / ``aplicar_transformacions``), with a constant number of queries.
+
+The final ratings stored in the experiments depend on the ratings, the intervals and the weights of the
+metrics, so an edit of any of them recomputes every stored rating and the statistics counters
+(``requalificar``), once per ``modificacio`` block.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from apps.core.snapshots import ProcessSnapshot
+from . import estadistiques
+from .models import (
+    Qualificacio, Metrica, Interval, InfoAddicional, EinaCalcul, TransformacioMetrica, TransformacioInformacio
+)
+
+VERSIO_CATALEG = 'gaissalabel.cataleg'
+
+MODELS_CATALEG = (
+    Qualificacio, Metrica, Interval, InfoAddicional, EinaCalcul, TransformacioMetrica, TransformacioInformacio
+)
+
+
+def valor_numeric(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+class MapatgeEina:
+    """Columns of the output of a calculation tool that hold each metric / additional information of a phase."""
+
+    def __init__(self, eina, fase, columnes_metriques=None, columnes_informacions=None):
+        self.eina = eina
+        self.fase = fase
+        self.columnes_metriques = columnes_metriques or {}  # {metrica: columna}
+        self.columnes_informacions = columnes_informacions or {}  # {infoAddicional: columna}
+
+    def resultats(self, fila):
+        """Metric values of an output row ({metrica: valor}, None if not numeric). Missing columns are skipped."""
+        return {
+            id_metrica: valor_numeric(fila[columna])
+            for id_metrica, columna in self.columnes_metriques.items()
+            if fila.get(columna) not in (None, '')
+        }
+
+    def informacions(self, fila):
+        """Additional information values of an output row ({infoAddicional: valor}). Missing columns are skipped."""
+        return {
+            id_info: fila[columna]
+            for id_info, columna in self.columnes_informacions.items()
+            if fila.get(columna) not in (None, '')
+        }
+
+
+def carregar_mapatges():
+    mapatges = {}
+
+    def mapatge(eina, fase):
+        if (eina, fase) not in mapatges:
+            mapatges[(eina, fase)] = MapatgeEina(eina, fase)
+        return mapatges[(eina, fase)]
+
+    for eina, fase, id_metrica, columna in TransformacioMetrica.objects.values_list(
+        'eina__nom', 'metrica__fase', 'metrica_id', 'valor'
+    ):
+        mapatge(eina, fase).columnes_metriques[id_metrica] = columna
+    for eina, fase, id_info, columna in TransformacioInformacio.objects.values_list(
+        'eina__nom', 'informacio__fase', 'informacio_id', 'valor'
+    ):
+        mapatge(eina, fase).columnes_informacions[id_info] = columna
+    return mapatges
+
+
+mapatges = ProcessSnapshot(VERSIO_CATALEG, carregar_mapatges, ttl=30)
+
+
+def mapatge_eina(eina, fase):
+    """Compiled transformations of a calculation tool (by name) for a phase, None if it has none."""
+    return mapatges.get().get((eina, fase))
+
+
+def invalidar():
+    """
+    Marks the catalogue as changed: bumps its version, so the cached responses are revalidated and the compiled
+    tool mappings are rebuilt by every process (this one on its next read, the rest within the snapshot TTL).
+    Called from the signals; code that writes the catalogue in bulk (no signals) must call it itself.
+    """
+    mapatges.invalidate()
+
+
+_local = threading.local()
+
+
+def modificacio_en_curs():
+    return getattr(_local, 'modificacions', 0) > 0
+
+
+def requalificar():
+    """
+    Marks the stored final ratings as outdated by a catalogue write. They are recomputed, with the counters,
+    when the current ``modificacio`` block ends, or at once outside of one. Called from the signals; code that
+    writes ratings, intervals or weights in bulk (no signals) must call it itself.
+    """
+    if modificacio_en_curs():
+        _local.requalificar = True
+    else:
+        estadistiques.reconstruir(qualificacions=True)
+
+
+@contextmanager
+def modificacio():
+    """
+    Groups several catalogue writes in one transaction. The signals do not invalidate the catalogue (nor
+    recompute the ratings) for each row written inside the block; it is done once when the block ends.
+    """
+    exterior = not modificacio_en_curs()
+    if exterior:
+        _local.requalificar = False
+    _local.modificacions = getattr(_local, 'modificacions', 0) + 1
+    try:
+        with transaction.atomic():
+            yield
+            if exterior and _local.requalificar:
+                estadistiques.reconstruir(qualificacions=True)
+            invalidar()
+    finally:
+        _local.modificacions -= 1
+
+
+def aplicar_intervals(metrica, intervals):
+    """
+    Applies the edited intervals of a metric (``{qualificacio: {'limitSuperior': x, 'limitInferior': y}}``,
+    one or both limits). Existing intervals are updated with one bulk update and new ones are created with one
+    bulk create. Intervals of other ratings are left as they are.
+    Raises ValueError (before writing anything) if a new interval does not have both limits.
+    """
+    actuals = {interval.qualificacio_id: interval for interval in Interval.objects.filter(metrica=metrica)}
+    modificats = []
+    nous = []
+    for qualificacio, limits in intervals.items():
+        interval = actuals.get(qualificacio)
+        if interval is None:
+            if len(limits) < 2:
+                raise ValueError(qualificacio)
+            nous.append(Interval(metrica=metrica, qualificacio_id=qualificacio, **limits))
+        elif any(getattr(interval, camp) != valor for camp, valor in limits.items()):
+            for camp, valor in limits.items():
+                setattr(interval, camp, valor)
+            modificats.append(interval)
+
+    if modificats:
+        Interval.objects.bulk_update(modificats, ['limitSuperior', 'limitInferior'])
+    if nous:
+        Interval.objects.bulk_create(nous)
+    if modificats or nous:
+        requalificar()
+
+
+def aplicar_transformacions(eina, transformacio_model, camp, columnes):
+    """
+    Leaves the transformations of a tool (``transformacio_model``, whose target foreign key is ``camp``) equal
+    to ``columnes`` ({id: columna}): changed columns are updated with one bulk update, new ones created with
+    one bulk create and the rest removed with one delete, so the tool never is without its mappings.
+    """
+    modificades = []
+    esborrades = []
+    vistes = set()
+    for transformacio in transformacio_model.objects.filter(eina=eina):
+        id_desti = getattr(transformacio, f'{camp}_id')
+        if id_desti not in columnes or id_desti in vistes:
+            esborrades.append(transformacio.pk)
+        elif transformacio.valor != columnes[id_desti]:
+            transformacio.valor = columnes[id_desti]
+            modificades.append(transformacio)
+        vistes.add(id_desti)
+    noves = [
+        transformacio_model(eina=eina, valor=columna, **{f'{camp}_id': id_desti})
+        for id_desti, columna in columnes.items() if id_desti not in vistes
+    ]
+
+    if esborrades:
+        transformacio_model.objects.filter(pk__in=esborrades).delete()
+    if modificades:
+        transformacio_model.objects.bulk_update(modificades, ['valor'])
+    if noves:
+        transformacio_model.objects.bulk_create(noves)
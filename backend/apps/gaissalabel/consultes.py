@@ -0,0 +1,193 @@
+"""
+Read-only queries over the experiments of GAISSALabel that do not need to render Energy Labels.
+"""
+import numpy as np
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from apps.gaissa_roi_analyzer.models import ROIAnalysis
+
+from .models import Metrica, Entrenament, Inferencia, ResultatEntrenament, ResultatInferencia
+from .calculators.rating_calculator import calculateBoundaries, calculateRatings, getQualificacions
+from .calculators.rating_calculator_strategy import assign_rating
+
+# Experiment model, result model and name of the result -> experiment foreign key of each phase
+EXPERIMENTS_FASE = {
+    Metrica.TRAIN: (Entrenament, ResultatEntrenament, 'entrenament'),
+    Metrica.INF: (Inferencia, ResultatInferencia, 'inferencia'),
+}
+
+EXPERIMENT_LATEST = 'latest'
+EXPERIMENT_BEST = 'best'
+
+
+def ordre_valor(metrica):
+    """Ordering of the results of a metric from best to worst."""
+    return 'valor' if metrica.influencia == Metrica.NEGATIVA else '-valor'
+
+
+def qualificacio_metrica(valor, boundaries, qualificacions):
+    """Rating (Qualificacio id) of a single metric value, None if it cannot be rated."""
+    if not boundaries:
+        return None
+    index = assign_rating(valor, boundaries)
+    return None if index is np.nan else qualificacions[index]
+
+
+def classificacio(metrica, k, experiment=EXPERIMENT_LATEST):
+    """
+    Top-k models for a metric, from best to worst value. Each model is represented by its latest
+    experiment (``EXPERIMENT_LATEST``) or by its experiment with the best value (``EXPERIMENT_BEST``).
+
+    The results are read in (metrica, valor) index order and the per-model experiment is picked with a
+    correlated subquery, so the database can stop as soon as it has k rows.
+    """
+    experiment_model, resultat_model, camp = EXPERIMENTS_FASE[metrica.fase]
+    ordre = ordre_valor(metrica)
+
+    resultats = resultat_model.objects.filter(metrica=metrica, valor__isnull=False)
+    if experiment == EXPERIMENT_BEST:
+        millor = (
+            resultat_model.objects
+            .filter(metrica=metrica, valor__isnull=False, **{f'{camp}__model': OuterRef(f'{camp}__model')})
+            .order_by(ordre, 'pk').values('pk')[:1]
+        )
+        resultats = resultats.filter(pk=Subquery(millor))
+    else:
+        ultim = (
+            experiment_model.objects.filter(model=OuterRef(f'{camp}__model'))
+            .order_by('-dataRegistre', '-id').values('id')[:1]
+        )
+        resultats = resultats.filter(**{camp: Subquery(ultim)})
+
+    files = resultats.order_by(ordre, 'pk').values(
+        'valor', camp, f'{camp}__dataRegistre', f'{camp}__qualificacio',
+        f'{camp}__model', f'{camp}__model__nom', f'{camp}__model__autor',
+    )[:k]
+
+    boundaries = calculateBoundaries([metrica.id])[metrica.id]
+    qualificacions = getQualificacions()
+    return [
+        {
+            'posicio': posicio,
+            'model': fila[f'{camp}__model'],
+            'nomModel': fila[f'{camp}__model__nom'],
+            'autorModel': fila[f'{camp}__model__autor'],
+            'experiment': fila[camp],
+            'dataRegistre': fila[f'{camp}__dataRegistre'],
+            'valor': fila['valor'],
+            'qualificacioMetrica': qualificacio_metrica(fila['valor'], boundaries, qualificacions),
+            'qualificacio': fila[f'{camp}__qualificacio'],
+        }
+        for posicio, fila in enumerate(files, start=1)
+    ]
+
+
+def _nombre_experiments(experiment_model):
+    return Coalesce(
+        Subquery(
+            experiment_model.objects.filter(model=OuterRef('pk')).order_by()
+            .values('model').annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def _ultim_experiment(experiment_model, camp):
+    return Subquery(
+        experiment_model.objects.filter(model=OuterRef('pk'))
+        .order_by('-dataRegistre', '-id').values(camp)[:1]
+    )
+
+
+def anotar_models(queryset):
+    """
+    Annotates a Model queryset with the summary of its experiments, computed with correlated
+    subqueries in the same query (they use the (model, dataRegistre) indexes):
+
+    - ``numEntrenaments`` / ``numInferencies``: number of experiments of each phase.
+    - ``ultimEntrenament`` / ``ultimaInferencia``: date of the latest experiment of each phase.
+    - ``qualificacioEntrenament`` / ``qualificacioInferencia``: stored final rating of that latest experiment.
+    - ``teAnalisiROI``: whether the ROI Analyzer has analyses linked to the model.
+    """
+    return queryset.annotate(
+        numEntrenaments=_nombre_experiments(Entrenament),
+        numInferencies=_nombre_experiments(Inferencia),
+        ultimEntrenament=_ultim_experiment(Entrenament, 'dataRegistre'),
+        ultimaInferencia=_ultim_experiment(Inferencia, 'dataRegistre'),
+        qualificacioEntrenament=_ultim_experiment(Entrenament, 'qualificacio'),
+        qualificacioInferencia=_ultim_experiment(Inferencia, 'qualificacio'),
+        teAnalisiROI=Exists(ROIAnalysis.objects.filter(gaissalabel_model=OuterRef('pk'))),
+    )
+
+
+def _diferencia(valor, valor_base):
+    if valor is None or valor_base is None:
+        return None
+    absoluta = valor - valor_base
+    return {
+        'absoluta': absoluta,
+        'relativa': absoluta / abs(valor_base) if valor_base else None,
+    }
+
+
+def comparacio(fase, ids_experiments, baseline):
+    """
+    Side by side comparison of experiments of a phase (possibly of different models): their values for
+    every metric of the phase, per-metric and final ratings, and the differences with the ``baseline``
+    experiment. All the results are read in one query and rated in one batch (no Energy Label is rendered).
+
+    Returns None if some experiment does not exist.
+    """
+    experiment_model, resultat_model, camp = EXPERIMENTS_FASE[fase]
+
+    experiments = experiment_model.objects.select_related('model').in_bulk(ids_experiments)
+    if len(experiments) != len(set(ids_experiments)):
+        return None
+
+    resultats = {id_experiment: {} for id_experiment in experiments}
+    for id_experiment, id_metrica, valor in (
+        resultat_model.objects.filter(**{f'{camp}__in': experiments.keys()}).values_list(camp, 'metrica_id', 'valor')
+    ):
+        resultats[id_experiment][id_metrica] = valor
+
+    metriques = list(Metrica.objects.filter(fase=fase).order_by('-pes'))
+    qualificacions = calculateRatings(resultats, [metrica for metrica in metriques if metrica.pes])
+    ordre_qualificacions = {qualificacio: ordre for ordre, qualificacio in enumerate(getQualificacions())}
+
+    resultats_base = resultats[baseline]
+    qualificacio_base = ordre_qualificacions.get(qualificacions[baseline][0])
+
+    comparats = []
+    for id_experiment in ids_experiments:
+        experiment = experiments[id_experiment]
+        qualifFinal, qualifMetriques = qualificacions[id_experiment]
+        qualificacio = ordre_qualificacions.get(qualifFinal)
+        comparats.append({
+            'id': experiment.id,
+            'model': experiment.model_id,
+            'nomModel': experiment.model.nom,
+            'dataRegistre': experiment.dataRegistre,
+            'qualificacio': qualifFinal,
+            'qualificacionsMetriques': qualifMetriques,
+            'resultats': resultats[id_experiment],
+            'diferencies': {
+                metrica.id: _diferencia(resultats[id_experiment].get(metrica.id), resultats_base.get(metrica.id))
+                for metrica in metriques
+            },
+            # Positive when the experiment is rated worse than the baseline (number of rating levels)
+            'diferenciaQualificacio': (
+                qualificacio - qualificacio_base if None not in (qualificacio, qualificacio_base) else None
+            ),
+        })
+
+    return {
+        'fase': fase,
+        'baseline': baseline,
+        'metriques': [
+            {'id': metrica.id, 'nom': metrica.nom, 'unitat': metrica.unitat, 'influencia': metrica.influencia, 'pes': metrica.pes}
+            for metrica in metriques
+        ],
+        'experiments': comparats,
+    }
@@ -0,0 +1,239 @@
+"""
+Incrementally maintained statistics of GAISSALabel.
+
+The counters are stored in the ``Estadistica`` table, one row per key:
+
+- ``models``, ``entrenaments``, ``inferencies``: number of rows of each table.
+- ``qualificacio:<fase>:<qualificacio>``: experiments of the phase (T/I) with that stored final rating.
+- ``cobertura:<fase>:<metrica>``: experiments of the phase with a (non null) result for the metric.
+
+Signals (see signals.py) keep them up to date for single-row writes. Code that writes with
+``bulk_create`` or ``QuerySet.update`` must call ``incrementar`` itself. The table is built by a
+migration and can be recomputed with the ``reconstruir_estadistiques`` management command.
+
+The stored final ratings depend on the catalogue (ratings, intervals and weights of the metrics), so a
+catalogue edit that changes them recomputes every rating and the counters (see cataleg.modificacio).
+
+Reads are served from a per-process snapshot, so the statistics endpoint does not query the database
+(other than to check the version of the snapshot, see apps/core/snapshots.py).
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from apps.core.configuration import get_configuracio
+from apps.core.snapshots import ProcessSnapshot
+from .models import (
+    Model, Entrenament, Inferencia, Metrica, Estadistica, ResultatEntrenament, ResultatInferencia
+)
+from .calculators.rating_calculator import calculateRating, calculateRatings
+
+FASE_EXPERIMENT = {
+    Entrenament: Metrica.TRAIN,
+    Inferencia: Metrica.INF,
+}
+
+FASE_RESULTAT = {
+    ResultatEntrenament: Metrica.TRAIN,
+    ResultatInferencia: Metrica.INF,
+}
+
+CLAU_EXPERIMENTS = {
+    Metrica.TRAIN: 'entrenaments',
+    Metrica.INF: 'inferencies',
+}
+
+# Results of each kind of experiment and their foreign key to it
+RESULTATS_EXPERIMENT = {
+    Entrenament: (ResultatEntrenament, 'entrenament'),
+    Inferencia: (ResultatInferencia, 'inferencia'),
+}
+
+# Experiments rated per query when the ratings are recomputed
+MIDA_LOT = 1000
+
+
+def clau_qualificacio(fase, qualificacio_id):
+    return f'qualificacio:{fase}:{qualificacio_id}'
+
+
+def clau_cobertura(fase, metrica_id):
+    return f'cobertura:{fase}:{metrica_id}'
+
+
+def incrementar(deltes):
+    """
+    Adds each delta to its counter (``{clau: delta}``). The counters are updated with F() expressions,
+    so concurrent writers do not lose increments.
+    """
+    deltes = {clau: delta for clau, delta in deltes.items() if delta}
+    if not deltes:
+        return
+
+    with transaction.atomic():
+        for clau, delta in deltes.items():
+            if not Estadistica.objects.filter(clau=clau).update(valor=F('valor') + delta):
+                Estadistica.objects.get_or_create(clau=clau)
+                Estadistica.objects.filter(clau=clau).update(valor=F('valor') + delta)
+    snapshot.invalidate()
+
+
+def calcular_qualificacio(experiment):
+    """Final rating (Qualificacio id) of an experiment, computed from its stored results."""
+    if isinstance(experiment, Entrenament):
+        resultats_qs = ResultatEntrenament.objects.filter(entrenament=experiment)
+    else:
+        resultats_qs = ResultatInferencia.objects.filter(inferencia=experiment)
+    resultats = dict(resultats_qs.values_list('metrica_id', 'valor'))
+
+    metriques = Metrica.objects.filter(fase=FASE_EXPERIMENT[type(experiment)]).order_by('-pes').exclude(pes=0)
+    try:
+        qualifFinal, qualifMetriques = calculateRating(resultats, metriques)
+    except (IndexError, ValueError):
+        # Experiments without a result for every weighted metric cannot be rated
+        return None
+    return qualifFinal
+
+
+def calcular_qualificacions(fase, resultats_experiments):
+    """
+    Final ratings of several experiments of a phase (``{experiment: {metrica: valor}}``), computed in one batch
+    (the intervals are read once). Returns ``{experiment: qualificacio}``, None for the ones that cannot be rated.
+    """
+    metriques = Metrica.objects.filter(fase=fase).order_by('-pes').exclude(pes=0)
+    ratings = calculateRatings(resultats_experiments, metriques)
+    return {experiment: qualifFinal for experiment, (qualifFinal, qualifMetriques) in ratings.items()}
+
+
+def actualitzar_qualificacio(experiment):
+    """Recomputes and stores the final rating of an experiment, keeping the distribution counters in sync."""
+    anterior = experiment.qualificacio_id
+    nova = calcular_qualificacio(experiment)
+    if nova == anterior:
+        return nova
+
+    type(experiment).objects.filter(pk=experiment.pk).update(qualificacio_id=nova)
+    experiment.qualificacio_id = nova
+
+    fase = FASE_EXPERIMENT[type(experiment)]
+    deltes = defaultdict(int)
+    if anterior is not None:
+        deltes[clau_qualificacio(fase, anterior)] -= 1
+    if nova is not None:
+        deltes[clau_qualificacio(fase, nova)] += 1
+    incrementar(deltes)
+    return nova
+
+
+def requalificar():
+    """
+    Recomputes and stores the final rating of every experiment, in batches of ``MIDA_LOT`` (the intervals are
+    read once per batch and the changed ratings written with one update per rating). The counters are not
+    updated: see ``reconstruir``.
+    """
+    for experiment_model, fase in FASE_EXPERIMENT.items():
+        resultat_model, camp = RESULTATS_EXPERIMENT[experiment_model]
+        experiments = experiment_model.objects.order_by('pk').values_list('pk', 'qualificacio_id')
+        anteriors = {}
+        for pk, qualificacio_id in experiments.iterator(chunk_size=MIDA_LOT):
+            anteriors[pk] = qualificacio_id
+            if len(anteriors) == MIDA_LOT:
+                _requalificar_lot(experiment_model, fase, resultat_model, camp, anteriors)
+                anteriors = {}
+        if anteriors:
+            _requalificar_lot(experiment_model, fase, resultat_model, camp, anteriors)
+
+
+def _requalificar_lot(experiment_model, fase, resultat_model, camp, anteriors):
+    resultats = {pk: {} for pk in anteriors}
+    for pk, metrica_id, valor in resultat_model.objects.filter(**{f'{camp}_id__in': list(anteriors)}).values_list(
+        f'{camp}_id', 'metrica_id', 'valor'
+    ):
+        resultats[pk][metrica_id] = valor
+
+    canvis = defaultdict(list)
+    for pk, nova in calcular_qualificacions(fase, resultats).items():
+        if nova != anteriors[pk]:
+            canvis[nova].append(pk)
+    for nova, pks in canvis.items():
+        experiment_model.objects.filter(pk__in=pks).update(qualificacio_id=nova)
+
+
+def comptar():
+    """Counters computed from scratch with aggregate queries."""
+    comptadors = {
+        'models': Model.objects.count(),
+        CLAU_EXPERIMENTS[Metrica.TRAIN]: Entrenament.objects.count(),
+        CLAU_EXPERIMENTS[Metrica.INF]: Inferencia.objects.count(),
+    }
+
+    for experiment_model, fase in FASE_EXPERIMENT.items():
+        distribucio = (
+            experiment_model.objects.filter(qualificacio__isnull=False)
+            .values('qualificacio').annotate(total=Count('pk'))
+        )
+        for fila in distribucio:
+            comptadors[clau_qualificacio(fase, fila['qualificacio'])] = fila['total']
+
+    for resultat_model, fase in FASE_RESULTAT.items():
+        cobertura = (
+            resultat_model.objects.filter(valor__isnull=False)
+            .values('metrica').annotate(total=Count('pk'))
+        )
+        for fila in cobertura:
+            comptadors[clau_cobertura(fase, fila['metrica'])] = fila['total']
+
+    return comptadors
+
+
+@transaction.atomic
+def reconstruir(qualificacions=False):
+    """
+    Recomputes every counter. With ``qualificacions`` the stored final rating of every experiment is
+    recomputed first (see ``requalificar``).
+    """
+    if qualificacions:
+        requalificar()
+
+    comptadors = comptar()
+    Estadistica.objects.all().delete()
+    Estadistica.objects.bulk_create([Estadistica(clau=clau, valor=valor) for clau, valor in comptadors.items()])
+    snapshot.invalidate()
+    return comptadors
+
+
+def carregar():
+    # Never rebuilt on a read: the table is built by a migration and by reconstruir_estadistiques
+    comptadors = dict(Estadistica.objects.values_list('clau', 'valor'))
+
+    distribucio = {fase: {} for fase in CLAU_EXPERIMENTS}
+    cobertura = {fase: {} for fase in CLAU_EXPERIMENTS}
+    for clau, valor in comptadors.items():
+        if not valor:
+            continue
+        tipus, _, resta = clau.partition(':')
+        if tipus == 'qualificacio':
+            fase, _, qualificacio = resta.partition(':')
+            distribucio[fase][qualificacio] = valor
+        elif tipus == 'cobertura':
+            fase, _, metrica = resta.partition(':')
+            cobertura[fase][metrica] = valor
+
+    configuracio = get_configuracio()
+    return {
+        'numModels': comptadors.get('models', 0),
+        'numEntrenaments': comptadors.get(CLAU_EXPERIMENTS[Metrica.TRAIN], 0),
+        'numInferencies': comptadors.get(CLAU_EXPERIMENTS[Metrica.INF], 0),
+        'distribucioQualificacions': distribucio,
+        'coberturaMetriques': cobertura,
+        'ultimaSincronitzacio': configuracio.ultimaSincronitzacio if configuracio else None,
+    }
+
+
+snapshot = ProcessSnapshot('gaissalabel.estadistiques', carregar, ttl=30)
+
+
+def obtenir():
+    """Current statistics (served from the per-process snapshot)."""
+    return snapshot.get()
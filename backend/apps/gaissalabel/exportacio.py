@@ -0,0 +1,184 @@
+"""
+Streaming export of the GAISSALabel experiments (CSV, NDJSON and Parquet).
+
+One row per experiment, with its model, its stored final rating, one column per metric result
+(``metrica_<id>``) and one column per additional information value (``info_<id>``).
+
+The experiments are read with ``QuerySet.iterator(chunk_size=...)`` (a server-side cursor on PostgreSQL),
+with their results and additional information prefetched per chunk, and every format is written chunk by
+chunk, so the export is never materialized in memory.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from .models import (
+    Metrica, InfoAddicional, Entrenament, Inferencia, ResultatEntrenament, ResultatInferencia,
+    ValorInfoEntrenament, ValorInfoInferencia
+)
+
+CHUNK_SIZE = 2000
+
+TIPUS_CSV = 'csv'
+TIPUS_NDJSON = 'ndjson'
+TIPUS_PARQUET = 'parquet'
+
+CONTENT_TYPES = {
+    TIPUS_CSV: 'text/csv',
+    TIPUS_NDJSON: 'application/x-ndjson',
+    TIPUS_PARQUET: 'application/vnd.apache.parquet',
+}
+
+# Experiment model, name of the foreign keys to it and its results / additional information relations of each phase
+EXPERIMENTS_FASE = {
+    Metrica.TRAIN: (Entrenament, 'entrenament', 'resultatsEntrenament', ResultatEntrenament, 'informacionsEntrenament', ValorInfoEntrenament),
+    Metrica.INF: (Inferencia, 'inferencia', 'resultatsInferencia', ResultatInferencia, 'informacionsInferencia', ValorInfoInferencia),
+}
+
+COLUMNES_EXPERIMENT = [
+    ('fase', pa.string()),
+    ('experiment', pa.int64()),
+    ('dataRegistre', pa.timestamp('us', tz='UTC')),
+    ('qualificacio', pa.string()),
+    ('model', pa.int64()),
+    ('nomModel', pa.string()),
+    ('autorModel', pa.string()),
+]
+
+
+class Exportacio:
+    """
+    Export of the experiments matching the filters (all of them if a filter is None).
+    ``des`` and ``fins`` are dates or datetimes (inclusive).
+    """
+
+    def __init__(self, fase=None, models=None, des=None, fins=None):
+        self.fases = [fase] if fase else list(EXPERIMENTS_FASE)
+        self.models = models
+        self.des = des
+        self.fins = fins
+
+        metriques = Metrica.objects.filter(fase__in=self.fases).order_by('fase', 'id').values_list('id', flat=True)
+        informacions = InfoAddicional.objects.filter(fase__in=self.fases).order_by('fase', 'id').values_list('id', flat=True)
+        self.columnes_metriques = {id_metrica: f'metrica_{id_metrica}' for id_metrica in metriques}
+        self.columnes_informacions = {id_info: f'info_{id_info}' for id_info in informacions}
+
+    @property
+    def columnes(self):
+        return (
+            [nom for nom, tipus in COLUMNES_EXPERIMENT]
+            + list(self.columnes_metriques.values())
+            + list(self.columnes_informacions.values())
+        )
+
+    @property
+    def schema(self):
+        return pa.schema(
+            COLUMNES_EXPERIMENT
+            + [(columna, pa.float64()) for columna in self.columnes_metriques.values()]
+            + [(columna, pa.string()) for columna in self.columnes_informacions.values()]
+        )
+
+    def experiments(self, fase):
+        experiment_model, camp, resultats, resultat_model, informacions, info_model = EXPERIMENTS_FASE[fase]
+        queryset = experiment_model.objects.select_related('model').order_by('id')
+        if self.models:
+            queryset = queryset.filter(model_id__in=self.models)
+        # Dates without time include the whole day
+        if self.des:
+            camp_data = 'dataRegistre' if isinstance(self.des, datetime) else 'dataRegistre__date'
+            queryset = queryset.filter(**{f'{camp_data}__gte': self.des})
+        if self.fins:
+            camp_data = 'dataRegistre' if isinstance(self.fins, datetime) else 'dataRegistre__date'
+            queryset = queryset.filter(**{f'{camp_data}__lte': self.fins})
+        return queryset.prefetch_related(
+            Prefetch(resultats, queryset=resultat_model.objects.only('id', camp, 'metrica', 'valor')),
+            Prefetch(informacions, queryset=info_model.objects.only('id', camp, 'infoAddicional', 'valor')),
+        ).iterator(chunk_size=CHUNK_SIZE)
+
+    def files(self):
+        """Rows of the export (dicts), read chunk by chunk."""
+        for fase in self.fases:
+            experiment_model, camp, resultats, resultat_model, informacions, info_model = EXPERIMENTS_FASE[fase]
+            for experiment in self.experiments(fase):
+                fila = {
+                    'fase': fase,
+                    'experiment': experiment.id,
+                    'dataRegistre': experiment.dataRegistre,
+                    'qualificacio': experiment.qualificacio_id,
+                    'model': experiment.model_id,
+                    'nomModel': experiment.model.nom,
+                    'autorModel': experiment.model.autor,
+                }
+                for resultat in getattr(experiment, resultats).all():
+                    if resultat.metrica_id in self.columnes_metriques:
+                        fila[self.columnes_metriques[resultat.metrica_id]] = resultat.valor
+                for valor in getattr(experiment, informacions).all():
+                    if valor.infoAddicional_id in self.columnes_informacions:
+                        fila[self.columnes_informacions[valor.infoAddicional_id]] = valor.valor
+                yield fila
+
+    def csv(self):
+        buffer = _Sortida()
+        writer = csv.DictWriter(buffer, fieldnames=self.columnes)
+        writer.writeheader()
+        yield buffer.buidar()
+        for fila in self.files():
+            writer.writerow(fila)
+            yield buffer.buidar()
+
+    def ndjson(self):
+        for fila in self.files():
+            yield json.dumps(fila, cls=DjangoJSONEncoder) + '\n'
+
+    def parquet(self):
+        # One row group per chunk; the bytes are handed out as soon as each row group is written
+        sortida = _Sortida()
+        schema = self.schema
+        with pq.ParquetWriter(pa.PythonFile(sortida, mode='w'), schema) as writer:
+            chunk = []
+            for fila in self.files():
+                chunk.append(fila)
+                if len(chunk) == CHUNK_SIZE:
+                    writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                    chunk = []
+                    yield sortida.buidar()
+            if chunk:
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+        yield sortida.buidar()
+
+    def contingut(self, tipus):
+        return getattr(self, tipus)()
+
+
+class _Sortida(io.RawIOBase):
+    """Write-only stream whose written data is taken out with buidar() (tell() keeps counting)."""
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.posicio = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.parts.append(bytes(data))
+        self.posicio += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.posicio
+
+    def buidar(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
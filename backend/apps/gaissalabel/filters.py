@@ -0,0 +1,27 @@
+from django_filters import rest_framework as filters
+
+from .models import Model
+
+
+class ModelFilter(filters.FilterSet):
+    """Filters of the model list, including the experiment summary annotations (see consultes.anotar_models)."""
+    numEntrenaments = filters.NumberFilter()
+    numEntrenaments__gte = filters.NumberFilter(field_name='numEntrenaments', lookup_expr='gte')
+    numEntrenaments__lte = filters.NumberFilter(field_name='numEntrenaments', lookup_expr='lte')
+    numInferencies = filters.NumberFilter()
+    numInferencies__gte = filters.NumberFilter(field_name='numInferencies', lookup_expr='gte')
+    numInferencies__lte = filters.NumberFilter(field_name='numInferencies', lookup_expr='lte')
+    ultimEntrenament__gte = filters.IsoDateTimeFilter(field_name='ultimEntrenament', lookup_expr='gte')
+    ultimEntrenament__lte = filters.IsoDateTimeFilter(field_name='ultimEntrenament', lookup_expr='lte')
+    ultimaInferencia__gte = filters.IsoDateTimeFilter(field_name='ultimaInferencia', lookup_expr='gte')
+    ultimaInferencia__lte = filters.IsoDateTimeFilter(field_name='ultimaInferencia', lookup_expr='lte')
+    qualificacioEntrenament = filters.BaseInFilter()
+    qualificacioInferencia = filters.BaseInFilter()
+    has_roi_analysis = filters.BooleanFilter(field_name='teAnalisiROI')
+
+    class Meta:
+        model = Model
+        fields = {
+            'id': ['exact', 'in'],
+            'nom': ['exact', 'in', 'contains'],
+        }
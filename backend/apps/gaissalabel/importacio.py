@@ -0,0 +1,137 @@
+"""
+Bulk import of experiments from the CSV files written by a calculation tool (``emissions.csv`` of CodeCarbon).
+
+Every row of a file is one experiment of a model. Its columns are mapped to metric results and additional
+information values through the compiled transformations of the tool (``cataleg.MapatgeEina``).
+
+The files are read row by row and written in batches of ``MIDA_LOT`` experiments with ``bulk_create``, so memory
+does not grow with the size of the files. The whole import is one transaction: if a later file or row cannot be
+decoded or parsed, the batches already written are rolled back and nothing is imported.
+Bulk writes do not send signals, so the final ratings and the statistics counters of every batch are computed
+and stored here (see estadistiques.py).
+"""
+import csv
+import io
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import estadistiques
+from .cataleg import mapatge_eina
+from .models import (
+    Metrica, Entrenament, Inferencia, ResultatEntrenament, ResultatInferencia, ValorInfoEntrenament, ValorInfoInferencia
+)
+
+EINA_PER_DEFECTE = 'CodeCarbon'
+MIDA_LOT = 500
+
+# Column with the date of the measurement
+COLUMNA_DATA = 'timestamp'
+
+# Experiment model, name of the foreign keys to it, result model and additional information model of each phase
+EXPERIMENTS_FASE = {
+    Metrica.TRAIN: (Entrenament, 'entrenament', ResultatEntrenament, ValorInfoEntrenament),
+    Metrica.INF: (Inferencia, 'inferencia', ResultatInferencia, ValorInfoInferencia),
+}
+
+
+class EinaDesconeguda(Exception):
+    """The calculation tool does not exist or has no transformations for the phase."""
+
+
+def _data_registre(valor):
+    try:
+        data = parse_datetime(valor or '')
+    except ValueError:
+        data = None
+    if data is None:
+        return timezone.now()
+    return timezone.make_aware(data) if timezone.is_naive(data) else data
+
+
+def obrir_csv(fitxer):
+    """Text stream of an uploaded (binary) or opened (text) CSV file."""
+    if isinstance(fitxer, io.TextIOBase):
+        return fitxer
+    return io.TextIOWrapper(fitxer, encoding='utf-8-sig', newline='')
+
+
+class Importacio:
+    """
+    Import of CSV files of a calculation tool as experiments of a model.
+    The counts of the imported rows are kept in ``resum``.
+    """
+
+    def __init__(self, model, fase, eina=EINA_PER_DEFECTE):
+        self.model = model
+        self.fase = fase
+        self.experiment_model, self.camp, self.resultat_model, self.info_model = EXPERIMENTS_FASE[fase]
+
+        self.mapatge = mapatge_eina(eina, fase)
+        if self.mapatge is None:
+            raise EinaDesconeguda(eina)
+
+        self.resum = {'numFitxers': 0, 'numExperiments': 0, 'numResultats': 0, 'numInformacions': 0}
+
+    @transaction.atomic
+    def importar(self, fitxers):
+        """
+        Imports every row of the given CSV files (opened files or uploads) and returns the summary.
+        All or nothing: a decoding or parsing error (``UnicodeDecodeError``, ``csv.Error``) rolls back every batch.
+        """
+        lot = []
+        for fitxer in fitxers:
+            for fila in csv.DictReader(obrir_csv(fitxer)):
+                lot.append(fila)
+                if len(lot) == MIDA_LOT:
+                    self.desar_lot(lot)
+                    lot = []
+            self.resum['numFitxers'] += 1
+        if lot:
+            self.desar_lot(lot)
+        return self.resum
+
+    def desar_lot(self, files):
+        experiments = self.experiment_model.objects.bulk_create(
+            [self.experiment_model(model=self.model) for fila in files]
+        )
+
+        resultats = []
+        informacions = []
+        resultats_experiments = {}
+        for experiment, fila in zip(experiments, files):
+            # dataRegistre is auto_now_add, so the date of the measurement is stored with the bulk update below
+            experiment.dataRegistre = _data_registre(fila.get(COLUMNA_DATA))
+            valors = self.mapatge.resultats(fila)
+            resultats_experiments[experiment.id] = valors
+            resultats += [
+                self.resultat_model(**{self.camp: experiment}, metrica_id=id_metrica, valor=valor)
+                for id_metrica, valor in valors.items()
+            ]
+            informacions += [
+                self.info_model(**{self.camp: experiment}, infoAddicional_id=id_info, valor=valor)
+                for id_info, valor in self.mapatge.informacions(fila).items()
+            ]
+        self.resultat_model.objects.bulk_create(resultats)
+        self.info_model.objects.bulk_create(informacions)
+
+        qualificacions = estadistiques.calcular_qualificacions(self.fase, resultats_experiments)
+        for experiment in experiments:
+            experiment.qualificacio_id = qualificacions[experiment.id]
+        self.experiment_model.objects.bulk_update(experiments, ['dataRegistre', 'qualificacio'])
+
+        deltes = defaultdict(int)
+        deltes[estadistiques.CLAU_EXPERIMENTS[self.fase]] += len(experiments)
+        for qualificacio in qualificacions.values():
+            if qualificacio is not None:
+                deltes[estadistiques.clau_qualificacio(self.fase, qualificacio)] += 1
+        for resultat in resultats:
+            if resultat.valor is not None:
+                deltes[estadistiques.clau_cobertura(self.fase, resultat.metrica_id)] += 1
+        estadistiques.incrementar(deltes)
+
+        self.resum['numExperiments'] += len(experiments)
+        self.resum['numResultats'] += len(resultats)
+        self.resum['numInformacions'] += len(informacions)
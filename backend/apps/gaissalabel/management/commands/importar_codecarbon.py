@@ -0,0 +1,64 @@
+import csv
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.gaissalabel import importacio
+from apps.gaissalabel.models import Model, Metrica
+
+
+class Command(BaseCommand):
+    help = "Import CodeCarbon emissions CSV files (or directories of them) as experiments of a model."
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", type=int, help="Id of the model the experiments belong to.")
+        parser.add_argument("paths", nargs="+", help="CSV files or directories (searched recursively for *.csv).")
+        parser.add_argument(
+            "--fase",
+            choices=[Metrica.TRAIN, Metrica.INF],
+            default=Metrica.INF,
+            help="Phase of the experiments: T (trainings) or I (inferences, default).",
+        )
+        parser.add_argument(
+            "--eina",
+            default=importacio.EINA_PER_DEFECTE,
+            help="Calculation tool whose transformations map the CSV columns (default: CodeCarbon).",
+        )
+
+    def fitxers(self, paths):
+        for path in paths:
+            if path.is_dir():
+                yield from sorted(path.rglob("*.csv"))
+            else:
+                yield path
+
+    def obrir(self, paths):
+        # Files are opened one at a time, while they are imported
+        for path in paths:
+            self.stdout.write(f"Importing {path}")
+            with open(path, newline="", encoding="utf-8-sig") as fitxer:
+                yield fitxer
+
+    def handle(self, *args, **opts):
+        try:
+            model = Model.objects.get(id=opts["model"])
+        except Model.DoesNotExist:
+            raise CommandError(f"Model {opts['model']} does not exist.")
+
+        paths = [Path(path) for path in opts["paths"]]
+        for path in paths:
+            if not path.exists():
+                raise CommandError(f"{path} does not exist.")
+
+        try:
+            importador = importacio.Importacio(model, opts["fase"], opts["eina"])
+        except importacio.EinaDesconeguda:
+            raise CommandError(f"The tool {opts['eina']} has no transformations for phase {opts['fase']}.")
+
+        try:
+            resum = importador.importar(self.obrir(self.fitxers(paths)))
+        except (csv.Error, UnicodeDecodeError) as error:
+            raise CommandError(f"The files must be CSV in UTF-8 ({error}). Nothing was imported.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {resum['numExperiments']} experiments from {resum['numFitxers']} files "
+            f"({resum['numResultats']} results, {resum['numInformacions']} additional information values)."
+        ))
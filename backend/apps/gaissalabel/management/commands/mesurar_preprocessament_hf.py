@@ -0,0 +1,98 @@
+import contextlib
+import io
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from scipy import stats
+
+from connectors import adaptador_huggingface as hf
+from connectors.scanner_huggingface import scan_model_cards
+from connectors.synthetic_huggingface import synthetic_extraction
+
+
+class Command(BaseCommand):
+    help = ("Time the row-wise (apply, one search per field) and vectorized (single-pass) versions of the steps of "
+            "the Hugging Face synchronization preprocessing on synthetic models.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--models", type=int, default=20000, help="Synthetic models (default: 20000).")
+        parser.add_argument("--repeticions", type=int, default=3, help="Runs of each version; the best is kept.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def temps(self, funcio, repeticions):
+        millor = None
+        for _ in range(repeticions):
+            inici = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                funcio()
+            durada = time.perf_counter() - inici
+            millor = durada if millor is None else min(millor, durada)
+        return millor
+
+    def handle(self, *args, **opts):
+        df = synthetic_extraction(opts["models"], seed=opts["seed"])
+        tags_metadata = hf.load_tags_metadata()
+        libraries = tags_metadata["libraries"]
+        tags = df["tags"].apply(lambda tags: hf.tags_treatment(tags, tags_metadata))
+        metrics = hf.performance_metrics_treatment(df.copy())
+        normalized = metrics[hf.PERFORMANCE_METRICS].apply(hf.min_max_normalize)
+        mapped = df.fillna({"source": "Not Specified"})
+        names = hf.PERFORMANCE_METRICS
+        texts = df["modelcard_text"].tolist()
+
+        # (pas, versió per files, versió vectoritzada)
+        passos = [
+            (
+                "normalize_performance_metric",
+                lambda: [df[m].apply(lambda value: hf.normalize_performance_metric(value, m)) for m in names],
+                lambda: [hf.normalize_performance_metric_column(df[m], m) for m in names],
+            ),
+            (
+                "harmonize_co2",
+                lambda: df["co2_eq_emissions"].apply(hf.harmonize_co2),
+                lambda: hf.harmonize_co2_column(df["co2_eq_emissions"]),
+            ),
+            (
+                "set_library",
+                lambda: df.assign(tags=tags).apply(
+                    lambda row: hf.set_library(row["library_name"], row["tags"], libraries), axis=1
+                ),
+                lambda: hf.set_library_column(df["library_name"], tags, libraries),
+            ),
+            (
+                "combine_sources",
+                lambda: mapped.apply(lambda row: hf.combine_sources(row["source"], row["auto"]), axis=1),
+                lambda: hf.combine_sources_column(mapped["source"], mapped["auto"]),
+            ),
+            (
+                "create_performance_metrics",
+                lambda: metrics.apply(hf.create_performance_metrics, axis=1),
+                lambda: hf.create_performance_metrics_column(metrics),
+            ),
+            (
+                "extract_context_info (cards)",
+                lambda: [hf.extract_context_info(text) for text in texts],
+                lambda: scan_model_cards(texts),
+            ),
+            (
+                "performance_score (hmean)",
+                lambda: normalized.apply(lambda row: stats.hmean(row.dropna()) if row.notna().any() else np.nan, axis=1),
+                lambda: hf.harmonic_mean_present(normalized.to_numpy(dtype=float), normalized.index),
+            ),
+        ]
+
+        self.stdout.write(f"{len(df)} synthetic models, best of {opts['repeticions']} runs")
+        self.stdout.write(f"{'step':<34}{'apply (s)':>12}{'vectorized (s)':>16}{'speed-up':>10}")
+        total_files = total_vectoritzat = 0
+        for nom, per_files, vectoritzat in passos:
+            temps_files = self.temps(per_files, opts["repeticions"])
+            temps_vectoritzat = self.temps(vectoritzat, opts["repeticions"])
+            total_files += temps_files
+            total_vectoritzat += temps_vectoritzat
+            self.stdout.write(
+                f"{nom:<34}{temps_files:>12.3f}{temps_vectoritzat:>16.3f}{temps_files / temps_vectoritzat:>9.1f}x"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{'total':<34}{total_files:>12.3f}{total_vectoritzat:>16.3f}{total_files / total_vectoritzat:>9.1f}x"
+        ))
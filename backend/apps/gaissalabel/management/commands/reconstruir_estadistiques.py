@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from apps.gaissalabel import estadistiques
+
+
+class Command(BaseCommand):
+    help = "Recompute the GAISSALabel statistics counters from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--qualificacions",
+            action="store_true",
+            help="Also recompute the stored final rating of every experiment "
+                 "(catalogue edits do it themselves; needed after writing intervals or weights in bulk).",
+        )
+
+    def handle(self, *args, **opts):
+        comptadors = estadistiques.reconstruir(qualificacions=opts["qualificacions"])
+        self.stdout.write(self.style.SUCCESS(f"Statistics rebuilt: {len(comptadors)} counters."))
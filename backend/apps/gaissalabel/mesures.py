@@ -0,0 +1,238 @@
+"""
+Background efficiency measurements of inference endpoints.
+
+A measurement (``MesuraInferencia``) is stored and submitted to a thread pool of the process, so the
+request that creates it returns at once and the client polls its state. The state lives in the database,
+so any process can answer the polls and cancellations:
+
+- A cancelled measurement is marked at once (and removed from the queue if it is pending in this process).
+  If it is running, its result is discarded when the endpoint answers (bounded by ``tempsMaxim``).
+- A running measurement that is not finished ``MARGE_TEMPS`` seconds after it could have (e.g. its process
+  stopped) is marked as timed out when it is read. A pending one waits its turn in the queue of its process
+  (one measurement at a time with ``MEASUREMENT_WORKERS = 1``), so it is only timed out after
+  ``MEASUREMENT_QUEUE_TTL`` seconds, and never while it is queued in the process that reads it.
+
+A measurement with a load profile (``carrega``) measures the endpoint under that workload (see
+calculators/load_generator.py) and also stores its report (``informeCarrega``). One with a repetition policy
+(``repeticions``) is repeated until its energy per inference is stable (see calculators/adaptive_repetition.py)
+and stores the estimate with its confidence interval (``informeRepeticions``); a cancellation stops it
+between two repetitions. One with a comparison (``comparacio``) measures the endpoint, as the baseline, and
+the compared ones in interleaved rounds (see calculators/interleaved_comparison.py) and stores the energy per
+inference of each one and their reduction (``informeComparacio``); its results are those of the baseline.
+
+If the measurement has a model, its results are stored as an inference of the model when it finishes.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import estadistiques
+from .calculators.adaptive_repetition import RepetitionPolicy
+from .calculators.efficiency_calculator import (
+    calculateEfficiency, calculateLoadEfficiency, calculateRepeatedEfficiency, calculateComparedEfficiency
+)
+from .calculators.load_generator import LoadProfile
+from .cataleg import valor_numeric
+from .models import MesuraInferencia, Inferencia, ResultatInferencia
+
+# Seconds allowed on top of the maximum duration (start and stop of the emissions tracker)
+MARGE_TEMPS = 60
+
+_lock = threading.Lock()
+_executor = None
+_futures = {}
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'MEASUREMENT_WORKERS', 1),
+                thread_name_prefix='gaissalabel-mesura',
+            )
+        return _executor
+
+
+def temps_per_defecte():
+    return getattr(settings, 'MEASUREMENT_TIMEOUT', 300)
+
+
+def temps_cua():
+    return getattr(settings, 'MEASUREMENT_QUEUE_TTL', 24 * 3600)
+
+
+def enviar(mesura):
+    """Submits a stored measurement to the executor (once the current transaction commits)."""
+    def submit():
+        future = _get_executor().submit(executar, mesura.id)
+        with _lock:
+            _futures[mesura.id] = future
+        # Added once stored: if the measurement has already finished, it is removed at once
+        future.add_done_callback(lambda future: _oblidar(mesura.id, future))
+    transaction.on_commit(submit)
+
+
+def _oblidar(id_mesura, future):
+    with _lock:
+        if _futures.get(id_mesura) is future:
+            del _futures[id_mesura]
+
+
+def _a_la_cua(id_mesura):
+    """Whether the measurement is queued or running in this process."""
+    with _lock:
+        future = _futures.get(id_mesura)
+    return future is not None and not future.done()
+
+
+def perfil_carrega(carrega):
+    """LoadProfile of the (validated) load of a measurement."""
+    return LoadProfile(
+        concurrency=carrega['concurrencia'],
+        requests=carrega.get('peticions'),
+        duration=carrega['durada'],
+        rate=carrega.get('ritme'),
+        profile=carrega['perfil'],
+        initial_rate=carrega.get('ritmeInicial'),
+    )
+
+
+def politica_repeticions(repeticions):
+    """RepetitionPolicy of the (validated) repetitions of a measurement."""
+    return RepetitionPolicy(
+        warmup=repeticions['escalfament'],
+        batch=repeticions['midaLot'],
+        relative_width=repeticions['ampladaRelativa'],
+        confidence=repeticions['confianca'],
+        time_budget=repeticions['pressupostTemps'],
+        min_samples=repeticions['minMostres'],
+        max_samples=repeticions['maxMostres'],
+    )
+
+
+def durada_maxima(mesura):
+    """Seconds a measurement can take once started (without the margin)."""
+    durada = mesura.tempsMaxim
+    if mesura.carrega:
+        durada += mesura.carrega['durada']
+    if mesura.repeticions:
+        # No repetition starts after the time budget, but the last one can end after it
+        durada += mesura.repeticions['pressupostTemps']
+    if mesura.comparacio:
+        # Every round measures all the endpoints
+        comparacio = mesura.comparacio
+        durada *= (comparacio['rondes'] + comparacio['escalfament']) * (len(comparacio['endpoints']) + 1)
+    return durada
+
+
+def _cancellada(id_mesura):
+    return not MesuraInferencia.objects.filter(pk=id_mesura, estat=MesuraInferencia.EXECUCIO).exists()
+
+
+def _finalitzar(id_mesura, estat, **camps):
+    # Only a running measurement can be finished (it may have been cancelled or timed out meanwhile)
+    return MesuraInferencia.objects.filter(pk=id_mesura, estat=MesuraInferencia.EXECUCIO).update(
+        estat=estat, dataFi=timezone.now(), **camps
+    )
+
+
+def cancellar(mesura):
+    """Cancels a measurement. Returns False if it had already finished."""
+    if mesura.estat in MesuraInferencia.ESTATS_FINALS:
+        return False
+
+    # A running measurement is not interrupted, but executar discards its result
+    MesuraInferencia.objects.filter(
+        pk=mesura.pk, estat__in=(MesuraInferencia.PENDENT, MesuraInferencia.EXECUCIO)
+    ).update(estat=MesuraInferencia.CANCELLADA, dataFi=timezone.now())
+    with _lock:
+        future = _futures.get(mesura.pk)
+    if future is not None:
+        future.cancel()
+    mesura.refresh_from_db()
+    return True
+
+
+def caducar(mesura):
+    """Marks the measurement as timed out if it should have finished (or started) long ago."""
+    if mesura.estat == MesuraInferencia.EXECUCIO:
+        limit = mesura.dataInici + timedelta(seconds=durada_maxima(mesura) + MARGE_TEMPS)
+    elif mesura.estat == MesuraInferencia.PENDENT and not _a_la_cua(mesura.pk):
+        limit = mesura.dataCreacio + timedelta(seconds=temps_cua())
+    else:
+        return mesura
+    if timezone.now() > limit:
+        MesuraInferencia.objects.filter(pk=mesura.pk, estat=mesura.estat).update(
+            estat=MesuraInferencia.TEMPS_ESGOTAT, dataFi=timezone.now()
+        )
+        mesura.refresh_from_db()
+    return mesura
+
+
+@transaction.atomic
+def desar_inferencia(mesura, resultats):
+    """Stores the results of a measurement as an inference of its model."""
+    inferencia = Inferencia.objects.create(model_id=mesura.model_id)
+    for id_metrica, valor in resultats.items():
+        ResultatInferencia.objects.create(inferencia=inferencia, metrica_id=id_metrica, valor=valor_numeric(valor))
+    estadistiques.actualitzar_qualificacio(inferencia)
+    return inferencia
+
+
+def executar(id_mesura):
+    """Runs a measurement (in a thread of the executor)."""
+    try:
+        comencada = MesuraInferencia.objects.filter(pk=id_mesura, estat=MesuraInferencia.PENDENT).update(
+            estat=MesuraInferencia.EXECUCIO, dataInici=timezone.now()
+        )
+        if not comencada:
+            return  # Cancelled or timed out while queued
+        mesura = MesuraInferencia.objects.get(pk=id_mesura)
+
+        informe = informeRepeticions = informeComparacio = None
+        perfil = perfil_carrega(mesura.carrega) if mesura.carrega else None
+        try:
+            if mesura.repeticions:
+                resultats, informe, informeRepeticions = calculateRepeatedEfficiency(
+                    mesura.endpoint, mesura.entrada, politica_repeticions(mesura.repeticions),
+                    profile=perfil, timeout=mesura.tempsMaxim, cancelled=lambda: _cancellada(id_mesura),
+                )
+            elif mesura.comparacio:
+                resultats, informeComparacio = calculateComparedEfficiency(
+                    [mesura.endpoint] + mesura.comparacio['endpoints'], mesura.entrada, mesura.comparacio['rondes'],
+                    warmup=mesura.comparacio['escalfament'], profile=perfil, timeout=mesura.tempsMaxim,
+                    cancelled=lambda: _cancellada(id_mesura),
+                )
+            elif perfil:
+                resultats, informe = calculateLoadEfficiency(
+                    mesura.endpoint, mesura.entrada, perfil, timeout=mesura.tempsMaxim
+                )
+            else:
+                resultats = calculateEfficiency(mesura.endpoint, mesura.entrada, timeout=mesura.tempsMaxim)
+        except requests.Timeout:
+            _finalitzar(id_mesura, MesuraInferencia.TEMPS_ESGOTAT,
+                        error=f"L'endpoint no ha respost en {mesura.tempsMaxim} segons")
+            return
+        except Exception as error:
+            _finalitzar(id_mesura, MesuraInferencia.ERROR, error=str(error)[:1000])
+            return
+
+        with transaction.atomic():
+            # Locks the row, so a cancellation either happened before or is left out
+            mesura = MesuraInferencia.objects.select_for_update().get(pk=id_mesura)
+            if mesura.estat != MesuraInferencia.EXECUCIO:
+                return
+            inferencia = desar_inferencia(mesura, resultats) if mesura.model_id else None
+            _finalitzar(
+                id_mesura, MesuraInferencia.FINALITZADA,
+                resultats=resultats, informeCarrega=informe, informeRepeticions=informeRepeticions,
+                informeComparacio=informeComparacio, inferencia=inferencia,
+            )
+    finally:
+        close_old_connections()
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gaissalabel', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Estadistica',
+            fields=[
+                ('clau', models.CharField(max_length=200, primary_key=True, serialize=False, verbose_name='Clau')),
+                ('valor', models.BigIntegerField(default=0, verbose_name='Valor')),
+            ],
+            options={
+                'verbose_name_plural': 'Estadístiques',
+            },
+        ),
+        migrations.AddField(
+            model_name='entrenament',
+            name='qualificacio',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='entrenaments', to='gaissalabel.qualificacio', verbose_name='Qualificació'),
+        ),
+        migrations.AddField(
+            model_name='inferencia',
+            name='qualificacio',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='inferencies', to='gaissalabel.qualificacio', verbose_name='Qualificació'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gaissalabel', '0002_estadistiques'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entrenament',
+            index=models.Index(fields=['model', 'dataRegistre'], name='gl_entr_model_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inferencia',
+            index=models.Index(fields=['model', 'dataRegistre'], name='gl_inf_model_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resultatentrenament',
+            index=models.Index(fields=['metrica', 'valor'], name='gl_resentr_metrica_valor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='resultatinferencia',
+            index=models.Index(fields=['metrica', 'valor'], name='gl_resinf_metrica_valor_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gaissalabel', '0003_indexos_classificacions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MesuraInferencia',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, verbose_name='Identificador')),
+                ('endpoint', models.CharField(max_length=1000, verbose_name='Endpoint')),
+                ('entrada', models.TextField(verbose_name='Entrada')),
+                ('estat', models.CharField(choices=[('P', 'Pendent'), ('E', 'En execució'), ('F', 'Finalitzada'), ('C', 'Cancel·lada'), ('X', 'Error'), ('T', 'Temps esgotat')], default='P', max_length=1, verbose_name='Estat')),
+                ('tempsMaxim', models.PositiveIntegerField(verbose_name='Temps màxim')),
+                ('resultats', models.JSONField(blank=True, null=True, verbose_name='Resultats')),
+                ('error', models.CharField(blank=True, max_length=1000, null=True, verbose_name='Error')),
+                ('dataCreacio', models.DateTimeField(auto_now_add=True, verbose_name='Data creació')),
+                ('dataInici', models.DateTimeField(blank=True, null=True, verbose_name='Data inici')),
+                ('dataFi', models.DateTimeField(blank=True, null=True, verbose_name='Data fi')),
+                ('inferencia', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mesures', to='gaissalabel.inferencia', verbose_name='Inferència')),
+                ('model', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='mesures', to='gaissalabel.model', verbose_name='Model')),
+            ],
+            options={
+                'verbose_name_plural': 'Mesures inferència',
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gaissalabel', '0004_mesures_inferencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mesurainferencia',
+            name='carrega',
+            field=models.JSONField(blank=True, null=True, verbose_name='Càrrega'),
+        ),
+        migrations.AddField(
+            model_name='mesurainferencia',
+            name='informeCarrega',
+            field=models.JSONField(blank=True, null=True, verbose_name='Informe càrrega'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gaissalabel', '0005_carrega_mesures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mesurainferencia',
+            name='informeRepeticions',
+            field=models.JSONField(blank=True, null=True, verbose_name='Informe repeticions'),
+        ),
+        migrations.AddField(
+            model_name='mesurainferencia',
+            name='repeticions',
+            field=models.JSONField(blank=True, null=True, verbose_name='Repeticions'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.25 on 2026-10-19 15:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gaissalabel', '0006_repeticions_mesures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mesurainferencia',
+            name='comparacio',
+            field=models.JSONField(blank=True, null=True, verbose_name='Comparació'),
+        ),
+        migrations.AddField(
+            model_name='mesurainferencia',
+            name='informeComparacio',
+            field=models.JSONField(blank=True, null=True, verbose_name='Informe comparació'),
+        ),
+    ]
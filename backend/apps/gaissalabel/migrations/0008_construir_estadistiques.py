@@ -0,0 +1,35 @@
+from django.db import migrations
+from django.db.models import Count
+
+FASES_EXPERIMENTS = (('Entrenament', 'T', 'entrenaments'), ('Inferencia', 'I', 'inferencies'))
+FASES_RESULTATS = (('ResultatEntrenament', 'T'), ('ResultatInferencia', 'I'))
+
+
+def construir_estadistiques(apps, schema_editor):
+    # Same counters as estadistiques.comptar(), with the models of this migration. The final ratings of the
+    # existing experiments, and their counters, are computed by the next migration.
+    Estadistica = apps.get_model('gaissalabel', 'Estadistica')
+    comptadors = {'models': apps.get_model('gaissalabel', 'Model').objects.count()}
+    for model, fase, clau in FASES_EXPERIMENTS:
+        experiments = apps.get_model('gaissalabel', model).objects
+        comptadors[clau] = experiments.count()
+        for fila in experiments.filter(qualificacio__isnull=False).values('qualificacio').annotate(total=Count('pk')):
+            comptadors[f'qualificacio:{fase}:{fila["qualificacio"]}'] = fila['total']
+    for model, fase in FASES_RESULTATS:
+        resultats = apps.get_model('gaissalabel', model).objects.filter(valor__isnull=False)
+        for fila in resultats.values('metrica').annotate(total=Count('pk')):
+            comptadors[f'cobertura:{fase}:{fila["metrica"]}'] = fila['total']
+
+    Estadistica.objects.all().delete()
+    Estadistica.objects.bulk_create([Estadistica(clau=clau, valor=valor) for clau, valor in comptadors.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gaissalabel', '0007_comparacio_mesures'),
+    ]
+
+    operations = [
+        migrations.RunPython(construir_estadistiques, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count
+
+from apps.gaissalabel.calculators.rating_calculator_strategy import calculate_ratings
+
+EXPERIMENTS = (
+    ('Entrenament', 'ResultatEntrenament', 'entrenament', 'T'),
+    ('Inferencia', 'ResultatInferencia', 'inferencia', 'I'),
+)
+# Limits stored as infinite (see IntervalSerializer)
+INFINIT = 1e20
+MIDA_LOT = 1000
+
+
+def limit(valor, infinit):
+    return infinit if abs(valor) >= INFINIT else valor
+
+
+def qualificar_experiments(apps, schema_editor):
+    # Same ratings as estadistiques.requalificar(), with the models of this migration, and their counters
+    # recomputed (migration 0008 counted the experiments before they were rated)
+    Qualificacio = apps.get_model('gaissalabel', 'Qualificacio')
+    Metrica = apps.get_model('gaissalabel', 'Metrica')
+    Interval = apps.get_model('gaissalabel', 'Interval')
+    Estadistica = apps.get_model('gaissalabel', 'Estadistica')
+
+    qualificacions = list(Qualificacio.objects.order_by('ordre').values_list('id', flat=True))
+    for model, model_resultat, camp, fase in EXPERIMENTS:
+        experiments = apps.get_model('gaissalabel', model).objects
+        resultats_experiments = apps.get_model('gaissalabel', model_resultat).objects
+
+        pesos = dict(Metrica.objects.filter(fase=fase).order_by('-pes').exclude(pes=0).values_list('id', 'pes'))
+        boundaries = {id_metrica: [] for id_metrica in pesos}
+        intervals = Interval.objects.filter(metrica_id__in=pesos).order_by('metrica_id', 'qualificacio__ordre')
+        for id_metrica, superior, inferior in intervals.values_list('metrica_id', 'limitSuperior', 'limitInferior'):
+            boundaries[id_metrica].append([limit(superior, float('inf')), limit(inferior, float('-inf'))])
+
+        ids = list(experiments.order_by('pk').values_list('pk', flat=True))
+        for inici in range(0, len(ids), MIDA_LOT):
+            resultats = {pk: {} for pk in ids[inici:inici + MIDA_LOT]}
+            for pk, id_metrica, valor in resultats_experiments.filter(**{f'{camp}_id__in': list(resultats)}).values_list(
+                f'{camp}_id', 'metrica_id', 'valor'
+            ):
+                resultats[pk][id_metrica] = valor
+
+            lot = defaultdict(list)
+            for pk, valors in resultats.items():
+                # Weights aligned with the results of the weighted metrics, as in rating_calculator
+                utils = {id_metrica: valors[id_metrica] for id_metrica in pesos if id_metrica in valors}
+                try:
+                    qualificacio, _ = calculate_ratings(
+                        utils, boundaries, {id_metrica: pesos[id_metrica] for id_metrica in utils}, qualificacions
+                    )
+                except (IndexError, ValueError):
+                    qualificacio = None
+                lot[qualificacio].append(pk)
+            for qualificacio, pks in lot.items():
+                experiments.filter(pk__in=pks).update(qualificacio_id=qualificacio)
+
+        Estadistica.objects.filter(clau__startswith=f'qualificacio:{fase}:').delete()
+        Estadistica.objects.bulk_create([
+            Estadistica(clau=f'qualificacio:{fase}:{fila["qualificacio"]}', valor=fila['total'])
+            for fila in experiments.filter(qualificacio__isnull=False).values('qualificacio').annotate(total=Count('pk'))
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gaissalabel', '0008_construir_estadistiques'),
+    ]
+
+    operations = [
+        migrations.RunPython(qualificar_experiments, migrations.RunPython.noop),
+    ]
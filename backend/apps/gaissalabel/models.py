@@ -1,3 +1,5 @@
+import uuid
+
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import RegexValidator
 from django.db import models
@@ -18,6 +20,14 @@ class Entrenament(models.Model):
     id = models.AutoField(primary_key=True, verbose_name=_('Identificador'))
     dataRegistre = models.DateTimeField(auto_now_add=True, verbose_name=_('Data registre'))
     model = models.ForeignKey(Model, related_name='entrenaments', null=False, on_delete=models.CASCADE, verbose_name=_('Model'))
+    # Qualificació final calculada amb els resultats (es manté des de estadistiques.py)
+    qualificacio = models.ForeignKey('Qualificacio', related_name='entrenaments', null=True, blank=True, on_delete=models.SET_NULL, verbose_name=_('Qualificació'))
+
+    class Meta:
+        indexes = [
+            # Últim experiment de cada model
+            models.Index(fields=['model', 'dataRegistre'], name='gl_entr_model_data_idx'),
+        ]
 
     def __str__(self):
         return f'Entrenament {self.id} - {self.model.nom}'
@@ -27,9 +37,15 @@ class Inferencia(models.Model):
     id = models.AutoField(primary_key=True, verbose_name=_('Identificador'))
     dataRegistre = models.DateTimeField(auto_now_add=True, verbose_name=_('Data registre'))
     model = models.ForeignKey(Model, related_name='inferencies', null=False, on_delete=models.CASCADE, verbose_name=_('Model'))
+    # Qualificació final calculada amb els resultats (es manté des de estadistiques.py)
+    qualificacio = models.ForeignKey('Qualificacio', related_name='inferencies', null=True, blank=True, on_delete=models.SET_NULL, verbose_name=_('Qualificació'))
 
     class Meta:
         verbose_name_plural = _('Inferències')
+        indexes = [
+            # Últim experiment de cada model
+            models.Index(fields=['model', 'dataRegistre'], name='gl_inf_model_data_idx'),
+        ]
 
     def __str__(self):
         return f'Inferencia {self.id} - {self.model.nom}'
@@ -97,6 +113,12 @@ class ResultatEntrenament(models.Model):
     entrenament = models.ForeignKey(Entrenament, related_name='resultatsEntrenament', null=False, on_delete=models.CASCADE, verbose_name=_('Entrenament'))
     metrica = models.ForeignKey(Metrica, related_name='resultatsEntrenament', null=False, on_delete=models.CASCADE, verbose_name=_('Mètrica'))
 
+    class Meta:
+        indexes = [
+            # Rànquings de resultats per mètrica
+            models.Index(fields=['metrica', 'valor'], name='gl_resentr_metrica_valor_idx'),
+        ]
+
     def __str__(self):
         return f'{self.entrenament} - {self.metrica.nom}: {self.valor}'
 
@@ -108,6 +130,10 @@ class ResultatInferencia(models.Model):
 
     class Meta:
         verbose_name_plural = _('Resultat Inferències')
+        indexes = [
+            # Rànquings de resultats per mètrica
+            models.Index(fields=['metrica', 'valor'], name='gl_resinf_metrica_valor_idx'),
+        ]
 
     def __str__(self):
         return f'{self.inferencia} - {self.metrica.nom}: {self.valor}'
@@ -187,3 +213,68 @@ class TransformacioInformacio(models.Model):
 
     def __str__(self):
         return f'{self.informacio.nom} - {self.eina.nom}: {self.valor}'
+
+
+class Estadistica(models.Model):
+    # Comptador de les estadístiques de GAISSALabel, mantingut de forma incremental (veure estadistiques.py)
+    clau = models.CharField(primary_key=True, max_length=200, verbose_name=_('Clau'))
+    valor = models.BigIntegerField(default=0, verbose_name=_('Valor'))
+
+    class Meta:
+        verbose_name_plural = _('Estadístiques')
+
+    def __str__(self):
+        return f'{self.clau}: {self.valor}'
+
+
+class MesuraInferencia(models.Model):
+    # Mesura d'eficiència d'un endpoint d'inferència, executada en segon pla (veure mesures.py)
+    PENDENT = 'P'
+    EXECUCIO = 'E'
+    FINALITZADA = 'F'
+    CANCELLADA = 'C'
+    ERROR = 'X'
+    TEMPS_ESGOTAT = 'T'
+    TESTAT = (
+        (PENDENT, _('Pendent')),
+        (EXECUCIO, _('En execució')),
+        (FINALITZADA, _('Finalitzada')),
+        (CANCELLADA, _('Cancel·lada')),
+        (ERROR, _('Error')),
+        (TEMPS_ESGOTAT, _('Temps esgotat')),
+    )
+    ESTATS_FINALS = (FINALITZADA, CANCELLADA, ERROR, TEMPS_ESGOTAT)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, verbose_name=_('Identificador'))
+    endpoint = models.CharField(max_length=1000, null=False, blank=False, verbose_name=_('Endpoint'))
+    entrada = models.TextField(null=False, blank=False, verbose_name=_('Entrada'))
+    estat = models.CharField(choices=TESTAT, default=PENDENT, max_length=1, verbose_name=_('Estat'))
+    # Segons màxims de la petició a l'endpoint
+    tempsMaxim = models.PositiveIntegerField(verbose_name=_('Temps màxim'))
+    # Perfil de càrrega (veure calculators/load_generator.py). Si és null, es mesura una sola petició
+    carrega = models.JSONField(null=True, blank=True, verbose_name=_('Càrrega'))
+    resultats = models.JSONField(null=True, blank=True, verbose_name=_('Resultats'))
+    # Rendiment, latències i energia per petició de la càrrega
+    informeCarrega = models.JSONField(null=True, blank=True, verbose_name=_('Informe càrrega'))
+    # Repetició adaptativa (veure calculators/adaptive_repetition.py). Si és null, es fa una sola mesura
+    repeticions = models.JSONField(null=True, blank=True, verbose_name=_('Repeticions'))
+    # Estimació de l'energia per inferència amb el seu interval de confiança i nombre de mostres
+    informeRepeticions = models.JSONField(null=True, blank=True, verbose_name=_('Informe repeticions'))
+    # Comparació A/B (veure calculators/interleaved_comparison.py): endpoints optimitzats que es mesuren
+    # intercalats amb l'endpoint, que és la base
+    comparacio = models.JSONField(null=True, blank=True, verbose_name=_('Comparació'))
+    # Energia i latència per inferència de cada endpoint i reducció respecte de la base
+    informeComparacio = models.JSONField(null=True, blank=True, verbose_name=_('Informe comparació'))
+    error = models.CharField(max_length=1000, null=True, blank=True, verbose_name=_('Error'))
+    # Si s'informa, els resultats es desen com una inferència del model en acabar
+    model = models.ForeignKey(Model, related_name='mesures', null=True, blank=True, on_delete=models.CASCADE, verbose_name=_('Model'))
+    inferencia = models.ForeignKey(Inferencia, related_name='mesures', null=True, blank=True, on_delete=models.SET_NULL, verbose_name=_('Inferència'))
+    dataCreacio = models.DateTimeField(auto_now_add=True, verbose_name=_('Data creació'))
+    dataInici = models.DateTimeField(null=True, blank=True, verbose_name=_('Data inici'))
+    dataFi = models.DateTimeField(null=True, blank=True, verbose_name=_('Data fi'))
+
+    class Meta:
+        verbose_name_plural = _('Mesures inferència')
+
+    def __str__(self):
+        return f'{self.id} - {self.endpoint}: {self.get_estat_display()}'
@@ -2,39 +2,51 @@ from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from django.shortcuts import get_object_or_404
 
+from apps.core.fieldsets import SparseFieldsetSerializerMixin
+from .calculators.load_generator import PROFILES, CONSTANT, RAMP
 from .models import (
     Model, Entrenament, Inferencia, Metrica, Qualificacio, Interval, 
     ResultatEntrenament, ResultatInferencia, InfoAddicional, 
     ValorInfoEntrenament, ValorInfoInferencia, EinaCalcul, 
-    TransformacioMetrica, TransformacioInformacio
+    TransformacioMetrica, TransformacioInformacio, MesuraInferencia
 )
 
 
-class ModelSerializer(serializers.ModelSerializer):
+class ModelSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for ML models in GAISSALabel."""
-    
+    # Experiment summary annotated by ModelsView (see consultes.anotar_models)
+    numEntrenaments = serializers.IntegerField(read_only=True)
+    numInferencies = serializers.IntegerField(read_only=True)
+    ultimEntrenament = serializers.DateTimeField(read_only=True)
+    ultimaInferencia = serializers.DateTimeField(read_only=True)
+    qualificacioEntrenament = serializers.CharField(read_only=True)
+    qualificacioInferencia = serializers.CharField(read_only=True)
+    teAnalisiROI = serializers.BooleanField(read_only=True)
+
     class Meta:
         model = Model
         fields = '__all__'
 
 
-class EntrenamentSerializer(serializers.ModelSerializer):
+class EntrenamentSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Basic serializer for training sessions."""
     
     class Meta:
         model = Entrenament
         fields = '__all__'
+        read_only_fields = ('qualificacio',)
 
 
-class InferenciaSerializer(serializers.ModelSerializer):
+class InferenciaSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Basic serializer for inference sessions."""
     
     class Meta:
         model = Inferencia
         fields = '__all__'
+        read_only_fields = ('qualificacio',)
 
 
-class MetricaSerializer(serializers.ModelSerializer):
+class MetricaSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for creating metrics with intervals."""
     intervals = serializers.ListField(write_only=True)
 
@@ -54,7 +66,7 @@ class MetricaSerializer(serializers.ModelSerializer):
         fields = ('id', 'nom', 'fase', 'pes', 'unitat', 'influencia', 'descripcio', 'calcul', 'recomanacions', 'intervals')
 
 
-class QualificacioSerializer(serializers.ModelSerializer):
+class QualificacioSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for qualification/rating levels."""
     
     class Meta:
@@ -62,7 +74,7 @@ class QualificacioSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class IntervalBasicSerializer(serializers.ModelSerializer):
+class IntervalBasicSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Basic serializer for metric intervals."""
     
     class Meta:
@@ -96,6 +108,13 @@ class IntervalSerializer(IntervalBasicSerializer):
         fields = '__all__'
 
 
+class IntervalEdicioSerializer(serializers.Serializer):
+    """Edited interval of a metric (the rating is checked in bulk by the view)."""
+    qualificacio = serializers.CharField()
+    limitSuperior = serializers.FloatField(required=False)
+    limitInferior = serializers.FloatField(required=False)
+
+
 class MetricaAmbLimitsSerializer(MetricaSerializer):
     """Serializer for metrics with their interval limits."""
     intervals = IntervalBasicSerializer(many=True, read_only=True)
@@ -103,9 +122,10 @@ class MetricaAmbLimitsSerializer(MetricaSerializer):
     class Meta:
         model = Metrica
         fields = '__all__'
+        embedded_fields = ('intervals',)
 
 
-class EntrenamentAmbResultatSerializer(serializers.ModelSerializer):
+class EntrenamentAmbResultatSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for training sessions with results and additional info."""
     resultats = serializers.SerializerMethodField(read_only=True)
     resultats_info = serializers.JSONField(write_only=True)
@@ -152,7 +172,7 @@ class EntrenamentAmbResultatSerializer(serializers.ModelSerializer):
         fields = ('model', 'id', 'dataRegistre', 'resultats', 'resultats_info', 'infoAddicional', 'infoAddicional_valors')
 
 
-class InferenciaAmbResultatSerializer(serializers.ModelSerializer):
+class InferenciaAmbResultatSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for inference sessions with results and additional info."""
     resultats = serializers.SerializerMethodField(read_only=True)
     resultats_info = serializers.JSONField(write_only=True)
@@ -199,7 +219,7 @@ class InferenciaAmbResultatSerializer(serializers.ModelSerializer):
         fields = ('model', 'id', 'dataRegistre', 'resultats', 'resultats_info', 'infoAddicional', 'infoAddicional_valors')
 
 
-class InfoAddicionalSerializer(serializers.ModelSerializer):
+class InfoAddicionalSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for additional information configuration."""
     opcions_list = serializers.SerializerMethodField(read_only=True)
 
@@ -214,7 +234,7 @@ class InfoAddicionalSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class EinaCalculBasicSerializer(serializers.ModelSerializer):
+class EinaCalculBasicSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Basic serializer for calculation tools."""
     transformacionsMetriques = serializers.ListField(write_only=True, required=False)
     transformacionsInformacions = serializers.ListField(write_only=True, required=False)
@@ -249,21 +269,22 @@ class EinaCalculSerializer(EinaCalculBasicSerializer):
     def get_transformacionsMetriques(self, eina):
         transformacions = {}
         for transfMetrica in eina.transformacionsMetriques.all():
-            transformacions[transfMetrica.valor] = transfMetrica.metrica.id
+            transformacions[transfMetrica.valor] = transfMetrica.metrica_id
         return transformacions
 
     def get_transformacionsInformacions(self, eina):
         transformacions = {}
         for transfInfo in eina.transformacionsInformacions.all():
-            transformacions[transfInfo.valor] = transfInfo.informacio.id
+            transformacions[transfInfo.valor] = transfInfo.informacio_id
         return transformacions
 
     class Meta:
         model = EinaCalcul
         fields = ('id', 'nom', 'descripcio', 'transformacionsMetriques', 'transformacionsInformacions')
+        embedded_fields = ('transformacionsMetriques', 'transformacionsInformacions')
 
 
-class TransformacioMetricaSerializer(serializers.ModelSerializer):
+class TransformacioMetricaSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for metric transformations."""
     
     class Meta:
@@ -271,9 +292,72 @@ class TransformacioMetricaSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class TransformacioInformacioSerializer(serializers.ModelSerializer):
+class TransformacioInformacioSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Serializer for information transformations."""
     
     class Meta:
         model = TransformacioInformacio
         fields = '__all__'
+
+
+class TransformacioMetricaEdicioSerializer(serializers.Serializer):
+    """Edited metric transformation of a tool (the metric is checked in bulk by the view)."""
+    metrica = serializers.CharField()
+    valor = serializers.CharField(max_length=100)
+
+
+class TransformacioInformacioEdicioSerializer(serializers.Serializer):
+    """Edited information transformation of a tool (the information is checked in bulk by the view)."""
+    informacio = serializers.CharField()
+    valor = serializers.CharField(max_length=100)
+
+
+class CarregaSerializer(serializers.Serializer):
+    """Load profile of an inference efficiency measurement (see calculators/load_generator.py)."""
+    concurrencia = serializers.IntegerField(min_value=1, max_value=64, default=1)
+    peticions = serializers.IntegerField(min_value=1, max_value=100000, required=False, allow_null=True)
+    durada = serializers.FloatField(min_value=1, max_value=3600, default=60)
+    ritme = serializers.FloatField(min_value=0.01, required=False, allow_null=True)
+    perfil = serializers.ChoiceField(choices=PROFILES, default=CONSTANT)
+    ritmeInicial = serializers.FloatField(min_value=0, required=False, allow_null=True)
+
+    def validate(self, data):
+        if data['perfil'] == RAMP and not data.get('ritme'):
+            raise serializers.ValidationError(_('El perfil rampa necessita un ritme final.'))
+        return data
+
+
+class RepeticionsSerializer(serializers.Serializer):
+    """Adaptive repetition of an inference efficiency measurement (see calculators/adaptive_repetition.py)."""
+    escalfament = serializers.IntegerField(min_value=0, max_value=10, default=1)
+    midaLot = serializers.IntegerField(min_value=1, max_value=20, default=3)
+    ampladaRelativa = serializers.FloatField(min_value=0.001, max_value=10, default=0.1)
+    confianca = serializers.FloatField(min_value=0.5, max_value=0.999, default=0.95)
+    pressupostTemps = serializers.FloatField(min_value=1, max_value=3600, default=300)
+    minMostres = serializers.IntegerField(min_value=2, max_value=1000, default=3)
+    maxMostres = serializers.IntegerField(min_value=2, max_value=1000, default=30)
+
+    def validate(self, data):
+        if data['minMostres'] > data['maxMostres']:
+            raise serializers.ValidationError(_('El mínim de mostres no pot superar el màxim.'))
+        return data
+
+
+class ComparacioSerializer(serializers.Serializer):
+    """Interleaved A/B comparison of the endpoint, the baseline, with others (see calculators/interleaved_comparison.py)."""
+    endpoints = serializers.ListField(child=serializers.CharField(max_length=1000), min_length=1, max_length=4)
+    rondes = serializers.IntegerField(min_value=2, max_value=100, default=5)
+    escalfament = serializers.IntegerField(min_value=0, max_value=10, default=1)
+
+
+class MesuraInferenciaSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """Serializer for background efficiency measurements of inference endpoints."""
+
+    class Meta:
+        model = MesuraInferencia
+        fields = '__all__'
+        read_only_fields = (
+            'estat', 'resultats', 'informeCarrega', 'informeRepeticions', 'informeComparacio', 'error', 'inferencia',
+            'dataInici', 'dataFi'
+        )
+        extra_kwargs = {'tempsMaxim': {'min_value': 1, 'max_value': 3600}}
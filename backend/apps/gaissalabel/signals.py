@@ -0,0 +1,117 @@
+"""
+Signal receivers that keep the statistics counters (estadistiques.py), the stored final ratings and the
+catalogue version and tool mappings (cataleg.py) up to date on single-row writes.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.core.models import Configuracio
+from . import cataleg, estadistiques
+from .models import (
+    Model, Entrenament, Inferencia, ResultatEntrenament, ResultatInferencia, Qualificacio, Metrica, Interval
+)
+
+
+@receiver(post_save, sender=Model)
+def model_creat(sender, instance, created, **kwargs):
+    if created:
+        estadistiques.incrementar({'models': 1})
+
+
+@receiver(post_delete, sender=Model)
+def model_esborrat(sender, instance, **kwargs):
+    estadistiques.incrementar({'models': -1})
+
+
+def _deltes_experiment(sender, instance, signe):
+    fase = estadistiques.FASE_EXPERIMENT[sender]
+    deltes = {estadistiques.CLAU_EXPERIMENTS[fase]: signe}
+    if instance.qualificacio_id is not None:
+        deltes[estadistiques.clau_qualificacio(fase, instance.qualificacio_id)] = signe
+    return deltes
+
+
+@receiver(post_save, sender=Entrenament)
+@receiver(post_save, sender=Inferencia)
+def experiment_creat(sender, instance, created, **kwargs):
+    # Later rating changes go through estadistiques.actualitzar_qualificacio
+    if created:
+        estadistiques.incrementar(_deltes_experiment(sender, instance, 1))
+
+
+@receiver(post_delete, sender=Entrenament)
+@receiver(post_delete, sender=Inferencia)
+def experiment_esborrat(sender, instance, **kwargs):
+    estadistiques.incrementar(_deltes_experiment(sender, instance, -1))
+
+
+@receiver(pre_save, sender=ResultatEntrenament)
+@receiver(pre_save, sender=ResultatInferencia)
+def resultat_desant(sender, instance, update_fields=None, **kwargs):
+    # Whether the stored row has a value, to know how the save changes the coverage. Only updates of
+    # "valor" read it, and only that column.
+    if instance.pk is None or (update_fields is not None and 'valor' not in update_fields):
+        return
+    instance._valor_informat = sender.objects.filter(pk=instance.pk, valor__isnull=False).exists()
+
+
+@receiver(post_save, sender=ResultatEntrenament)
+@receiver(post_save, sender=ResultatInferencia)
+def resultat_desat(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'valor' not in update_fields:
+        return
+    informat = instance.valor is not None
+    abans = False if created else instance._valor_informat
+    if informat != abans:
+        fase = estadistiques.FASE_RESULTAT[sender]
+        estadistiques.incrementar({estadistiques.clau_cobertura(fase, instance.metrica_id): 1 if informat else -1})
+
+
+@receiver(post_delete, sender=ResultatEntrenament)
+@receiver(post_delete, sender=ResultatInferencia)
+def resultat_esborrat(sender, instance, **kwargs):
+    if instance.valor is not None:
+        fase = estadistiques.FASE_RESULTAT[sender]
+        estadistiques.incrementar({estadistiques.clau_cobertura(fase, instance.metrica_id): -1})
+
+
+@receiver(post_save, sender=Configuracio)
+def configuracio_desada(sender, instance, **kwargs):
+    # The snapshot includes the date of the last synchronization
+    estadistiques.snapshot.invalidate()
+
+
+def cataleg_modificat(sender, **kwargs):
+    # Grouped edits are invalidated once, at the end (see cataleg.modificacio)
+    if not cataleg.modificacio_en_curs():
+        cataleg.invalidar()
+
+
+@receiver(pre_save, sender=Metrica)
+def metrica_desant(sender, instance, **kwargs):
+    # Whether the save changes the weight or the phase of a stored metric, which rate the experiments
+    instance._qualifica_diferent = sender.objects.filter(pk=instance.pk).exclude(
+        pes=instance.pes, fase=instance.fase
+    ).exists()
+
+
+@receiver(post_save, sender=Metrica)
+def metrica_desada(sender, instance, **kwargs):
+    if getattr(instance, '_qualifica_diferent', False):
+        cataleg.requalificar()
+
+
+@receiver(post_save, sender=Qualificacio)
+@receiver(post_delete, sender=Qualificacio)
+@receiver(post_delete, sender=Metrica)
+@receiver(post_save, sender=Interval)
+@receiver(post_delete, sender=Interval)
+def qualificacions_modificades(sender, **kwargs):
+    # A deleted rating leaves its experiments without one (SET_NULL, no signals): recomputing the ratings
+    # also rebuilds the counters, so the ones of the deleted rating are moved to the new ratings
+    cataleg.requalificar()
+
+
+for model_cataleg in cataleg.MODELS_CATALEG:
+    post_save.connect(cataleg_modificat, sender=model_cataleg, dispatch_uid=f'cataleg_desat_{model_cataleg.__name__}')
+    post_delete.connect(cataleg_modificat, sender=model_cataleg, dispatch_uid=f'cataleg_esborrat_{model_cataleg.__name__}')
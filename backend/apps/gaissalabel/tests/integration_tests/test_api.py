@@ -0,0 +1,436 @@
+import io
+import json
+from unittest import mock
+
+import pyarrow.parquet as pq
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+
+from apps.core.versioning import get_version
+from apps.gaissa_roi_analyzer.models import (
+    MLPipelineStage, MLTactic, ModelArchitecture, ROIAnalysisCalculation, TacticParameterOption
+)
+from apps.gaissalabel import estadistiques, importacio, mesures
+from apps.gaissalabel import cataleg
+from apps.gaissalabel.cataleg import VERSIO_CATALEG
+from apps.gaissalabel.models import Model, Entrenament, Inferencia, MesuraInferencia, Metrica, Qualificacio
+from .test_setup import TestGAISSALabelAPISetup
+
+# NOTE: These tests focus on API endpoints, HTTP behavior and request/response contracts.
+# Business logic is covered by the unit tests.
+
+
+class EstadistiquesAPITest(TestGAISSALabelAPISetup):
+    """Integration tests for the statistics endpoint"""
+
+    def assertSameAsAggregation(self, data):
+        """The old endpoint counted the rows of each table; the rest is compared with aggregate queries"""
+        self.assertEqual(data['numModels'], Model.objects.count())
+        self.assertEqual(data['numEntrenaments'], Entrenament.objects.count())
+        self.assertEqual(data['numInferencies'], Inferencia.objects.count())
+
+        comptadors = estadistiques.comptar()
+        for fase in (Metrica.TRAIN, Metrica.INF):
+            for qualificacio, valor in data['distribucioQualificacions'][fase].items():
+                self.assertEqual(valor, comptadors[estadistiques.clau_qualificacio(fase, qualificacio)])
+            for metrica, valor in data['coberturaMetriques'][fase].items():
+                self.assertEqual(valor, comptadors[estadistiques.clau_cobertura(fase, metrica)])
+        self.assertEqual(
+            sum(len(data[camp][fase]) for camp in ('distribucioQualificacions', 'coberturaMetriques') for fase in (Metrica.TRAIN, Metrica.INF)),
+            len([valor for clau, valor in comptadors.items() if ':' in clau and valor]),
+        )
+
+    def test_get_statistics(self):
+        """Test GET /api/gaissalabel/estadistiques/"""
+        response = self.client.get(reverse('estadistiques-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertSameAsAggregation(response.data)
+        self.assertEqual(response.data['numModels'], 2)
+        self.assertEqual(response.data['coberturaMetriques'][Metrica.TRAIN], {'emissions': 2, 'duration': 1})
+
+    def test_statistics_after_writes(self):
+        """Test that the statistics follow the writes made through the API and the models"""
+        self.client.get(reverse('estadistiques-list'))
+
+        response = self.client.post(
+            reverse('inferencies-list', kwargs={'model_id': self.other_model.id}),
+            {'resultats_info': {'energy': 5, 'accuracy': 0.7}, 'infoAddicional_valors': {}}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.model.delete()
+
+        response = self.client.get(reverse('estadistiques-list'))
+        self.assertSameAsAggregation(response.data)
+        self.assertEqual(response.data['numInferencies'], 1)
+        self.assertEqual(response.data['distribucioQualificacions'][Metrica.INF], {'A': 1})
+
+    def test_distribution_after_catalogue_edits(self):
+        """Test that editing the intervals or deleting a metric through the API re-rates the experiments"""
+        estadistiques.reconstruir(qualificacions=True)
+        self.assertEqual(self.client.get(reverse('estadistiques-list')).data['distribucioQualificacions'][Metrica.INF], {'C': 1})
+
+        self.authenticate_as_admin()
+        response = self.client.patch(reverse('metriques-detail', args=['energy']), {
+            'intervals': [{'qualificacio': 'B', 'limitSuperior': 1000}, {'qualificacio': 'C', 'limitInferior': 1000}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse('estadistiques-list'))
+        self.assertSameAsAggregation(response.data)
+        self.assertEqual(response.data['distribucioQualificacions'][Metrica.INF], {'B': 1})
+
+        response = self.client.delete(reverse('metriques-detail', args=['duration']))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.get(reverse('estadistiques-list'))
+        self.assertSameAsAggregation(response.data)
+        # Rated by their emissions alone
+        self.assertEqual(response.data['distribucioQualificacions'][Metrica.TRAIN], {'A': 1, 'C': 1})
+
+
+class CatalegVersionatAPITest(TestGAISSALabelAPISetup):
+    """Integration tests for the ETag revalidation and cache of the catalogue endpoints"""
+
+    def get(self, url, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **headers)
+        # Whether the ratings were read from the database
+        response.read_table = any('gaissalabel_qualificacio' in query['sql'] for query in queries.captured_queries)
+        return response
+
+    def test_etag(self):
+        """Test that the response carries a strong ETag of the catalogue version and Cache-Control"""
+        response = self.get(reverse('qualificacions-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertRegex(response['ETag'], rf'^"{get_version(VERSIO_CATALEG)}-[0-9a-f]{{32}}"$')
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertIn('must-revalidate', response['Cache-Control'])
+
+        # Same version and request: same ETag. Another media type or path: another ETag
+        self.assertEqual(self.get(reverse('qualificacions-list'))['ETag'], response['ETag'])
+        self.assertNotEqual(self.get(reverse('qualificacions-list'), HTTP_ACCEPT='application/msgpack')['ETag'], response['ETag'])
+        self.assertNotEqual(self.get(reverse('qualificacions-detail', args=['A']))['ETag'], response['ETag'])
+
+    def test_not_modified(self):
+        """Test that If-None-Match with the current ETag gets a 304 without reading the catalogue"""
+        etag = self.get(reverse('qualificacions-list'))['ETag']
+        for if_none_match in (etag, f'W/{etag}', f'"other", {etag}'):
+            response = self.get(reverse('qualificacions-list'), HTTP_IF_NONE_MATCH=if_none_match)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response['ETag'], etag)
+            self.assertFalse(response.read_table)
+
+        response = self.get(reverse('qualificacions-list'), HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_rendered_response_is_cached(self):
+        """Test that the same version is served from the cache without reading the catalogue"""
+        first = self.get(reverse('qualificacions-list'))
+        self.assertTrue(first.read_table)
+        second = self.get(reverse('qualificacions-list'))
+        self.assertFalse(second.read_table)
+        self.assertEqual(second.content, first.content)
+
+    def test_catalogue_writes_invalidate(self):
+        """Test that a catalogue write through the API changes the ETag and the cached response"""
+        response = self.get(reverse('metriques-detail', args=['emissions']))
+        etag = response['ETag']
+
+        self.authenticate_as_admin()
+        update = self.client.patch(reverse('metriques-detail', args=['emissions']), {'nom': 'CO2 emissions'}, format='json')
+        self.assertEqual(update.status_code, status.HTTP_200_OK)
+
+        response = self.get(reverse('metriques-detail', args=['emissions']), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['nom'], 'CO2 emissions')
+
+    def test_model_writes_invalidate(self):
+        """Test that a catalogue write outside the API (signals) changes the ETag"""
+        etag = self.get(reverse('qualificacions-list'))['ETag']
+        Qualificacio.objects.create(id='D', color='#000000', ordre=4)
+
+        response = self.get(reverse('qualificacions-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([qualificacio['id'] for qualificacio in response.data], ['A', 'B', 'C', 'D'])
+
+    def test_tool_edit_rebuilds_mappings(self):
+        """Test that editing the transformations of a tool through the API rebuilds its compiled mappings"""
+        self.create_codecarbon()
+        self.assertEqual(cataleg.mapatge_eina('CodeCarbon', Metrica.INF).columnes_metriques, {'energy': 'energy_consumed'})
+
+        self.authenticate_as_admin()
+        response = self.client.patch(
+            reverse('eines_calcul-detail', args=[self.codecarbon.id]),
+            {'transformacionsMetriques': [{'metrica': 'energy', 'valor': 'energy_kwh'}, {'metrica': 'accuracy', 'valor': 'acc'}]},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            cataleg.mapatge_eina('CodeCarbon', Metrica.INF).columnes_metriques, {'energy': 'energy_kwh', 'accuracy': 'acc'},
+        )
+        self.assertIsNone(cataleg.mapatge_eina('CodeCarbon', Metrica.TRAIN))
+
+
+class LeaderboardAPITest(TestGAISSALabelAPISetup):
+    """Integration tests for the per-metric leaderboard endpoint"""
+
+    def test_get_leaderboard(self):
+        """Test GET /api/gaissalabel/metriques/{id}/leaderboard/"""
+        response = self.client.get(reverse('metriques-leaderboard', args=['emissions']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['metrica'], 'emissions')
+        self.assertEqual(response.data['fase'], Metrica.TRAIN)
+        self.assertEqual(response.data['unitat'], 'kg')
+        self.assertEqual(response.data['experiment'], 'latest')
+        self.assertEqual([fila['nomModel'] for fila in response.data['resultats']], ['bert-base', 'resnet50'])
+
+    def test_parameters(self):
+        """Test that k is bounded and that wrong parameters fall back to the defaults"""
+        url = reverse('metriques-leaderboard', args=['emissions'])
+        self.assertEqual(len(self.client.get(url, {'k': 1}).data['resultats']), 1)
+        self.assertEqual(len(self.client.get(url, {'k': 0}).data['resultats']), 1)
+        self.assertEqual(len(self.client.get(url, {'k': 'abc'}).data['resultats']), 2)
+        self.assertEqual(self.client.get(url, {'experiment': 'best'}).data['experiment'], 'best')
+        self.assertEqual(self.client.get(url, {'experiment': 'worst'}).data['experiment'], 'latest')
+
+    def test_unknown_metric(self):
+        """Test that the leaderboard of a metric that does not exist is a 404"""
+        response = self.client.get(reverse('metriques-leaderboard', args=['unknown']))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ModelsAPITest(TestGAISSALabelAPISetup):
+    """Integration tests for the experiment summary, filters and ordering of the model list"""
+
+    def setUp(self):
+        super().setUp()
+        for experiment in (self.training, self.other_training):
+            estadistiques.actualitzar_qualificacio(experiment)
+        stage = MLPipelineStage.objects.create(name='Training')
+        arquitectura = ModelArchitecture.objects.create(name='ResNet')
+        tactic = MLTactic.objects.create(name='Pruning', pipeline_stage=stage)
+        tactic.compatible_architectures.add(arquitectura)
+        opcio = TacticParameterOption.objects.create(tactic=tactic, name='sparsity', value='0.5')
+        ROIAnalysisCalculation.objects.create(
+            model_architecture=arquitectura, tactic_parameter_option=opcio, gaissalabel_model=self.other_model
+        )
+        # Named as a model, but not linked to it
+        ROIAnalysisCalculation.objects.create(
+            model_architecture=ModelArchitecture.objects.create(name='bert-base'), tactic_parameter_option=opcio
+        )
+
+    def noms(self, **params):
+        response = self.client.get(reverse('models-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [model['nom'] for model in response.data]
+
+    def test_summary_fields(self):
+        """Test that each model of the list carries its experiment summary"""
+        response = self.client.get(reverse('models-detail', args=[self.model.id]))
+        self.assertEqual(response.data['numEntrenaments'], 1)
+        self.assertEqual(response.data['numInferencies'], 1)
+        self.assertEqual(response.data['qualificacioEntrenament'], 'A')
+        self.assertIsNone(response.data['qualificacioInferencia'])
+        self.assertFalse(response.data['teAnalisiROI'])
+        self.assertIsNotNone(response.data['ultimEntrenament'])
+
+    def test_has_roi_analysis(self):
+        """Test the has_roi_analysis filter, on the analyses linked to each model"""
+        self.assertEqual(self.noms(has_roi_analysis='true'), ['resnet50'])
+        self.assertEqual(self.noms(has_roi_analysis='false'), ['bert-base'])
+        self.assertEqual(len(self.noms()), 2)
+
+    def test_summary_filters(self):
+        """Test the filters on the number of experiments and the rating of the latest one"""
+        self.assertEqual(self.noms(numInferencies__gte=1), ['bert-base'])
+        self.assertEqual(self.noms(numInferencies=0), ['resnet50'])
+        self.assertEqual(self.noms(numEntrenaments__lte=1, numEntrenaments__gte=1), ['bert-base', 'resnet50'])
+        self.assertEqual(self.noms(qualificacioEntrenament='C'), ['resnet50'])
+        self.assertEqual(self.noms(qualificacioEntrenament='A,C'), ['bert-base', 'resnet50'])
+        self.assertEqual(self.noms(ultimaInferencia__gte=self.inference.dataRegistre.isoformat()), ['bert-base'])
+
+    def test_summary_ordering(self):
+        """Test that the list can be ordered by the summary"""
+        self.assertEqual(self.noms(ordering='-numInferencies'), ['bert-base', 'resnet50'])
+        self.assertEqual(self.noms(ordering='-qualificacioEntrenament'), ['resnet50', 'bert-base'])
+        self.assertEqual(self.noms(ordering='-teAnalisiROI'), ['resnet50', 'bert-base'])
+
+
+class ComparacionsAPITest(TestGAISSALabelAPISetup):
+    """Integration tests for the experiment comparison endpoint"""
+
+    def get(self, **params):
+        return self.client.get(reverse('comparacions-list'), params)
+
+    def test_get_comparison(self):
+        """Test GET /api/gaissalabel/comparacions/ (the first experiment is the default baseline)"""
+        response = self.get(fase=Metrica.TRAIN, experiments=f'{self.training.id},{self.other_training.id}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['baseline'], self.training.id)
+        self.assertEqual([experiment['id'] for experiment in response.data['experiments']], [self.training.id, self.other_training.id])
+        self.assertEqual(response.data['experiments'][1]['diferencies']['emissions']['absoluta'], 495)
+
+        response = self.get(fase=Metrica.TRAIN, experiments=f'{self.training.id},{self.other_training.id}', baseline=self.other_training.id)
+        self.assertEqual(response.data['experiments'][0]['diferencies']['emissions']['absoluta'], -495)
+
+    def test_wrong_parameters(self):
+        """Test that wrong phases, identifiers and baselines are rejected with 400"""
+        ids = f'{self.training.id},{self.other_training.id}'
+        self.assertEqual(self.get(experiments=ids).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get(fase='X', experiments=ids).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get(fase=Metrica.TRAIN).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get(fase=Metrica.TRAIN, experiments='a,b').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get(fase=Metrica.TRAIN, experiments=ids, baseline=self.inference.id + 100).status_code, status.HTTP_400_BAD_REQUEST)
+        too_many = ','.join(str(self.training.id) for _ in range(21))
+        self.assertEqual(self.get(fase=Metrica.TRAIN, experiments=too_many).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_experiment(self):
+        """Test that comparing an experiment that does not exist is a 404"""
+        response = self.get(fase=Metrica.INF, experiments=f'{self.inference.id},{self.training.id + 1000}')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ImportacioAPITest(TestGAISSALabelAPISetup):
+    """Integration tests for the CSV import actions of the trainings and inferences"""
+
+    def setUp(self):
+        super().setUp()
+        self.create_codecarbon()
+
+    def importar(self, basename, *continguts, **data):
+        fitxers = [SimpleUploadedFile(f'emissions{i}.csv', contingut, content_type='text/csv') for i, contingut in enumerate(continguts)]
+        return self.client.post(
+            reverse(f'{basename}-importar', kwargs={'model_id': self.other_model.id}),
+            {'fitxers': fitxers, **data}, format='multipart',
+        )
+
+    def test_import_inferences(self):
+        """Test POST /api/gaissalabel/models/{id}/inferencies/importar/ with two files"""
+        response = self.importar(
+            'inferencies', b'energy_consumed,gpu_model\n5,A100\n', b'energy_consumed,gpu_model\n500,\n50,V100\n',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'numFitxers': 2, 'numExperiments': 3, 'numResultats': 3, 'numInformacions': 2})
+        self.assertEqual(
+            sorted(Inferencia.objects.filter(model=self.other_model).values_list('qualificacio_id', flat=True)),
+            ['A', 'B', 'C'],
+        )
+
+    def test_import_trainings(self):
+        """Test POST /api/gaissalabel/models/{id}/entrenaments/importar/"""
+        response = self.importar('entrenaments', b'emissions,duration\n5,5\n')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['numExperiments'], 1)
+        self.assertEqual(Entrenament.objects.filter(model=self.other_model).count(), 2)
+
+    def test_wrong_requests(self):
+        """Test that no files, an unknown tool and an unknown model are rejected"""
+        self.assertEqual(self.importar('inferencies').status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.importar('inferencies', b'energy_consumed\n5\n', eina='MLCO2')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(
+            reverse('inferencies-importar', kwargs={'model_id': 9999}),
+            {'fitxers': [SimpleUploadedFile('emissions.csv', b'energy_consumed\n5\n')]}, format='multipart',
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_file_imports_nothing(self):
+        """Test that a file that is not UTF-8 is a 400 and the files before it are not imported"""
+        with mock.patch.object(importacio, 'MIDA_LOT', 1):
+            response = self.importar('inferencies', b'energy_consumed\n5\n', b'energy_consumed\n\xff\xfe\n')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Inferencia.objects.filter(model=self.other_model).exists())
+
+
+class CalculadorInferenciaAPITest(TestGAISSALabelAPISetup):
+    """Integration tests for the background inference efficiency measurements"""
+
+    def setUp(self):
+        super().setUp()
+        # Submitted jobs are run by the tests (the executor would run them in another thread)
+        patcher = mock.patch.object(mesures, 'enviar')
+        self.enviar = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(mesures, 'close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create(self, **data):
+        return self.client.post(
+            reverse('calculador_inferencia-list'),
+            {'endpoint': 'http://localhost/predict', 'input': '{"text": "hola"}', **data}, format='json',
+        )
+
+    def test_measure_and_poll(self):
+        """Test POST /api/gaissalabel/calculadors/inferencia/ and polling the measurement until it finishes"""
+        response = self.create(model=self.other_model.id, tempsMaxim=10)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual((response.data['estat'], response.data['tempsMaxim']), (MesuraInferencia.PENDENT, 10))
+        mesura = self.enviar.call_args.args[0]
+        url = reverse('calculador_inferencia-detail', args=[response.data['id']])
+        self.assertEqual(self.client.get(url).data['estat'], MesuraInferencia.PENDENT)
+
+        with mock.patch.object(mesures, 'calculateEfficiency', return_value={'energy': 50}):
+            mesures.executar(mesura.id)
+        response = self.client.get(url)
+        self.assertEqual(response.data['estat'], MesuraInferencia.FINALITZADA)
+        self.assertEqual(response.data['resultats'], {'energy': 50})
+        inferencia = Inferencia.objects.get(pk=response.data['inferencia'])
+        self.assertEqual((inferencia.model, inferencia.qualificacio_id), (self.other_model, 'B'))
+
+    def test_cancel(self):
+        """Test POST /api/gaissalabel/calculadors/inferencia/{id}/cancellar/ before the measurement runs"""
+        mesura_id = self.create().data['id']
+        url = reverse('calculador_inferencia-cancellar', args=[mesura_id])
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['estat'], MesuraInferencia.CANCELLADA)
+
+        with mock.patch.object(mesures, 'calculateEfficiency') as calcular:
+            mesures.executar(mesura_id)
+        calcular.assert_not_called()
+        self.assertEqual(self.client.get(reverse('calculador_inferencia-detail', args=[mesura_id])).data['estat'], MesuraInferencia.CANCELLADA)
+        # Already finished
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_409_CONFLICT)
+
+    def test_wrong_requests(self):
+        """Test that measurements without endpoint or input, or with repetitions and a comparison, are rejected"""
+        response = self.client.post(reverse('calculador_inferencia-list'), {'endpoint': 'http://localhost/predict'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.create(repeticions={}, comparacio={'endpoints': ['http://optimized/predict']})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.create(tempsMaxim=0).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.create(carrega={'perfil': 'rampa'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.enviar.assert_not_called()
+        self.assertFalse(MesuraInferencia.objects.exists())
+
+
+class ExportacioAPITest(TestGAISSALabelAPISetup):
+    """Integration tests for the streaming export endpoint"""
+
+    def test_csv_by_default(self):
+        """Test GET /api/gaissalabel/exportacio/ (CSV, streamed as an attachment)"""
+        response = self.client.get(reverse('exportacio-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="gaissalabel.csv"')
+        linies = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(linies), 4)
+
+    def test_formats_and_filters(self):
+        """Test the NDJSON and Parquet formats and the phase, model and date filters"""
+        response = self.client.get(reverse('exportacio-list'), {'tipus': 'ndjson', 'fase': Metrica.TRAIN, 'models': str(self.model.id)})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([json.loads(linia)['experiment'] for linia in b''.join(response.streaming_content).splitlines()], [self.training.id])
+
+        response = self.client.get(reverse('exportacio-list'), {'tipus': 'parquet', 'des': '2000-01-01', 'fins': '2000-01-02T00:00:00'})
+        self.assertEqual(response['Content-Type'], 'application/vnd.apache.parquet')
+        self.assertEqual(pq.read_table(io.BytesIO(b''.join(response.streaming_content))).num_rows, 0)
+
+    def test_wrong_parameters(self):
+        """Test that wrong formats, phases, models and dates are rejected with 400"""
+        for params in ({'tipus': 'xlsx'}, {'fase': 'X'}, {'models': 'a'}, {'des': '2024-13-01'}, {'fins': 'ahir'}):
+            self.assertEqual(self.client.get(reverse('exportacio-list'), params).status_code, status.HTTP_400_BAD_REQUEST, params)
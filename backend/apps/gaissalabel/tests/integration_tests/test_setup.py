@@ -0,0 +1,84 @@
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.core.models import Administrador
+from apps.gaissalabel.models import (
+    Model, Entrenament, Inferencia, Metrica, Qualificacio, Interval, ResultatEntrenament, ResultatInferencia,
+    InfoAddicional, EinaCalcul, TransformacioMetrica, TransformacioInformacio
+)
+
+User = get_user_model()
+
+
+class GAISSALabelDataMixin:
+    """Catalogue and experiments shared by the GAISSALabel tests"""
+
+    def create_catalogue(self):
+        """Ratings A-C and metrics of both phases, rated by their value (lower is better)"""
+        self.qualificacions = [
+            Qualificacio.objects.create(id=id, color=color, ordre=ordre)
+            for ordre, (id, color) in enumerate([('A', '#00ff00'), ('B', '#ffff00'), ('C', '#ff0000')], start=1)
+        ]
+        self.emissions = Metrica.objects.create(id='emissions', nom='Emissions', fase=Metrica.TRAIN, pes=0.5, unitat='kg', influencia=Metrica.NEGATIVA)
+        self.duration = Metrica.objects.create(id='duration', nom='Duration', fase=Metrica.TRAIN, pes=0.5, unitat='s', influencia=Metrica.NEGATIVA)
+        self.energy = Metrica.objects.create(id='energy', nom='Energy', fase=Metrica.INF, pes=1, unitat='kWh', influencia=Metrica.NEGATIVA)
+        self.accuracy = Metrica.objects.create(id='accuracy', nom='Accuracy', fase=Metrica.INF, pes=0, influencia=Metrica.POSITIVA)
+        for metrica in (self.emissions, self.duration, self.energy):
+            for qualificacio, (superior, inferior) in zip(self.qualificacions, [(10, 0), (100, 10), (10 ** 9, 100)]):
+                Interval.objects.create(metrica=metrica, qualificacio=qualificacio, limitSuperior=superior, limitInferior=inferior)
+
+    def create_codecarbon(self):
+        """CodeCarbon tool mapping its CSV columns to the metrics of both phases and to the inference hardware"""
+        self.hardware = InfoAddicional.objects.create(id='hardware', nom='Hardware', fase=InfoAddicional.INF)
+        self.codecarbon = EinaCalcul.objects.create(nom='CodeCarbon')
+        for metrica, columna in [
+            (self.emissions, 'emissions'), (self.duration, 'duration'), (self.energy, 'energy_consumed'),
+        ]:
+            TransformacioMetrica.objects.create(eina=self.codecarbon, metrica=metrica, valor=columna)
+        TransformacioInformacio.objects.create(eina=self.codecarbon, informacio=self.hardware, valor='gpu_model')
+
+    def create_training(self, model, **resultats):
+        entrenament = Entrenament.objects.create(model=model)
+        for metrica, valor in resultats.items():
+            ResultatEntrenament.objects.create(entrenament=entrenament, metrica_id=metrica, valor=valor)
+        return entrenament
+
+    def create_inference(self, model, **resultats):
+        inferencia = Inferencia.objects.create(model=model)
+        for metrica, valor in resultats.items():
+            ResultatInferencia.objects.create(inferencia=inferencia, metrica_id=metrica, valor=valor)
+        return inferencia
+
+
+class TestGAISSALabelAPISetup(GAISSALabelDataMixin, TestCase):
+    """Shared setup for GAISSALabel API integration tests"""
+
+    def setUp(self):
+        """Set up the catalogue, two models with experiments and the users"""
+        self.client = APIClient()
+
+        self.admin_user = User.objects.create_user(
+            username='admin_user', email=f"{uuid.uuid4()}@test.com", password='testpass123',
+        )
+        Administrador.objects.create(user=self.admin_user)
+        self.regular_user = User.objects.create_user(
+            username='regular_user', email=f"{uuid.uuid4()}@test.com", password='testpass123',
+        )
+
+        self.create_catalogue()
+        self.model = Model.objects.create(nom='bert-base', autor='google')
+        self.other_model = Model.objects.create(nom='resnet50', autor='microsoft')
+        self.training = self.create_training(self.model, emissions=5, duration=50)
+        self.inference = self.create_inference(self.model, energy=200, accuracy=0.9)
+        self.other_training = self.create_training(self.other_model, emissions=500, duration=None)
+
+    def authenticate_as_admin(self):
+        """Helper to authenticate as admin user"""
+        self.client.force_authenticate(user=self.admin_user)
+
+    def authenticate_as_regular_user(self):
+        """Helper to authenticate as regular user"""
+        self.client.force_authenticate(user=self.regular_user)
@@ -0,0 +1,97 @@
+from django.test import SimpleTestCase
+
+from apps.gaissalabel.calculators.adaptive_repetition import (
+    RepetitionPolicy, confidence_interval, repeat_until_stable,
+    STOP_CONVERGED, STOP_TIME, STOP_SAMPLES, STOP_CANCELLED,
+)
+
+
+class FakeClock:
+    """Clock that advances a fixed step every time a measurement is taken."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeMeasure:
+    """Measurement returning the given values in turn, advancing the clock by ``step`` seconds each time."""
+
+    def __init__(self, values, clock, step=1.0):
+        self.values = list(values)
+        self.clock = clock
+        self.step = step
+        self.calls = []
+
+    def __call__(self, warmup):
+        self.calls.append(warmup)
+        self.clock.now += self.step
+        return self.values[(len(self.calls) - 1) % len(self.values)]
+
+
+class AdaptiveRepetitionTest(SimpleTestCase):
+    """Unit tests for the adaptive repetition of measurements, with a fake measurement and clock"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_confidence_interval(self):
+        """Test the t confidence interval against a known value"""
+        mean, lower, upper = confidence_interval([1, 2, 3], 0.95)
+        self.assertAlmostEqual(mean, 2)
+        # t(0.975, 2) = 4.3027, std = 1, n = 3
+        self.assertAlmostEqual(upper - mean, 4.302653 / 3 ** 0.5, places=5)
+        self.assertAlmostEqual(mean - lower, upper - mean)
+
+    def test_stable_measurements_converge_early(self):
+        """Test that a stable endpoint stops after the first batch, with the warm-up discarded"""
+        measure = FakeMeasure([100, 10, 10.1, 9.9], self.clock)
+        report = repeat_until_stable(measure, RepetitionPolicy(warmup=1, batch=3), clock=self.clock)
+        self.assertEqual(measure.calls, [True, False, False, False])
+        self.assertEqual(report['motiuAturada'], STOP_CONVERGED)
+        self.assertEqual(report['numMostres'], 3)
+        self.assertAlmostEqual(report['estimacio'], 10)
+        self.assertLessEqual(report['ampladaRelativa'], 0.1)
+        self.assertLess(report['limitInferior'], 10)
+        self.assertGreater(report['limitSuperior'], 10)
+
+    def test_noisy_measurements_stop_at_max_samples(self):
+        """Test that a noisy endpoint stops at the maximum number of samples"""
+        measure = FakeMeasure([1, 10], self.clock)
+        report = repeat_until_stable(
+            measure, RepetitionPolicy(warmup=0, batch=4, max_samples=10, time_budget=1000), clock=self.clock
+        )
+        self.assertEqual(report['motiuAturada'], STOP_SAMPLES)
+        self.assertEqual(report['numMostres'], 10)
+
+    def test_time_budget(self):
+        """Test that no measurement starts once the time budget is spent"""
+        measure = FakeMeasure([1, 10], self.clock, step=10)
+        report = repeat_until_stable(
+            measure, RepetitionPolicy(warmup=1, batch=3, time_budget=45), clock=self.clock
+        )
+        self.assertEqual(report['motiuAturada'], STOP_TIME)
+        self.assertEqual(len(measure.calls), 5)
+        self.assertEqual(report['numMostres'], 4)
+        self.assertEqual(report['durada'], 50)
+
+    def test_cancellation(self):
+        """Test that a cancellation stops between two measurements"""
+        measure = FakeMeasure([1, 10], self.clock)
+        report = repeat_until_stable(
+            measure, RepetitionPolicy(warmup=1), cancelled=lambda: len(measure.calls) >= 3, clock=self.clock
+        )
+        self.assertEqual(report['motiuAturada'], STOP_CANCELLED)
+        self.assertEqual(report['numMostres'], 2)
+
+    def test_single_sample_has_no_interval(self):
+        """Test that with a single sample there is an estimate but no interval"""
+        measure = FakeMeasure([5], self.clock)
+        report = repeat_until_stable(
+            measure, RepetitionPolicy(warmup=0), cancelled=lambda: len(measure.calls) >= 1, clock=self.clock
+        )
+        self.assertEqual(report['numMostres'], 1)
+        self.assertEqual(report['estimacio'], 5)
+        self.assertIsNone(report['limitInferior'])
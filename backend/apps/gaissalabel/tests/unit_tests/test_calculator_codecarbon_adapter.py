@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from apps.gaissalabel.calculators import calculator_codecarbon_adapter as adapter
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Inference endpoint stand-in: answers every request with a JSON output."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = b'{"output": "ok"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeTracker:
+    """Tracker stand-in that records its calls and ends with the given data"""
+
+    def __init__(self, dades):
+        self.dades = dades
+        self.crides = []
+
+    def __call__(self, **kwargs):
+        self.kwargs = kwargs
+        return self
+
+    def start(self):
+        self.crides.append('start')
+
+    def stop(self):
+        self.crides.append('stop')
+        if self.dades is not None:
+            self.final_emissions_data = mock.Mock(values=self.dades)
+
+
+class CodeCarbonAdapterTest(SimpleTestCase):
+    """Unit tests for the CodeCarbon measurements, read from the tracker in memory"""
+
+    def setUp(self):
+        # Every test runs in an empty working directory, to check that nothing is written to it
+        directori = tempfile.TemporaryDirectory()
+        self.addCleanup(directori.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directori.name)
+        self.directori = directori.name
+
+    def test_measure_in_memory(self):
+        """Test that a measurement returns the numeric values of the tracker and writes no file"""
+        valors, resultat = adapter.measure(lambda: 'ok')
+        self.assertEqual(resultat, 'ok')
+        for columna in ('energy_consumed', 'emissions', 'duration'):
+            self.assertIsInstance(valors[columna], float)
+        self.assertEqual(os.listdir(self.directori), [])
+
+    def test_concurrent_measurements(self):
+        """Test that concurrent measurements get the values of their own tracker"""
+        valors = {}
+
+        def mesurar(nom, segons):
+            valors[nom], resultat = adapter.measure(lambda: time.sleep(segons))
+
+        fils = [threading.Thread(target=mesurar, args=args) for args in (('curta', 0.1), ('llarga', 0.6))]
+        for fil in fils:
+            fil.start()
+        for fil in fils:
+            fil.join()
+        self.assertNotEqual(valors['curta']['run_id'], valors['llarga']['run_id'])
+        self.assertLess(valors['curta']['duration'], 0.5)
+        self.assertGreaterEqual(valors['llarga']['duration'], 0.5)
+
+    def test_stopped_on_error(self):
+        """Test that the tracker, without file, is stopped when the measured function fails"""
+        tracker = FakeTracker({'energy_consumed': 1.0})
+        with mock.patch.object(adapter, 'OfflineEmissionsTracker', tracker), self.assertRaises(ValueError):
+            adapter.measure(mock.Mock(side_effect=ValueError))
+        self.assertEqual(tracker.crides, ['start', 'stop'])
+        self.assertFalse(tracker.kwargs['save_to_file'])
+
+    def test_without_data(self):
+        """Test that a tracker that ends without data is an error"""
+        with mock.patch.object(adapter, 'OfflineEmissionsTracker', FakeTracker(None)), \
+                self.assertRaises(RuntimeError):
+            adapter.measure(lambda: 'ok')
+
+    def test_efficiency_results(self):
+        """Test that the results of a request to the endpoint are the mapped values of its measurement"""
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        resultats = adapter.get_efficiency_results(
+            f'http://127.0.0.1:{server.server_port}/', 'hola',
+            {'energy': 'energy_consumed', 'emissions': 'emissions', 'other': 'unknown'},
+        )
+        self.assertIsInstance(resultats['energy'], float)
+        self.assertIsInstance(resultats['emissions'], float)
+        self.assertIsNone(resultats['other'])
+        self.assertEqual(os.listdir(self.directori), [])
@@ -0,0 +1,234 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.core import snapshots
+from apps.core.snapshots import ProcessSnapshot
+from apps.core.versioning import bump_version, get_version
+from apps.gaissalabel import cataleg, estadistiques
+from apps.gaissalabel.models import (
+    EinaCalcul, Estadistica, Inferencia, Interval, Metrica, Model, Qualificacio, TransformacioInformacio,
+    TransformacioMetrica
+)
+from ..integration_tests.test_setup import GAISSALabelDataMixin
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class MapatgesTest(GAISSALabelDataMixin, TestCase):
+    """Unit tests for the per-process snapshot of the compiled tool mappings"""
+
+    def setUp(self):
+        self.create_catalogue()
+        self.create_codecarbon()
+        self.clock = Clock()
+        patcher = mock.patch.object(snapshots, 'time', SimpleNamespace(monotonic=self.clock))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_mapatge_eina(self):
+        """Test the columns of each tool and phase, served without queries"""
+        mapatge = cataleg.mapatge_eina('CodeCarbon', Metrica.INF)
+        self.assertEqual(mapatge.columnes_metriques, {'energy': 'energy_consumed'})
+        self.assertEqual(mapatge.columnes_informacions, {'hardware': 'gpu_model'})
+        self.assertEqual(cataleg.mapatge_eina('CodeCarbon', Metrica.TRAIN).columnes_metriques, {
+            'emissions': 'emissions', 'duration': 'duration',
+        })
+        self.assertIsNone(cataleg.mapatge_eina('MLCO2', Metrica.INF))
+        with self.assertNumQueries(0):
+            cataleg.mapatge_eina('CodeCarbon', Metrica.INF)
+
+    def test_keyed_on_catalogue_version(self):
+        """Test that the mappings are checked against the version stamp of the catalogue"""
+        self.assertEqual(cataleg.mapatges.version_name, cataleg.VERSIO_CATALEG)
+        version = get_version(cataleg.VERSIO_CATALEG)
+        TransformacioMetrica.objects.filter(metrica=self.energy).update(valor='energy')
+        cataleg.invalidar()
+        # Bumped once
+        self.assertGreater(get_version(cataleg.VERSIO_CATALEG), version)
+        self.assertEqual(cataleg.mapatge_eina('CodeCarbon', Metrica.INF).columnes_metriques, {'energy': 'energy'})
+
+    def test_rebuilt_after_an_edit(self):
+        """Test that the process that edits the catalogue rebuilds the mappings on its next read"""
+        self.assertIsNone(cataleg.mapatge_eina('MLCO2', Metrica.TRAIN))
+        mlco2 = EinaCalcul.objects.create(nom='MLCO2')
+        TransformacioMetrica.objects.create(eina=mlco2, metrica=self.emissions, valor='co2')
+        self.assertEqual(cataleg.mapatge_eina('MLCO2', Metrica.TRAIN).columnes_metriques, {'emissions': 'co2'})
+
+        TransformacioMetrica.objects.filter(eina=self.codecarbon, metrica=self.energy).delete()
+        self.assertIsNone(cataleg.mapatge_eina('CodeCarbon', Metrica.INF).columnes_metriques.get('energy'))
+
+    def test_other_process(self):
+        """Test that another process rebuilds the mappings once its TTL expires after an edit"""
+        # The snapshot of another process: same version stamp, its own mappings in memory
+        other_process = ProcessSnapshot(cataleg.VERSIO_CATALEG, cataleg.carregar_mapatges, ttl=30)
+        self.assertEqual(other_process.get()[('CodeCarbon', Metrica.INF)].columnes_metriques['energy'], 'energy_consumed')
+
+        transformacio = TransformacioMetrica.objects.get(metrica=self.energy)
+        transformacio.valor = 'energy_kwh'
+        transformacio.save()
+
+        self.clock.now += 29
+        with self.assertNumQueries(0):
+            self.assertEqual(other_process.get()[('CodeCarbon', Metrica.INF)].columnes_metriques['energy'], 'energy_consumed')
+        self.clock.now += 2
+        self.assertEqual(other_process.get()[('CodeCarbon', Metrica.INF)].columnes_metriques['energy'], 'energy_kwh')
+
+    def test_bump_from_another_process(self):
+        """Test that a catalogue version bumped elsewhere rebuilds the mappings of this process"""
+        cataleg.mapatge_eina('CodeCarbon', Metrica.INF)
+        # Written by another process: no signal here, only the version stamp in the database
+        TransformacioMetrica.objects.filter(metrica=self.energy).update(valor='energy_kwh')
+        bump_version(cataleg.VERSIO_CATALEG)
+
+        self.clock.now += 31
+        self.assertEqual(cataleg.mapatge_eina('CodeCarbon', Metrica.INF).columnes_metriques['energy'], 'energy_kwh')
+        # Not rebuilt again while the version does not change
+        self.clock.now += 31
+        with self.assertNumQueries(1):
+            cataleg.mapatge_eina('CodeCarbon', Metrica.INF)
+
+
+class ModificacioTest(GAISSALabelDataMixin, TestCase):
+    """Unit tests for the grouped catalogue edits"""
+
+    def setUp(self):
+        self.create_catalogue()
+        self.create_codecarbon()
+
+    def interval(self, metrica, qualificacio):
+        interval = Interval.objects.get(metrica=metrica, qualificacio_id=qualificacio)
+        return interval.limitSuperior, interval.limitInferior
+
+    def columnes(self, eina=None):
+        return dict(TransformacioMetrica.objects.filter(eina=eina or self.codecarbon).values_list('metrica_id', 'valor'))
+
+    def test_invalidated_once(self):
+        """Test that the writes of a block invalidate the catalogue once, when it ends"""
+        with mock.patch.object(cataleg, 'invalidar') as invalidar:
+            Qualificacio.objects.create(id='D', color='#000000', ordre=4)
+            self.assertEqual(invalidar.call_count, 1)
+
+            with cataleg.modificacio():
+                self.assertTrue(cataleg.modificacio_en_curs())
+                Qualificacio.objects.create(id='E', color='#000000', ordre=5)
+                Metrica.objects.filter(id='emissions').update(nom='CO2')
+                self.emissions.delete()
+                self.assertEqual(invalidar.call_count, 1)
+            self.assertEqual(invalidar.call_count, 2)
+        self.assertFalse(cataleg.modificacio_en_curs())
+
+    def test_rolled_back(self):
+        """Test that an error inside the block rolls back its writes without invalidating the catalogue"""
+        version = get_version(cataleg.VERSIO_CATALEG)
+        with self.assertRaises(ValueError):
+            with cataleg.modificacio():
+                Qualificacio.objects.create(id='D', color='#000000', ordre=4)
+                cataleg.aplicar_intervals(self.accuracy, {'A': {'limitSuperior': 1}})
+        self.assertFalse(Qualificacio.objects.filter(id='D').exists())
+        self.assertEqual(get_version(cataleg.VERSIO_CATALEG), version)
+        self.assertFalse(cataleg.modificacio_en_curs())
+
+    def test_aplicar_intervals(self):
+        """Test that changed intervals are updated, new ones created and the rest left as they are"""
+        # The ratings are recomputed after every change (see ModificacioTest.test_ratings_recomputed_once)
+        with mock.patch.object(cataleg, 'requalificar') as requalificar:
+            with self.assertNumQueries(2):
+                cataleg.aplicar_intervals(self.emissions, {
+                    'A': {'limitSuperior': 20},
+                    'B': {'limitSuperior': 100, 'limitInferior': 10},  # Unchanged
+                })
+            with self.assertNumQueries(2):
+                cataleg.aplicar_intervals(self.accuracy, {'A': {'limitSuperior': 1, 'limitInferior': 0.9}})
+            self.assertEqual(self.interval(self.emissions, 'A'), (20, 0))
+            self.assertEqual(self.interval(self.emissions, 'C'), (10 ** 9, 100))
+            self.assertEqual(self.interval(self.accuracy, 'A'), (1, 0.9))
+
+            # The same number of queries with more intervals
+            with self.assertNumQueries(3):
+                cataleg.aplicar_intervals(self.accuracy, {
+                    'A': {'limitInferior': 0.95},
+                    'B': {'limitSuperior': 0.95, 'limitInferior': 0.8},
+                    'C': {'limitSuperior': 0.8, 'limitInferior': 0},
+                })
+            self.assertEqual(Interval.objects.filter(metrica=self.accuracy).count(), 3)
+            self.assertEqual(requalificar.call_count, 3)
+
+            # Nothing changed: the ratings are not recomputed
+            with self.assertNumQueries(1):
+                cataleg.aplicar_intervals(self.accuracy, {'A': {'limitInferior': 0.95}})
+            self.assertEqual(requalificar.call_count, 3)
+
+    def test_ratings_recomputed_once(self):
+        """Test that an edit of intervals and weights recomputes the stored ratings and counters once, at the end"""
+        model = Model.objects.create(nom='bert-base')
+        inferencia = self.create_inference(model, energy=50)
+        estadistiques.reconstruir(qualificacions=True)
+        self.assertEqual(Inferencia.objects.get(pk=inferencia.pk).qualificacio_id, 'B')
+
+        with mock.patch.object(estadistiques, 'reconstruir', wraps=estadistiques.reconstruir) as reconstruir:
+            with cataleg.modificacio():
+                cataleg.aplicar_intervals(self.energy, {'A': {'limitSuperior': 60}, 'B': {'limitInferior': 60}})
+                self.energy.pes = 2
+                self.energy.save()
+                self.assertEqual(reconstruir.call_count, 0)
+            reconstruir.assert_called_once_with(qualificacions=True)
+
+            # Other edits of a metric do not change the ratings
+            self.energy.nom = 'Energia'
+            self.energy.save()
+            self.assertEqual(reconstruir.call_count, 1)
+        self.assertEqual(Inferencia.objects.get(pk=inferencia.pk).qualificacio_id, 'A')
+        self.assertEqual(Estadistica.objects.get(clau=estadistiques.clau_qualificacio(Metrica.INF, 'A')).valor, 1)
+        self.assertFalse(Estadistica.objects.filter(clau=estadistiques.clau_qualificacio(Metrica.INF, 'B')).exists())
+
+    def test_new_interval_without_both_limits(self):
+        """Test that a new interval with one limit raises ValueError before writing anything"""
+        with self.assertRaises(ValueError):
+            cataleg.aplicar_intervals(self.accuracy, {
+                'A': {'limitSuperior': 1, 'limitInferior': 0.9}, 'B': {'limitSuperior': 0.9},
+            })
+        self.assertFalse(Interval.objects.filter(metrica=self.accuracy).exists())
+
+    def test_aplicar_transformacions(self):
+        """Test that the transformations of a tool are left equal to the given columns"""
+        duplicate = TransformacioMetrica.objects.create(eina=self.codecarbon, metrica=self.emissions, valor='co2')
+        mlco2 = EinaCalcul.objects.create(nom='MLCO2')
+        TransformacioMetrica.objects.create(eina=mlco2, metrica=self.duration, valor='duration')
+        unchanged = TransformacioMetrica.objects.get(eina=self.codecarbon, metrica=self.emissions, valor='emissions')
+
+        cataleg.aplicar_transformacions(self.codecarbon, TransformacioMetrica, 'metrica', {
+            'emissions': 'emissions', 'energy': 'energy_kwh', 'accuracy': 'acc',
+        })
+        self.assertEqual(self.columnes(), {'emissions': 'emissions', 'energy': 'energy_kwh', 'accuracy': 'acc'})
+        # Unchanged rows are kept, repeated ones removed, other tools left as they are
+        self.assertTrue(TransformacioMetrica.objects.filter(pk=unchanged.pk).exists())
+        self.assertFalse(TransformacioMetrica.objects.filter(pk=duplicate.pk).exists())
+        self.assertEqual(self.columnes(mlco2), {'duration': 'duration'})
+
+        cataleg.aplicar_transformacions(self.codecarbon, TransformacioInformacio, 'informacio', {})
+        self.assertFalse(TransformacioInformacio.objects.exists())
+
+    def test_transformacions_query_count(self):
+        """Test that the transformations of a grouped edit are applied in a constant number of queries"""
+        columnes = {'emissions': 'co2', 'energy': 'energy_kwh', 'accuracy': 'acc'}
+        with CaptureQueriesContext(connection) as queries, cataleg.modificacio():
+            cataleg.aplicar_transformacions(self.codecarbon, TransformacioMetrica, 'metrica', columnes)
+        # More transformations updated, created and removed
+        for i in range(6):
+            Metrica.objects.create(id=f'metrica{i}', nom=f'Metrica {i}', fase=Metrica.INF, pes=0)
+            if i < 4:
+                TransformacioMetrica.objects.create(eina=self.codecarbon, metrica_id=f'metrica{i}', valor='x')
+        columnes.update({'metrica0': 'y', 'metrica1': 'y', 'metrica4': 'y', 'metrica5': 'y'})
+        with self.assertNumQueries(len(queries)), cataleg.modificacio():
+            cataleg.aplicar_transformacions(self.codecarbon, TransformacioMetrica, 'metrica', columnes)
+        self.assertEqual(self.columnes(), columnes)
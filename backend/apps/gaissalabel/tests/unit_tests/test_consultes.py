@@ -0,0 +1,212 @@
+from django.test import TestCase
+
+from apps.gaissa_roi_analyzer.models import (
+    MLPipelineStage, MLTactic, ModelArchitecture, ROIAnalysisCalculation, TacticParameterOption
+)
+from apps.gaissalabel import consultes, estadistiques
+from apps.gaissalabel.models import Model, Entrenament, Metrica
+from ..integration_tests.test_setup import GAISSALabelDataMixin
+
+
+class ClassificacioTest(GAISSALabelDataMixin, TestCase):
+    """Unit tests for the per-metric leaderboard"""
+
+    def setUp(self):
+        self.create_catalogue()
+        self.bert = Model.objects.create(nom='bert-base', autor='google')
+        self.resnet = Model.objects.create(nom='resnet50', autor='microsoft')
+        self.gpt = Model.objects.create(nom='gpt2', autor='openai')
+
+        # bert: best 5, latest 50; resnet: 20; gpt: latest without emissions
+        self.bert_best = self.create_training(self.bert, emissions=5, duration=5)
+        self.bert_latest = self.create_training(self.bert, emissions=50, duration=50)
+        self.resnet_training = self.create_training(self.resnet, emissions=20, duration=20)
+        self.create_training(self.gpt, emissions=1, duration=10)
+        self.create_training(self.gpt, emissions=None, duration=10)
+        for experiment in (self.bert_best, self.bert_latest, self.resnet_training):
+            estadistiques.actualitzar_qualificacio(experiment)
+
+    def test_latest_experiment(self):
+        """Test that each model is ranked by its latest experiment, from best to worst value"""
+        files = consultes.classificacio(self.emissions, 10)
+        self.assertEqual([fila['model'] for fila in files], [self.resnet.id, self.bert.id])
+        self.assertEqual([fila['posicio'] for fila in files], [1, 2])
+        self.assertEqual([fila['valor'] for fila in files], [20, 50])
+        self.assertEqual(files[1]['experiment'], self.bert_latest.id)
+        self.assertEqual(files[1]['nomModel'], 'bert-base')
+        self.assertEqual(files[1]['autorModel'], 'google')
+
+    def test_best_experiment(self):
+        """Test that each model is ranked by its experiment with the best value"""
+        files = consultes.classificacio(self.emissions, 10, consultes.EXPERIMENT_BEST)
+        self.assertEqual(
+            [(fila['model'], fila['valor']) for fila in files],
+            [(self.gpt.id, 1), (self.bert.id, 5), (self.resnet.id, 20)],
+        )
+        self.assertEqual(files[1]['experiment'], self.bert_best.id)
+
+    def test_positive_influence(self):
+        """Test that the metrics where higher is better are ranked from the highest value"""
+        self.create_inference(self.bert, accuracy=0.7)
+        self.create_inference(self.resnet, accuracy=0.9)
+        files = consultes.classificacio(self.accuracy, 10)
+        self.assertEqual([fila['valor'] for fila in files], [0.9, 0.7])
+
+    def test_k(self):
+        """Test that only the top k models are returned"""
+        files = consultes.classificacio(self.emissions, 1, consultes.EXPERIMENT_BEST)
+        self.assertEqual([fila['model'] for fila in files], [self.gpt.id])
+
+    def test_ratings(self):
+        """Test that each row has the rating of its value for the metric and the final rating of its experiment"""
+        files = consultes.classificacio(self.emissions, 10, consultes.EXPERIMENT_BEST)
+        self.assertEqual([fila['qualificacioMetrica'] for fila in files], ['A', 'A', 'B'])
+        self.assertEqual([fila['qualificacio'] for fila in files], [None, 'A', 'B'])
+
+    def test_query_count(self):
+        """Test that the leaderboard reads the results, the intervals and the ratings in a constant number of queries"""
+        with self.assertNumQueries(3):
+            consultes.classificacio(self.emissions, 10)
+        for i in range(5):
+            self.create_training(Model.objects.create(nom=f'model{i}'), emissions=i)
+        with self.assertNumQueries(3):
+            self.assertEqual(len(consultes.classificacio(self.emissions, 10)), 7)
+
+
+class AnotarModelsTest(GAISSALabelDataMixin, TestCase):
+    """Unit tests for the experiment summary annotated on the model list"""
+
+    def setUp(self):
+        self.create_catalogue()
+        self.bert = Model.objects.create(nom='bert-base')
+        self.resnet = Model.objects.create(nom='ResNet50')
+        self.empty = Model.objects.create(nom='gpt2')
+
+        self.create_training(self.bert, emissions=500, duration=500)
+        self.bert_latest = self.create_training(self.bert, emissions=5, duration=5)
+        self.bert_inference = self.create_inference(self.bert, energy=50)
+        self.resnet_training = self.create_training(self.resnet, emissions=50, duration=50)
+        for experiment in Entrenament.objects.all():
+            estadistiques.actualitzar_qualificacio(experiment)
+
+    def create_roi_analysis(self, nom_arquitectura, model=None):
+        stage, created = MLPipelineStage.objects.get_or_create(name='Training')
+        arquitectura = ModelArchitecture.objects.create(name=nom_arquitectura)
+        tactic = MLTactic.objects.create(name=f'Pruning {nom_arquitectura}', pipeline_stage=stage)
+        tactic.compatible_architectures.add(arquitectura)
+        opcio = TacticParameterOption.objects.create(tactic=tactic, name='sparsity', value='0.5')
+        return ROIAnalysisCalculation.objects.create(
+            model_architecture=arquitectura, tactic_parameter_option=opcio, gaissalabel_model=model
+        )
+
+    def anotats(self):
+        return {model.id: model for model in consultes.anotar_models(Model.objects.all())}
+
+    def test_experiment_summary(self):
+        """Test the counts, the latest dates and the rating of the latest experiment of each phase"""
+        models = self.anotats()
+        bert, resnet, empty = models[self.bert.id], models[self.resnet.id], models[self.empty.id]
+
+        self.assertEqual((bert.numEntrenaments, bert.numInferencies), (2, 1))
+        self.assertEqual((resnet.numEntrenaments, resnet.numInferencies), (1, 0))
+        self.assertEqual((empty.numEntrenaments, empty.numInferencies), (0, 0))
+
+        self.assertEqual(bert.ultimEntrenament, self.bert_latest.dataRegistre)
+        self.assertEqual(bert.ultimaInferencia, self.bert_inference.dataRegistre)
+        self.assertIsNone(resnet.ultimaInferencia)
+        self.assertIsNone(empty.ultimEntrenament)
+
+        # The rating of the latest training (A), not of the first one (C)
+        self.assertEqual(bert.qualificacioEntrenament, 'A')
+        self.assertEqual(resnet.qualificacioEntrenament, 'B')
+        self.assertIsNone(bert.qualificacioInferencia)
+
+    def test_single_query(self):
+        """Test that the summary of every model is read in one query"""
+        with self.assertNumQueries(1):
+            list(consultes.anotar_models(Model.objects.all()))
+        for i in range(5):
+            self.create_training(Model.objects.create(nom=f'model{i}'), emissions=i)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(consultes.anotar_models(Model.objects.all())), 8)
+
+    def test_roi_analysis(self):
+        """Test that a model has ROI analyses when analyses are linked to it"""
+        self.assertFalse(any(model.teAnalisiROI for model in self.anotats().values()))
+
+        self.create_roi_analysis('Transformer', model=self.bert)
+        self.create_roi_analysis('Transformer encoder', model=self.bert)
+        models = self.anotats()
+        self.assertTrue(models[self.bert.id].teAnalisiROI)
+        self.assertFalse(models[self.resnet.id].teAnalisiROI)
+        self.assertFalse(models[self.empty.id].teAnalisiROI)
+
+    def test_architecture_with_the_name_of_a_model(self):
+        """Test that an analysis of an architecture named as a model, but not linked to it, does not count"""
+        self.create_roi_analysis('resnet50')
+        self.assertFalse(self.anotats()[self.resnet.id].teAnalisiROI)
+
+    def test_deleted_model(self):
+        """Test that deleting a model keeps its ROI analyses, unlinked"""
+        analisi = self.create_roi_analysis('ResNet', model=self.resnet)
+        self.resnet.delete()
+        analisi.refresh_from_db()
+        self.assertIsNone(analisi.gaissalabel_model)
+
+
+class ComparacioTest(GAISSALabelDataMixin, TestCase):
+    """Unit tests for the side by side comparison of experiments"""
+
+    def setUp(self):
+        self.create_catalogue()
+        self.bert = Model.objects.create(nom='bert-base')
+        self.resnet = Model.objects.create(nom='resnet50')
+        self.baseline = self.create_training(self.bert, emissions=5, duration=50)
+        self.worse = self.create_training(self.resnet, emissions=500, duration=None)
+        self.zero = self.create_training(self.resnet, emissions=0, duration=50)
+
+    def test_comparacio(self):
+        """Test the values, ratings and differences with the baseline of each experiment, in the given order"""
+        comparacio = consultes.comparacio(Metrica.TRAIN, [self.worse.id, self.baseline.id], self.baseline.id)
+        self.assertEqual(comparacio['fase'], Metrica.TRAIN)
+        self.assertEqual(comparacio['baseline'], self.baseline.id)
+        self.assertEqual({metrica['id'] for metrica in comparacio['metriques']}, {'emissions', 'duration'})
+
+        worse, baseline = comparacio['experiments']
+        self.assertEqual((worse['id'], worse['nomModel']), (self.worse.id, 'resnet50'))
+        self.assertEqual(worse['resultats'], {'emissions': 500, 'duration': None})
+        self.assertEqual(worse['qualificacio'], 'C')
+        self.assertEqual(worse['qualificacionsMetriques']['emissions'], 'C')
+        self.assertEqual(worse['diferencies']['emissions'], {'absoluta': 495, 'relativa': 99})
+        self.assertIsNone(worse['diferencies']['duration'])
+        self.assertEqual(worse['diferenciaQualificacio'], 2)
+
+        self.assertEqual(baseline['qualificacio'], 'A')
+        self.assertEqual(baseline['diferencies']['emissions'], {'absoluta': 0, 'relativa': 0})
+        self.assertEqual(baseline['diferenciaQualificacio'], 0)
+
+    def test_baseline_without_value(self):
+        """Test that there is no relative difference with a baseline value of 0, nor any rating difference without a rating"""
+        comparacio = consultes.comparacio(Metrica.TRAIN, [self.zero.id, self.baseline.id], self.zero.id)
+        baseline = comparacio['experiments'][1]
+        self.assertEqual(baseline['diferencies']['emissions'], {'absoluta': 5, 'relativa': None})
+
+        sense_resultats = Entrenament.objects.create(model=self.bert)
+        comparacio = consultes.comparacio(Metrica.TRAIN, [sense_resultats.id, self.baseline.id], sense_resultats.id)
+        self.assertIsNone(comparacio['experiments'][0]['qualificacio'])
+        self.assertIsNone(comparacio['experiments'][1]['diferenciaQualificacio'])
+
+    def test_unknown_experiment(self):
+        """Test that the comparison is None if an experiment does not exist (or is of the other phase)"""
+        self.assertIsNone(consultes.comparacio(Metrica.TRAIN, [self.baseline.id, 9999], self.baseline.id))
+        inference = self.create_inference(self.bert, energy=5)
+        self.assertIsNone(consultes.comparacio(Metrica.INF, [inference.id, self.baseline.id + 1000], inference.id))
+
+    def test_query_count(self):
+        """Test that the number of queries of the comparison does not depend on the number of experiments"""
+        ids = [self.baseline.id, self.worse.id]
+        with self.assertNumQueries(6):
+            consultes.comparacio(Metrica.TRAIN, ids, self.baseline.id)
+        ids += [self.create_training(self.bert, emissions=i, duration=i).id for i in range(5)]
+        with self.assertNumQueries(6):
+            consultes.comparacio(Metrica.TRAIN, ids, self.baseline.id)
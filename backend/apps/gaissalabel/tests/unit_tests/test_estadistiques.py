@@ -0,0 +1,162 @@
+import importlib
+from unittest import mock
+
+from django.apps import apps
+from django.test import TestCase
+
+from apps.core.snapshots import ProcessSnapshot
+from apps.gaissalabel import estadistiques
+from apps.gaissalabel.models import Model, Entrenament, Inferencia, Estadistica, Metrica, Qualificacio, ResultatEntrenament
+from ..integration_tests.test_setup import GAISSALabelDataMixin
+
+
+def comptadors():
+    """Stored counters, without the ones that are 0"""
+    return {clau: valor for clau, valor in Estadistica.objects.values_list('clau', 'valor') if valor}
+
+
+def calculats():
+    """Counters computed from scratch, without the ones that are 0"""
+    return {clau: valor for clau, valor in estadistiques.comptar().items() if valor}
+
+
+class EstadistiquesTest(GAISSALabelDataMixin, TestCase):
+    """Unit tests for the incrementally maintained statistics counters"""
+
+    def setUp(self):
+        self.create_catalogue()
+        self.model = Model.objects.create(nom='bert-base')
+        self.training = self.create_training(self.model, emissions=5, duration=None)
+        self.inference = self.create_inference(self.model, energy=200, accuracy=0.9)
+
+    def test_signals_keep_the_counters(self):
+        """Test that single-row writes keep the counters equal to the ones computed from scratch"""
+        self.assertEqual(comptadors(), calculats())
+        self.assertEqual(comptadors()['models'], 1)
+        self.assertEqual(comptadors()[estadistiques.clau_cobertura(Metrica.TRAIN, 'emissions')], 1)
+        self.assertNotIn(estadistiques.clau_cobertura(Metrica.TRAIN, 'duration'), comptadors())
+
+        resultat = ResultatEntrenament.objects.get(entrenament=self.training, metrica=self.duration)
+        resultat.valor = 80
+        resultat.save()
+        self.assertEqual(comptadors()[estadistiques.clau_cobertura(Metrica.TRAIN, 'duration')], 1)
+
+        # Saving again with a value, or without saving "valor", does not count the result twice
+        resultat.valor = 90
+        resultat.save()
+        resultat.save(update_fields=['metrica'])
+        self.assertEqual(comptadors(), calculats())
+
+        resultat = ResultatEntrenament.objects.get(pk=resultat.pk)
+        resultat.valor = None
+        resultat.save(update_fields=['valor'])
+        self.assertNotIn(estadistiques.clau_cobertura(Metrica.TRAIN, 'duration'), comptadors())
+
+        other = Model.objects.create(nom='resnet50')
+        self.create_training(other, emissions=50, duration=20)
+        self.assertEqual(comptadors(), calculats())
+
+        # Deleting a model deletes its experiments and results
+        self.model.delete()
+        self.assertEqual(comptadors(), calculats())
+        self.assertEqual(comptadors()['models'], 1)
+        self.assertNotIn('inferencies', comptadors())
+
+    def test_rating_distribution(self):
+        """Test that storing the final rating of an experiment moves it between the rating counters"""
+        self.assertEqual(estadistiques.actualitzar_qualificacio(self.inference), 'C')
+        clau_c = estadistiques.clau_qualificacio(Metrica.INF, 'C')
+        self.assertEqual(comptadors()[clau_c], 1)
+
+        resultat = self.inference.resultatsInferencia.get(metrica=self.energy)
+        resultat.valor = 5
+        resultat.save()
+        self.assertEqual(estadistiques.actualitzar_qualificacio(self.inference), 'A')
+        self.assertNotIn(clau_c, comptadors())
+        self.assertEqual(comptadors()[estadistiques.clau_qualificacio(Metrica.INF, 'A')], 1)
+        self.assertEqual(comptadors(), calculats())
+
+    def test_reconstruir(self):
+        """Test that reconstruir replaces wrong counters with the ones computed from scratch"""
+        Estadistica.objects.filter(clau='models').update(valor=42)
+        Estadistica.objects.create(clau=estadistiques.clau_cobertura(Metrica.INF, 'unknown'), valor=3)
+
+        self.assertEqual(estadistiques.reconstruir(), estadistiques.comptar())
+        self.assertEqual(Estadistica.objects.get(clau='inferencies').valor, 1)
+        self.assertEqual(comptadors(), calculats())
+        self.assertEqual(comptadors()['models'], 1)
+
+    def test_reconstruir_qualificacions(self):
+        """Test that reconstruir with qualificacions rates the experiments stored without a rating"""
+        self.assertIsNone(Entrenament.objects.get(pk=self.training.pk).qualificacio_id)
+        estadistiques.reconstruir(qualificacions=True)
+        self.assertEqual(Entrenament.objects.get(pk=self.training.pk).qualificacio_id, 'A')
+        self.assertEqual(comptadors()[estadistiques.clau_qualificacio(Metrica.TRAIN, 'A')], 1)
+
+    def test_requalificar_in_batches(self):
+        """Test that the ratings recomputed in batches are the ones of each experiment on its own"""
+        for energy in (5, 50, 500, None):
+            self.create_inference(self.model, energy=energy)
+        self.create_inference(self.model)
+        self.create_training(self.model, emissions=50, duration=500)
+        Inferencia.objects.update(qualificacio='A')
+
+        with mock.patch.object(estadistiques, 'MIDA_LOT', 2):
+            estadistiques.requalificar()
+        for experiment in [*Entrenament.objects.all(), *Inferencia.objects.all()]:
+            self.assertEqual(experiment.qualificacio_id, estadistiques.calcular_qualificacio(experiment))
+        self.assertEqual(
+            list(Inferencia.objects.order_by('pk').values_list('qualificacio', flat=True)), ['C', 'A', 'B', 'C', None, None]
+        )
+
+    def test_deleted_rating(self):
+        """Test that deleting a rating moves its experiments and their counters to their new rating"""
+        estadistiques.reconstruir(qualificacions=True)
+        self.assertEqual(comptadors()[estadistiques.clau_qualificacio(Metrica.INF, 'C')], 1)
+
+        Qualificacio.objects.get(id='C').delete()
+        # Without the intervals of C, 200 is out of every interval: the worst rating left
+        self.assertEqual(Inferencia.objects.get(pk=self.inference.pk).qualificacio_id, 'B')
+        self.assertNotIn(estadistiques.clau_qualificacio(Metrica.INF, 'C'), comptadors())
+        self.assertEqual(comptadors()[estadistiques.clau_qualificacio(Metrica.INF, 'B')], 1)
+        self.assertEqual(comptadors(), calculats())
+
+    def test_migration_backfill(self):
+        """Test that the migration rates the existing experiments as requalificar does, and counts them"""
+        migracio = importlib.import_module('apps.gaissalabel.migrations.0009_qualificar_experiments')
+        self.create_inference(self.model, energy=5)
+        self.create_training(self.model, emissions=500)
+        Inferencia.objects.update(qualificacio=None)
+        Entrenament.objects.update(qualificacio=None)
+        Estadistica.objects.filter(clau__startswith='qualificacio:').delete()
+
+        with mock.patch.object(migracio, 'MIDA_LOT', 2):
+            migracio.qualificar_experiments(apps, None)
+        for experiment in [*Entrenament.objects.all(), *Inferencia.objects.all()]:
+            self.assertEqual(experiment.qualificacio_id, estadistiques.calcular_qualificacio(experiment))
+        self.assertEqual(comptadors(), calculats())
+        self.assertEqual(comptadors()[estadistiques.clau_qualificacio(Metrica.INF, 'A')], 1)
+
+    def test_empty_table_is_not_rebuilt_on_read(self):
+        """Test that reading the statistics never recomputes the counters"""
+        Estadistica.objects.all().delete()
+        estadistiques.snapshot.invalidate()
+        self.assertEqual(estadistiques.obtenir()['numModels'], 0)
+        self.assertFalse(Estadistica.objects.exists())
+
+    def test_snapshot(self):
+        """Test that the snapshot is served without queries and reloaded after a write"""
+        self.assertEqual(estadistiques.obtenir()['numModels'], 1)
+        with self.assertNumQueries(0):
+            estadistiques.obtenir()
+
+        Model.objects.create(nom='resnet50')
+        self.assertEqual(estadistiques.obtenir()['numModels'], 2)
+
+    def test_snapshot_of_other_process(self):
+        """Test that a snapshot loaded by another process is reloaded once its TTL expires after a write"""
+        other_process = ProcessSnapshot(estadistiques.snapshot.version_name, estadistiques.carregar, ttl=0)
+        self.assertEqual(other_process.get()['numModels'], 1)
+
+        Model.objects.create(nom='resnet50')
+        self.assertEqual(other_process.get()['numModels'], 2)
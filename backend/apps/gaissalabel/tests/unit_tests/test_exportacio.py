@@ -0,0 +1,107 @@
+import csv
+import datetime
+import io
+import json
+from unittest import mock
+
+import pyarrow.parquet as pq
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.gaissalabel import exportacio
+from apps.gaissalabel.models import Model, Entrenament, InfoAddicional, Metrica, ValorInfoEntrenament
+from ..integration_tests.test_setup import GAISSALabelDataMixin
+
+
+class ExportacioTest(GAISSALabelDataMixin, TestCase):
+    """Unit tests for the streaming export of the experiments"""
+
+    def setUp(self):
+        self.create_catalogue()
+        self.hardware = InfoAddicional.objects.create(id='hardware', nom='Hardware', fase=InfoAddicional.TRAIN)
+        self.bert = Model.objects.create(nom='bert-base', autor='google')
+        self.resnet = Model.objects.create(nom='resnet50')
+        self.first = self.create_training(self.bert, emissions=5, duration=None)
+        ValorInfoEntrenament.objects.create(entrenament=self.first, infoAddicional=self.hardware, valor='A100')
+        self.second = self.create_training(self.resnet, emissions=50)
+        self.inference = self.create_inference(self.bert, energy=0.5, accuracy=0.9)
+
+        Entrenament.objects.filter(pk=self.first.pk).update(dataRegistre=timezone.make_aware(datetime.datetime(2024, 1, 10, 12)))
+        Entrenament.objects.filter(pk=self.second.pk).update(dataRegistre=timezone.make_aware(datetime.datetime(2024, 2, 20, 12)))
+
+    def test_rows(self):
+        """Test that there is one row per experiment, with its model, results and additional information"""
+        files = list(exportacio.Exportacio().files())
+        self.assertEqual([(fila['fase'], fila['experiment']) for fila in files], [
+            (Metrica.TRAIN, self.first.id), (Metrica.TRAIN, self.second.id), (Metrica.INF, self.inference.id),
+        ])
+        first = files[0]
+        self.assertEqual((first['model'], first['nomModel'], first['autorModel']), (self.bert.id, 'bert-base', 'google'))
+        self.assertEqual(first['metrica_emissions'], 5)
+        self.assertIsNone(first['metrica_duration'])
+        self.assertEqual(first['info_hardware'], 'A100')
+        self.assertNotIn('metrica_duration', files[1])
+        self.assertEqual(files[2]['metrica_accuracy'], 0.9)
+
+    def test_columns(self):
+        """Test that the columns are those of the experiment and of every metric and information of the phases"""
+        self.assertEqual(exportacio.Exportacio(fase=Metrica.TRAIN).columnes, [
+            'fase', 'experiment', 'dataRegistre', 'qualificacio', 'model', 'nomModel', 'autorModel',
+            'metrica_duration', 'metrica_emissions', 'info_hardware',
+        ])
+        self.assertIn('metrica_energy', exportacio.Exportacio().columnes)
+
+    def test_filters(self):
+        """Test the phase, model and date filters (dates without time include the whole day)"""
+        def experiments(**filtres):
+            return [fila['experiment'] for fila in exportacio.Exportacio(**filtres).files()]
+
+        self.assertEqual(experiments(fase=Metrica.INF), [self.inference.id])
+        self.assertEqual(experiments(fase=Metrica.TRAIN, models=[self.resnet.id]), [self.second.id])
+        self.assertEqual(experiments(fase=Metrica.TRAIN, fins=datetime.date(2024, 1, 10)), [self.first.id])
+        self.assertEqual(experiments(fase=Metrica.TRAIN, des=datetime.date(2024, 1, 11)), [self.second.id])
+        self.assertEqual(
+            experiments(fase=Metrica.TRAIN, des=timezone.make_aware(datetime.datetime(2024, 1, 10, 13))),
+            [self.second.id],
+        )
+
+    def test_csv(self):
+        """Test that the CSV has a header and one line per experiment, written one chunk per row"""
+        chunks = list(exportacio.Exportacio(fase=Metrica.TRAIN).contingut(exportacio.TIPUS_CSV))
+        self.assertEqual(len(chunks), 3)
+        files = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual([fila['experiment'] for fila in files], [str(self.first.id), str(self.second.id)])
+        self.assertEqual(files[0]['info_hardware'], 'A100')
+        self.assertEqual(files[1]['metrica_duration'], '')
+
+    def test_ndjson(self):
+        """Test that every line of the NDJSON is an experiment"""
+        linies = ''.join(exportacio.Exportacio().contingut(exportacio.TIPUS_NDJSON)).splitlines()
+        files = [json.loads(linia) for linia in linies]
+        self.assertEqual(len(files), 3)
+        self.assertEqual(files[0]['dataRegistre'], '2024-01-10T12:00:00Z')
+        self.assertEqual(files[2]['metrica_energy'], 0.5)
+
+    def test_parquet(self):
+        """Test that the Parquet file has the rows of the export, one row group per chunk"""
+        with mock.patch.object(exportacio, 'CHUNK_SIZE', 2):
+            export = exportacio.Exportacio()
+            chunks = list(export.contingut(exportacio.TIPUS_PARQUET))
+        self.assertEqual(len(chunks), 2)
+
+        fitxer = pq.ParquetFile(io.BytesIO(b''.join(chunks)))
+        self.assertEqual(fitxer.metadata.num_row_groups, 2)
+        taula = fitxer.read()
+        self.assertEqual(taula.schema, export.schema)
+        self.assertEqual(taula.column('experiment').to_pylist(), [self.first.id, self.second.id, self.inference.id])
+        self.assertEqual(taula.column('metrica_emissions').to_pylist(), [5, 50, None])
+        self.assertEqual(taula.column('info_hardware').to_pylist(), ['A100', None, None])
+
+    def test_query_count(self):
+        """Test that the experiments are read with their results and information in a constant number of queries"""
+        for i in range(5):
+            experiment = self.create_training(self.bert, emissions=i, duration=i)
+            ValorInfoEntrenament.objects.create(entrenament=experiment, infoAddicional=self.hardware, valor='V100')
+        # Metrics and information, then experiments, results and information of each phase
+        with self.assertNumQueries(8):
+            self.assertEqual(len(list(exportacio.Exportacio().files())), 8)
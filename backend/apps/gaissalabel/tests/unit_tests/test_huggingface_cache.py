@@ -0,0 +1,112 @@
+import asyncio
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase
+
+from connectors import cache_huggingface
+from connectors.cache_huggingface import MetadataCache
+from connectors.client_huggingface import HubClient
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1
+        return self.now
+
+
+class MetadataCacheTest(SimpleTestCase):
+    """Unit tests for the on-disk cache of the Hugging Face Hub metadata"""
+
+    def setUp(self):
+        directori = tempfile.TemporaryDirectory()
+        self.addCleanup(directori.cleanup)
+        self.path = os.path.join(directori.name, 'cache.sqlite3')
+        # Every access is one second after the previous one
+        patcher = mock.patch.object(cache_huggingface, 'time', SimpleNamespace(time=Clock()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def cache(self, **kwargs):
+        cache = MetadataCache(self.path, **kwargs)
+        self.addCleanup(cache._connection.close)
+        return cache
+
+    def test_store(self):
+        """Test that a response is stored with its validators, which revalidate it, and kept when reopened"""
+        with MetadataCache(self.path) as cache:
+            self.assertIsNone(cache.get('https://huggingface.co/a'))
+            cache.store('https://huggingface.co/a', b'{"a": 1}', '"etag-a"', None)
+            cache.store('https://huggingface.co/b', b'{}', None, 'Wed, 21 Oct 2026 07:28:00 GMT')
+
+            stored = cache.get('https://huggingface.co/a')
+            self.assertEqual((stored.body, stored.etag), (b'{"a": 1}', '"etag-a"'))
+            self.assertEqual(stored.conditional_headers(), {'If-None-Match': '"etag-a"'})
+            self.assertEqual(cache.get('https://huggingface.co/b').conditional_headers(), {
+                'If-Modified-Since': 'Wed, 21 Oct 2026 07:28:00 GMT',
+            })
+            # Replacing a response counts its size once
+            cache.store('https://huggingface.co/a', b'{"a": 2}', '"etag-a2"', None)
+            self.assertEqual(cache.size, 10)
+
+        cache = self.cache()
+        self.assertEqual(cache.size, 10)
+        self.assertEqual(cache.get('https://huggingface.co/a').body, b'{"a": 2}')
+
+    def test_without_validators(self):
+        """Test that a response without validators is not stored, and removes the stored one"""
+        cache = self.cache()
+        cache.store('https://huggingface.co/a', b'old', '"v1"', None)
+        cache.store('https://huggingface.co/a', b'new', None, None)
+        self.assertIsNone(cache.get('https://huggingface.co/a'))
+        self.assertEqual(cache.size, 0)
+        self.assertEqual(cache.misses, 2)
+
+    def test_too_large(self):
+        """Test that a response larger than the whole cache is not stored"""
+        cache = self.cache(max_bytes=10)
+        cache.store('https://huggingface.co/a', b'x' * 11, '"v1"', None)
+        self.assertIsNone(cache.get('https://huggingface.co/a'))
+        self.assertEqual(cache.size, 0)
+
+    def test_lru_eviction(self):
+        """Test that over its limit the cache evicts the least recently used responses down to 90% of it"""
+        cache = self.cache(max_bytes=1000)
+        for i in range(10):
+            cache.store(f'https://huggingface.co/{i}', b'x' * 100, f'"{i}"', None)
+        self.assertEqual(cache.size, 1000)
+        # Revalidated: the most recently used
+        cache.hit('https://huggingface.co/0')
+
+        cache.store('https://huggingface.co/10', b'x' * 100, '"10"', None)
+        self.assertEqual(cache.size, 900)
+        stored = [i for i in range(11) if cache.get(f'https://huggingface.co/{i}') is not None]
+        self.assertEqual(stored, [0, 3, 4, 5, 6, 7, 8, 9, 10])
+        self.assertEqual(cache.hits, 1)
+
+    def test_conditional_get(self):
+        """Test that the client revalidates the stored response and answers a 304 from the stored copy"""
+        requests = []
+
+        def hub(request):
+            requests.append(request)
+            if request.headers.get('If-None-Match') == '"v1"':
+                return httpx.Response(304, headers={'ETag': '"v1"', 'Content-Encoding': 'gzip'})
+            return httpx.Response(200, json={'cardData': {}}, headers={'ETag': '"v1"'})
+
+        cache = self.cache()
+
+        async def get_twice():
+            async with HubClient(transport=httpx.MockTransport(hub), cache=cache) as client:
+                return [await client.get_json('https://huggingface.co/api/datasets/squad') for _ in range(2)]
+
+        self.assertEqual(asyncio.run(get_twice()), [{'cardData': {}}, {'cardData': {}}])
+        self.assertNotIn('If-None-Match', requests[0].headers)
+        self.assertEqual(requests[1].headers['If-None-Match'], '"v1"')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
@@ -0,0 +1,242 @@
+import asyncio
+import contextlib
+import io
+from unittest import mock
+
+import httpx
+from django.test import SimpleTestCase
+
+from connectors import client_huggingface
+from connectors.client_huggingface import DatasetSizeResolver, DeadlineExceeded, HubClient
+
+
+class StandInHub:
+    """MockTransport handler answering each request with the next of the given responses (or raising it)"""
+
+    def __init__(self, *responses, delay=0):
+        self.responses = list(responses)
+        self.delay = delay
+        self.requests = []
+        self.running = {}  # Requests running on each host
+        self.max_running = {}
+
+    async def __call__(self, request):
+        self.requests.append(request)
+        host = request.url.host
+        self.running[host] = self.running.get(host, 0) + 1
+        self.max_running[host] = max(self.max_running.get(host, 0), self.running[host])
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running[host] -= 1
+        response = self.responses.pop(0) if self.responses else httpx.Response(200, json={})
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def run(hub, coroutine_function, **kwargs):
+    """Runs coroutine_function(client) with a client whose requests are answered by the stand-in hub"""
+    async def main():
+        async with HubClient(transport=httpx.MockTransport(hub), backoff=0, **kwargs) as client:
+            return await coroutine_function(client)
+    return asyncio.run(main())
+
+
+class HubClientTest(SimpleTestCase):
+    """Unit tests for the retries, backoff, deadline and per-host limits of the Hugging Face Hub client"""
+
+    def test_retry_transient_errors(self):
+        """Test that 429, 5xx and connection errors are retried until a response that is not transient"""
+        hub = StandInHub(
+            httpx.Response(503), httpx.ConnectError('refused'), httpx.Response(429), httpx.Response(200, json={'ok': 1}),
+        )
+        response = run(hub, lambda client: client.request('GET', 'https://huggingface.co/api/models/bert'))
+        self.assertEqual(response.json(), {'ok': 1})
+        self.assertEqual(len(hub.requests), 4)
+
+    def test_not_retried(self):
+        """Test that an error response that is not transient is returned at once"""
+        hub = StandInHub(httpx.Response(404), httpx.Response(200))
+        response = run(hub, lambda client: client.request('GET', 'https://huggingface.co/api/models/missing'))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(hub.requests), 1)
+
+    def test_retries_exhausted(self):
+        """Test that the last response, or the last connection error, is given once the retries are exhausted"""
+        hub = StandInHub(*[httpx.Response(502)] * 3)
+        response = run(hub, lambda client: client.request('GET', 'https://huggingface.co/'), retries=2)
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(len(hub.requests), 3)
+
+        hub = StandInHub(httpx.Response(503), httpx.ConnectTimeout('first'), httpx.ConnectTimeout('last'))
+        with self.assertRaisesMessage(httpx.ConnectTimeout, 'last'):
+            run(hub, lambda client: client.request('GET', 'https://huggingface.co/'), retries=2)
+
+    def test_backoff(self):
+        """Test that the backoff doubles on every attempt, with full jitter, up to max_delay"""
+        client = HubClient(backoff=0.5, max_delay=3)
+        with mock.patch.object(client_huggingface.random, 'uniform', side_effect=lambda a, b: (a, b)):
+            self.assertEqual([client._delay(attempt, None) for attempt in range(5)], [
+                (0, 0.5), (0, 1), (0, 2), (0, 3), (0, 3),
+            ])
+
+    def test_retry_after(self):
+        """Test that the Retry-After of the server is followed, up to max_delay"""
+        client = HubClient(max_delay=30)
+        self.assertEqual(client._delay(0, httpx.Response(429, headers={'Retry-After': '7'})), 7)
+        self.assertEqual(client._delay(0, httpx.Response(429, headers={'Retry-After': '86400'})), 30)
+        # A date is not followed: backoff
+        with mock.patch.object(client_huggingface.random, 'uniform', return_value=0.25):
+            self.assertEqual(client._delay(0, httpx.Response(503, headers={'Retry-After': 'Wed, 21 Oct 2026 07:28:00 GMT'})), 0.25)
+
+    def test_retry_after_is_slept(self):
+        """Test that the client waits the capped delay between two attempts"""
+        hub = StandInHub(httpx.Response(429, headers={'Retry-After': '3600'}), httpx.Response(200))
+        with mock.patch.object(client_huggingface.asyncio, 'sleep', wraps=asyncio.sleep) as sleep:
+            response = run(hub, lambda client: client.request('GET', 'https://huggingface.co/'), max_delay=0.01)
+        self.assertEqual(response.status_code, 200)
+        sleep.assert_any_call(0.01)
+
+    def test_deadline_before_request(self):
+        """Test that no request is sent once the deadline is over"""
+        hub = StandInHub()
+        with self.assertRaises(DeadlineExceeded):
+            run(hub, lambda client: client.request('GET', 'https://huggingface.co/'), deadline=0)
+        self.assertEqual(hub.requests, [])
+
+    def test_deadline_cuts_running_request(self):
+        """Test that a request still running at the deadline is cut short"""
+        hub = StandInHub(delay=5)
+        with self.assertRaises(DeadlineExceeded):
+            run(hub, lambda client: client.request('GET', 'https://huggingface.co/'), deadline=0.05)
+        self.assertEqual(len(hub.requests), 1)
+
+    def test_deadline_before_retry(self):
+        """Test that a retry that would start after the deadline is not waited for"""
+        hub = StandInHub(httpx.Response(429, headers={'Retry-After': '20'}), httpx.Response(200))
+        with self.assertRaises(DeadlineExceeded):
+            run(hub, lambda client: client.request('GET', 'https://huggingface.co/'), deadline=10)
+        self.assertEqual(len(hub.requests), 1)
+
+    def test_concurrency_per_host(self):
+        """Test that the concurrent requests to each host are limited, independently of the other hosts"""
+        hub = StandInHub(delay=0.01)
+
+        async def requests(client):
+            return await asyncio.gather(*[
+                client.request('GET', f'https://{host}/{i}') for host in ('huggingface.co', 'cdn-lfs.hf.co') for i in range(10)
+            ])
+
+        responses = run(hub, requests, concurrency_per_host=3)
+        self.assertEqual(len(responses), 20)
+        self.assertEqual(hub.max_running, {'huggingface.co': 3, 'cdn-lfs.hf.co': 3})
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StandInSizes:
+    """Client stand-in whose dataset sizes are answered once ``release`` is set (or raise the given error)"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+        self.release = None
+
+    async def dataset_size(self, dataset):
+        self.calls.append(dataset)
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return len(self.calls) * 100
+
+
+class DatasetSizeResolverTest(SimpleTestCase):
+    """Unit tests for the shared lookups of the dataset sizes"""
+
+    def setUp(self):
+        self.clock = Clock()
+
+    def resolver(self, client):
+        return DatasetSizeResolver(client, ttl=3600, failure_ttl=60, clock=self.clock)
+
+    def run_sizes(self, resolver, client, *datasets):
+        """Sizes of the datasets looked up concurrently (or their errors), answered once all of them wait"""
+        async def main():
+            client.release = asyncio.Event()
+            tasks = [asyncio.ensure_future(resolver.size(dataset)) for dataset in datasets]
+            await asyncio.sleep(0)
+            client.release.set()
+            return await asyncio.gather(*tasks, return_exceptions=True)
+        return asyncio.run(main())
+
+    def test_single_flight(self):
+        """Test that concurrent lookups of a dataset share one request"""
+        client = StandInSizes()
+        resolver = self.resolver(client)
+        self.assertEqual(self.run_sizes(resolver, client, 'squad', 'squad', 'glue', 'squad'), [100, 100, 200, 100])
+        self.assertEqual(client.calls, ['squad', 'glue'])
+        self.assertEqual(resolver.requests, 2)
+
+    def test_shielded_from_cancellation(self):
+        """Test that cancelling one of the lookups waiting for a dataset does not cancel it for the others"""
+        client = StandInSizes()
+        resolver = self.resolver(client)
+
+        async def main():
+            client.release = asyncio.Event()
+            cancelled = asyncio.ensure_future(resolver.size('squad'))
+            other = asyncio.ensure_future(resolver.size('squad'))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await asyncio.sleep(0)
+            client.release.set()
+            return await other, cancelled.cancelled()
+
+        self.assertEqual(asyncio.run(main()), (100, True))
+        self.assertEqual(client.calls, ['squad'])
+
+    def test_success_ttl(self):
+        """Test that a size is kept ttl seconds"""
+        client = StandInSizes()
+        resolver = self.resolver(client)
+        self.assertEqual(self.run_sizes(resolver, client, 'squad'), [100])
+        self.clock.now += 3599
+        self.assertEqual(self.run_sizes(resolver, client, 'squad'), [100])
+        self.assertEqual(len(client.calls), 1)
+
+        self.clock.now += 1
+        self.assertEqual(self.run_sizes(resolver, client, 'squad'), [200])
+        self.assertEqual(len(client.calls), 2)
+
+    def test_failure_ttl(self):
+        """Test that a failed lookup raises its error to all who wait for it and is kept failure_ttl seconds"""
+        error = httpx.HTTPStatusError('404', request=httpx.Request('GET', 'https://huggingface.co/'), response=httpx.Response(404))
+        client = StandInSizes(error)
+        resolver = self.resolver(client)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.run_sizes(resolver, client, 'missing', 'missing'), [error, error])
+            self.clock.now += 59
+            self.assertEqual(self.run_sizes(resolver, client, 'missing'), [error])
+            self.assertEqual(len(client.calls), 1)
+
+            self.clock.now += 1
+            self.run_sizes(resolver, client, 'missing')
+        self.assertEqual(len(client.calls), 2)
+
+    def test_deadline_not_memoized(self):
+        """Test that a lookup cut by the deadline is not a result of the dataset: it is looked up again"""
+        client = StandInSizes(DeadlineExceeded('squad'))
+        resolver = self.resolver(client)
+        result, = self.run_sizes(resolver, client, 'squad')
+        self.assertIsInstance(result, DeadlineExceeded)
+
+        client.error = None
+        self.assertEqual(self.run_sizes(resolver, client, 'squad'), [200])
+        self.assertEqual(resolver.requests, 2)
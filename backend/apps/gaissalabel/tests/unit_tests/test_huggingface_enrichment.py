@@ -0,0 +1,136 @@
+import asyncio
+import contextlib
+import io
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from connectors import adaptador_huggingface as hf
+from connectors.client_huggingface import DeadlineExceeded
+
+CUTOFF = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def model_info(model_id, days):
+    """Listed model modified ``days`` after the cutoff (before it if negative)"""
+    return SimpleNamespace(modelId=model_id, last_modified=CUTOFF + timedelta(days=days))
+
+
+class Listing:
+    """Iterator of the listed models that records how many were requested"""
+
+    def __init__(self, models, delay=0):
+        self.models = iter(models)
+        self.delay = delay
+        self.listed = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        time.sleep(self.delay)
+        model = next(self.models)
+        self.listed += 1
+        return model
+
+
+@override_settings(HF_SYNC_CACHE_PATH=None, HF_SYNC_DEADLINE=None, HF_SYNC_MAX_IN_FLIGHT=256)
+class EnrichModelsTest(SimpleTestCase):
+    """Unit tests for the lazy listing and the concurrent processing of the synchronized models"""
+
+    def enrich(self, models, process_model):
+        with mock.patch.object(hf, 'process_model', process_model), contextlib.redirect_stdout(io.StringIO()):
+            information = []
+            next_cutoff = asyncio.run(hf.enrich_models(models, CUTOFF, information))
+            return information, next_cutoff
+
+    async def processed(self, client, model):
+        await asyncio.sleep(0)
+        return {'modelId': model[1].modelId}
+
+    def test_listing_stops_at_cutoff(self):
+        """Test that the listing stops at the first model older than the cutoff, without requesting more"""
+        models = Listing([
+            model_info('c', 3), model_info('b', 2), model_info('a', 0), model_info('old', -1), model_info('newer', 5),
+        ])
+        information, next_cutoff = self.enrich(models, self.processed)
+        self.assertCountEqual([model['modelId'] for model in information], ['c', 'b', 'a'])
+        self.assertEqual(models.listed, 4)
+        self.assertIsNone(next_cutoff)
+
+    def test_models_handed_over_as_processed(self):
+        """Test that each processed model is appended as soon as it finishes, and models not processed are not"""
+        models = Listing([model_info('slow', 3), model_info('failed', 2), model_info('fast', 1)])
+        seen_by_slow = []
+
+        async def process_model(client, model):
+            if model[1].modelId == 'slow':
+                await asyncio.sleep(0.05)
+                seen_by_slow.extend(model['modelId'] for model in information)
+            if model[1].modelId == 'failed':
+                return None
+            return {'modelId': model[1].modelId}
+
+        information = []
+        with mock.patch.object(hf, 'process_model', process_model), contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(hf.enrich_models(models, CUTOFF, information))
+        self.assertEqual(seen_by_slow, ['fast'])
+        self.assertEqual(information, [{'modelId': 'fast'}, {'modelId': 'slow'}])
+
+    @override_settings(HF_SYNC_MAX_IN_FLIGHT=3)
+    def test_in_flight_bound(self):
+        """Test that the listing waits while there are HF_SYNC_MAX_IN_FLIGHT models listed and not processed"""
+        models = Listing([model_info(f'm{i}', 100 - i) for i in range(20)])
+        state = {'running': 0, 'max_running': 0, 'ahead': 0, 'finished': 0}
+
+        async def process_model(client, model):
+            state['running'] += 1
+            state['max_running'] = max(state['max_running'], state['running'])
+            state['ahead'] = max(state['ahead'], models.listed - state['finished'])
+            await asyncio.sleep(0.005)
+            state['running'] -= 1
+            state['finished'] += 1
+            return {'modelId': model[1].modelId}
+
+        information, next_cutoff = self.enrich(models, process_model)
+        self.assertEqual(len(information), 20)
+        self.assertEqual(state['max_running'], 3)
+        self.assertLessEqual(state['ahead'], 3)
+
+    def test_next_cutoff_of_pending_models(self):
+        """Test that the next synchronization starts at the oldest model cut by the deadline"""
+        models = Listing([model_info('c', 3), model_info('b', 2), model_info('a', 1)])
+
+        async def process_model(client, model):
+            if model[1].modelId in ('c', 'b'):
+                raise DeadlineExceeded(model[1].modelId)
+            return {'modelId': model[1].modelId}
+
+        information, next_cutoff = self.enrich(models, process_model)
+        self.assertEqual(information, [{'modelId': 'a'}])
+        self.assertEqual(next_cutoff, CUTOFF + timedelta(days=2))
+
+    @override_settings(HF_SYNC_DEADLINE=0.3)
+    def test_next_cutoff_of_unfinished_listing(self):
+        """Test that the previous cutoff is kept if the listing did not reach it before the deadline"""
+        models = Listing([model_info('c', 3), model_info('b', 2), model_info('a', 1)], delay=0.2)
+        information, next_cutoff = self.enrich(models, self.processed)
+        self.assertEqual(information, [{'modelId': 'c'}])
+        self.assertEqual(next_cutoff, CUTOFF)
+
+    @override_settings(HF_SYNC_DEADLINE=0.1)
+    def test_processing_cut_by_deadline(self):
+        """Test that the models still processing at the deadline are cancelled and left for the next one"""
+        models = Listing([model_info('slow', 3), model_info('fast', 2)])
+
+        async def process_model(client, model):
+            if model[1].modelId == 'slow':
+                await asyncio.sleep(5)
+            return {'modelId': model[1].modelId}
+
+        information, next_cutoff = self.enrich(models, process_model)
+        self.assertEqual(information, [{'modelId': 'fast'}])
+        self.assertEqual(next_cutoff, CUTOFF + timedelta(days=3))
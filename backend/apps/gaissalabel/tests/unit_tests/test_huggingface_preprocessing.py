@@ -0,0 +1,282 @@
+import contextlib
+import io
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from scipy import stats
+
+from connectors import adaptador_huggingface as hf
+from connectors.scanner_huggingface import process_pool, scan_model_card, scan_model_cards
+from connectors.synthetic_huggingface import synthetic_extraction
+
+
+def row_wise(function, *args):
+    # Versió anterior: la funció d'una fila aplicada amb apply (sense els seus missatges)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args)
+
+
+class VectorizedPreprocessingTest(SimpleTestCase):
+    """Equivalence of the vectorized preprocessing of the Hugging Face synchronization and the row-wise functions"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.df = synthetic_extraction(2000, seed=1)
+        cls.tags_metadata = hf.load_tags_metadata()
+
+    def test_normalize_performance_metric(self):
+        """Test that percentages, decimal commas, dictionaries and lists are read like normalize_performance_metric"""
+        for metric in hf.PERFORMANCE_METRICS:
+            expected = row_wise(self.df[metric].apply, lambda value: hf.normalize_performance_metric(value, metric))
+            pd.testing.assert_series_equal(
+                hf.normalize_performance_metric_column(self.df[metric], metric), expected, check_exact=True
+            )
+
+    def test_unreadable_metric_is_nan(self):
+        """Test that a metric that is not a number is left out instead of stopping the preprocessing"""
+        metric = hf.normalize_performance_metric_column(pd.Series(['n/a', "{'f1': 0.5}", '{0.5', '0.5']), 'accuracy')
+        self.assertTrue(metric[:3].isna().all())
+        self.assertEqual(metric[3], 0.5)
+
+    def test_harmonize_co2(self):
+        """Test that the emissions are read like harmonize_co2"""
+        co2 = self.df['co2_eq_emissions']
+        pd.testing.assert_series_equal(hf.harmonize_co2_column(co2), co2.apply(hf.harmonize_co2), check_exact=True)
+        pd.testing.assert_series_equal(
+            hf.harmonize_co2_column(pd.Series([5, 3], dtype=object)), pd.Series([5, 3]), check_exact=True
+        )
+
+    def test_set_library(self):
+        """Test that the libraries of each model are those of set_library, sorted"""
+        tags = self.df['tags'].apply(lambda tags: hf.tags_treatment(tags, self.tags_metadata))
+        libraries = self.tags_metadata['libraries']
+        expected = pd.concat([self.df['library_name'], tags], axis=1).apply(
+            lambda row: hf.set_library(row['library_name'], row['tags'], libraries), axis=1
+        )
+        result = hf.set_library_column(self.df['library_name'], tags, libraries)
+        self.assertEqual(result.tolist(), [sorted(set(value)) for value in expected])
+
+    def test_combine_sources(self):
+        """Test that the sources are mapped like combine_sources"""
+        df = self.df.fillna({'source': 'Not Specified'})
+        pd.testing.assert_series_equal(
+            hf.combine_sources_column(df['source'], df['auto']),
+            df.apply(lambda row: hf.combine_sources(row['source'], row['auto']), axis=1),
+        )
+
+    def test_create_performance_metrics(self):
+        """Test that the performance metrics of each model are those of create_performance_metrics"""
+        df = hf.performance_metrics_treatment(self.df.copy())
+        result = hf.create_performance_metrics_column(df)
+        expected = df.apply(hf.create_performance_metrics, axis=1)
+        pd.testing.assert_frame_equal(pd.DataFrame(list(result)), pd.DataFrame(list(expected)), check_exact=True)
+
+    def test_performance_score(self):
+        """Test that the score is the harmonic mean of the present metrics, like stats.hmean row by row"""
+        df = hf.performance_metrics_treatment(self.df.copy())
+        df.loc[:9, 'accuracy'] = df['accuracy'].min()  # Normalized to 0: the harmonic mean is 0
+        score = hf.performance_score(df)
+        metrics = hf.PERFORMANCE_METRICS
+        with np.errstate(divide='ignore'):
+            expected = df.apply(
+                lambda row: stats.hmean([row[metric] for metric in metrics if not np.isnan(row[metric])])
+                if row[metrics].notna().any() else np.nan, axis=1
+            )
+        pd.testing.assert_series_equal(score, expected, check_exact=True)
+        self.assertTrue((score[:10] == 0).all())
+        self.assertTrue(score[df[metrics].isna().all(axis=1)].isna().all())
+
+
+class ModelCardScannerTest(SimpleTestCase):
+    """Unit tests for the single-pass scanner of the context of the training in the model cards"""
+
+    CARDS = [
+        None,
+        '',
+        '- Hardware Type: A100\n- Hours used: 5\n- Cloud Provider: AWS\n- Compute Region: us-east\n'
+        '- Carbon Emitted: 12.5 kg\n- Training type: fine-tuning\n',
+        'HARDWARE type type:: V100\nCompute region:\n\n  eu-west\n',
+        'Hardware: Training type: GPU\n',  # Un valor que conté el nom d'un altre camp
+        'Pretraining data\nhardware without value\nHardware: TPU\n',  # Noms sense valor abans del valor
+        'Training:\n',
+    ]
+
+    def test_same_context_as_extract_context_info(self):
+        """Test that every field has the value found by the pattern of extract_context_info"""
+        cards = self.CARDS + synthetic_extraction(500, seed=2)['modelcard_text'].tolist()
+        for card in cards:
+            self.assertEqual(scan_model_card(card), hf.extract_context_info(card), card)
+
+    def test_long_model_cards_are_truncated(self):
+        """Test that only the first characters of a long model card are scanned, cut at their last line break (or mid-line)"""
+        card = '- Hardware Type: A100\n' + 'Lorem ipsum.\n' * 1000 + '- Hours used: 5\n'
+        context = scan_model_card(card, max_chars=100)
+        self.assertEqual(context['hardware_type'], 'A100')
+        self.assertIsNone(context['hours_used'])
+        self.assertEqual(scan_model_card('- Hardware Type: A100 and more\n', max_chars=20)['hardware_type'], 'A10')
+        self.assertEqual(scan_model_card(card, max_chars=None)['hours_used'], '5')
+
+    def test_process_pool(self):
+        """Test that the model cards scanned in a pool of processes have the same context, in the same order"""
+        cards = synthetic_extraction(600, seed=3)['modelcard_text'].tolist()
+        with process_pool(2) as executor:
+            self.assertEqual(scan_model_cards(cards, executor=executor), scan_model_cards(cards))
+        with process_pool(1) as executor:
+            self.assertIsNone(executor)
+
+    def test_unknown_values_are_not_filled(self):
+        """Test that only the missing values are filled from the model card, and not with unknown ones"""
+        df = pd.DataFrame({
+            'modelcard_text': ['Hardware: A100\n', 'Hardware: More information needed\n', 'Hardware: A100\n', None],
+            'hardware_used': [None, None, 'V100', None],
+            'geographical_location': None,
+            'co2_eq_emissions': None,
+        })
+        df = hf.context_metrics_treatment(df)
+        self.assertEqual(df['hardware_used'].tolist(), ['A100', None, 'V100', None])
+
+
+class ChunkedPreprocessingTest(SimpleTestCase):
+    """Equivalence of the preprocessing of the Hugging Face synchronization in chunks and all at once"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.df = synthetic_extraction(3000, seed=4)
+        cls.df_clean = hf.read_df_clean()
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.whole = hf.preprocessing_rawData(cls.df.copy(), chunk_size=len(cls.df))
+
+    def chunks(self, chunk_size):
+        with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as tmpdir:
+            return list(hf.preprocessing_rawData_chunks(hf.iter_chunks(self.df.copy(), chunk_size), tmpdir))
+
+    def test_same_output_for_any_chunk_size(self):
+        """Test that the preprocessed data is identical with chunks of 97 and 1000 models and without chunks"""
+        self.assertGreater(len(self.whole), 1000)
+        self.assertTrue(any(column.startswith('is_') for column in self.whole.columns))
+        for chunk_size in (97, 1000):
+            with self.subTest(chunk_size=chunk_size), contextlib.redirect_stdout(io.StringIO()):
+                pd.testing.assert_frame_equal(
+                    hf.preprocessing_rawData(self.df.copy(), chunk_size=chunk_size), self.whole, check_exact=True
+                )
+
+    def test_preprocessing_co2_per_chunk(self):
+        """Test that preprocessing_co2 of every chunk, like the synchronization does, equals that of the whole data"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = hf.preprocessing_co2(self.whole.copy(), self.df_clean.copy())
+        self.assertGreater(len(expected), 0)
+        for chunk_size in (97, 1000):
+            with self.subTest(chunk_size=chunk_size), contextlib.redirect_stdout(io.StringIO()):
+                chunks = [
+                    hf.preprocessing_co2(chunk, self.df_clean.copy()) for chunk in self.chunks(chunk_size)
+                    if (chunk['co2_reported'] == True).any()
+                ]
+                pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected.reset_index(drop=True), check_exact=True)
+
+    def test_raw_chunks(self):
+        """Test that the models spilled by RawChunks as they are extracted are preprocessed like the whole data"""
+        # Models without size first: the first chunks have only missing values in a numeric column
+        df = self.df.iloc[self.df['size'].notna().argsort(kind='stable')].reset_index(drop=True)
+        self.assertTrue(df['size'][:2 * 97].isna().all())
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        with contextlib.redirect_stdout(io.StringIO()), tempfile.TemporaryDirectory() as tmpdir:
+            expected = hf.preprocessing_rawData(df.copy(), chunk_size=len(df))
+            raw = hf.RawChunks(tmpdir, 97)
+            for record in records:
+                raw.append(record)
+            self.assertEqual(len(raw), len(df))
+            self.assertEqual(len(os.listdir(tmpdir)), len(df) // 97)
+            chunks = list(hf.preprocessing_rawData_chunks(raw, tmpdir))
+
+            # Every chunk has the dtypes of the whole data, as the chunks of iter_chunks
+            raw = hf.RawChunks(tmpdir, 97)
+            for record in records:
+                raw.append(record)
+            for chunk in raw:
+                pd.testing.assert_series_equal(chunk.dtypes, df.dtypes)
+            self.assertEqual(os.listdir(tmpdir), [])
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected, check_exact=True)
+
+
+def one_hot_tags(df):
+    # Versió anterior: codificació de les etiquetes amb get_dummies (els models sense etiquetes queden a 0)
+    dummies = pd.get_dummies(pd.DataFrame(df.tags.tolist(), df.index).stack(), prefix='is', prefix_sep='_')
+    return df.drop('tags', axis=1).join(dummies.astype(int).groupby(level=0).sum()).fillna(0)
+
+
+def select_top_tags(df, n):
+    # Versió anterior: només les etiquetes amb més de n aparicions
+    not_tags = [col for col in df.columns if not col.startswith('is_')]
+    tags_names = [col for col in df.columns if col.startswith('is_')]
+    relevant_tags = df[tags_names].sum(axis=0) > n
+    return df[not_tags + [tag for tag, relevant in relevant_tags.items() if relevant]]
+
+
+class TagEncodingTest(SimpleTestCase):
+    """Equivalence of the sparse encoding of the tags in chunks and the get_dummies encoding of all the data"""
+
+    CHUNK_SIZE = 400
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rnd = np.random.default_rng(5)
+        tags = []
+        for i in range(3 * cls.CHUNK_SIZE):
+            chunk = i // cls.CHUNK_SIZE
+            model_tags = [f'tag{j}' for j in rnd.choice(30, size=rnd.integers(0, 6), replace=False)]
+            if chunk == 2 and i % 2 == 0:
+                model_tags.append('late')  # First seen in the last chunk: 200 times
+            if chunk < 2 and i % 7 == 0:
+                model_tags.append('split')  # Over 100 only in all the data: 58 + 57 times
+            if i < 100:
+                model_tags.append('exactly100')
+            if i % 50 == 0:
+                model_tags += ['repeated', 'repeated']  # Twice in the same model
+            tags.append(model_tags)
+        cls.df = pd.DataFrame({'tags': tags, **{metric: rnd.random(len(tags)) for metric in hf.PERFORMANCE_METRICS}})
+
+    def chunked(self):
+        stats = hf.PreprocessingStats()
+        encoded = [(chunk, stats.update(chunk)) for chunk in hf.iter_chunks(self.df, self.CHUNK_SIZE)]
+        top_tags = stats.top_tags(hf.TOP_TAGS_MIN_COUNT)
+        chunks = [hf.finish_chunk(chunk.drop('tags', axis=1), tags, stats, top_tags) for chunk, tags in encoded]
+        return stats, top_tags, pd.concat(chunks)
+
+    def test_encode(self):
+        """Test that every chunk is encoded with the occurrences of each tag, like get_dummies"""
+        vocabulary = hf.TagVocabulary()
+        for chunk in hf.iter_chunks(self.df, self.CHUNK_SIZE):
+            matrix = vocabulary.encode(chunk['tags'])
+            self.assertEqual(matrix.shape, (len(chunk), len(vocabulary)))
+            tags = sorted(vocabulary.index, key=vocabulary.index.get)
+            encoded = pd.DataFrame(matrix.toarray(), columns=['is_' + tag for tag in tags], index=chunk.index)
+            expected = one_hot_tags(chunk[['tags']]).astype(int)
+            pd.testing.assert_frame_equal(encoded[expected.columns], expected, check_dtype=False)
+            # Tags of the previous chunks that are not in this one: zeros
+            self.assertEqual(encoded.drop(columns=expected.columns).to_numpy().sum(), 0)
+
+    def test_top_tags(self):
+        """Test that the tags with more than 100 occurrences in all the data are selected, sorted like get_dummies"""
+        stats, (names, columns), result = self.chunked()
+        expected = select_top_tags(one_hot_tags(self.df[['tags']]), hf.TOP_TAGS_MIN_COUNT)
+        self.assertEqual(['is_' + name for name in names], list(expected.columns))
+        self.assertIn('late', names)
+        self.assertIn('split', names)
+        self.assertNotIn('exactly100', names)
+        self.assertEqual(stats.tag_counts[stats.vocabulary.index['exactly100']], 100)
+        self.assertEqual(stats.tag_counts[stats.vocabulary.index['repeated']], 48)
+
+    def test_finish_chunk(self):
+        """Test that the columns of the top tags of every chunk, with the tags first seen later, equal get_dummies"""
+        stats, top_tags, result = self.chunked()
+        expected = select_top_tags(one_hot_tags(self.df[['tags']]), hf.TOP_TAGS_MIN_COUNT)
+        tag_columns = [column for column in result.columns if column.startswith('is_')]
+        pd.testing.assert_frame_equal(result[tag_columns], expected.astype(int), check_dtype=False)
+        self.assertEqual(result['is_late'][:2 * self.CHUNK_SIZE].sum(), 0)
+        self.assertEqual(result['is_late'].sum(), 200)
@@ -0,0 +1,150 @@
+import datetime
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.gaissalabel import estadistiques, importacio
+from apps.gaissalabel.models import Model, Entrenament, Estadistica, Inferencia, Metrica, ResultatInferencia
+from ..integration_tests.test_setup import GAISSALabelDataMixin
+
+CAPCALERA = 'timestamp,energy_consumed,emissions,gpu_model\n'
+
+
+def csv_inferencies(*energies):
+    """Uploaded CodeCarbon CSV with one inference row per energy value"""
+    files = ''.join(f'2024-03-0{i + 1}T10:00:00,{energia},0.1,A100\n' for i, energia in enumerate(energies))
+    return io.BytesIO((CAPCALERA + files).encode())
+
+
+def comptador(clau):
+    return Estadistica.objects.filter(clau=clau).values_list('valor', flat=True).first() or 0
+
+
+class ImportacioTest(GAISSALabelDataMixin, TestCase):
+    """Unit tests for the bulk import of CSV files of a calculation tool"""
+
+    def setUp(self):
+        self.create_catalogue()
+        self.create_codecarbon()
+        self.model = Model.objects.create(nom='bert-base')
+
+    def test_rows(self):
+        """Test that every row is an experiment with its date, mapped results, information and rating"""
+        resum = importacio.Importacio(self.model, Metrica.INF).importar([csv_inferencies(5, 500)])
+        self.assertEqual(resum, {'numFitxers': 1, 'numExperiments': 2, 'numResultats': 2, 'numInformacions': 2})
+
+        primera, segona = Inferencia.objects.filter(model=self.model).order_by('id')
+        self.assertEqual(primera.dataRegistre, timezone.make_aware(datetime.datetime(2024, 3, 1, 10)))
+        self.assertEqual(primera.resultatsInferencia.get(metrica=self.energy).valor, 5)
+        self.assertEqual(primera.informacionsInferencia.get(infoAddicional=self.hardware).valor, 'A100')
+        self.assertEqual((primera.qualificacio_id, segona.qualificacio_id), ('A', 'C'))
+
+        # The emissions column is a training metric: not imported as an inference result
+        self.assertFalse(ResultatInferencia.objects.filter(metrica=self.emissions).exists())
+        self.assertEqual(comptador(estadistiques.CLAU_EXPERIMENTS[Metrica.INF]), 2)
+        self.assertEqual(comptador(estadistiques.clau_qualificacio(Metrica.INF, 'A')), 1)
+        self.assertEqual(comptador(estadistiques.clau_cobertura(Metrica.INF, 'energy')), 2)
+
+    def test_batches(self):
+        """Test that the rows of several files are written in batches of MIDA_LOT"""
+        with mock.patch.object(importacio, 'MIDA_LOT', 2), \
+                mock.patch.object(importacio.Importacio, 'desar_lot', autospec=True,
+                                  side_effect=importacio.Importacio.desar_lot) as desar_lot:
+            resum = importacio.Importacio(self.model, Metrica.INF).importar(
+                [csv_inferencies(1, 2, 3), csv_inferencies(4, 5)]
+            )
+        self.assertEqual([len(crida.args[1]) for crida in desar_lot.call_args_list], [2, 2, 1])
+        self.assertEqual((resum['numFitxers'], resum['numExperiments']), (2, 5))
+        self.assertEqual(Inferencia.objects.filter(model=self.model).count(), 5)
+
+    def test_training(self):
+        """Test that the training phase maps the columns of its own metrics"""
+        fitxer = io.BytesIO(b'timestamp,emissions,duration,energy_consumed\n,5,50,1\n')
+        importacio.Importacio(self.model, Metrica.TRAIN).importar([fitxer])
+        entrenament = Entrenament.objects.get(model=self.model)
+        self.assertEqual(
+            dict(entrenament.resultatsEntrenament.values_list('metrica_id', 'valor')),
+            {'emissions': 5, 'duration': 50},
+        )
+        # Without a date, the date of the import
+        self.assertLess(timezone.now() - entrenament.dataRegistre, datetime.timedelta(minutes=1))
+
+    def test_unknown_tool(self):
+        """Test that a tool without transformations for the phase is rejected"""
+        with self.assertRaises(importacio.EinaDesconeguda):
+            importacio.Importacio(self.model, Metrica.INF, 'MLCO2')
+
+    def test_failure_imports_nothing(self):
+        """Test that a file that cannot be decoded rolls back the batches of the files before it"""
+        invalid = io.BytesIO(CAPCALERA.encode() + b'2024-03-01T10:00:00,\xff\xfe,0.1,A100\n')
+        with mock.patch.object(importacio, 'MIDA_LOT', 2), self.assertRaises(UnicodeDecodeError):
+            importacio.Importacio(self.model, Metrica.INF).importar([csv_inferencies(1, 2, 3), invalid])
+
+        self.assertFalse(Inferencia.objects.exists())
+        self.assertFalse(ResultatInferencia.objects.exists())
+        self.assertEqual(comptador(estadistiques.CLAU_EXPERIMENTS[Metrica.INF]), 0)
+
+
+class ImportarCodecarbonCommandTest(GAISSALabelDataMixin, TestCase):
+    """Unit tests for the importar_codecarbon management command"""
+
+    def setUp(self):
+        self.create_catalogue()
+        self.create_codecarbon()
+        self.model = Model.objects.create(nom='bert-base')
+        directori = tempfile.TemporaryDirectory()
+        self.addCleanup(directori.cleanup)
+        self.directori = Path(directori.name)
+
+    def write(self, nom, contingut):
+        path = self.directori / nom
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(contingut)
+        return str(path)
+
+    def call(self, *args):
+        stdout = io.StringIO()
+        call_command('importar_codecarbon', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_files_and_directories(self):
+        """Test that files and the CSV files of directories (recursively) are imported"""
+        fitxer = self.write('emissions.csv', csv_inferencies(1).getvalue())
+        self.write('runs/a/emissions.csv', csv_inferencies(2, 3).getvalue())
+        self.write('runs/notes.txt', b'not a CSV')
+
+        sortida = self.call(str(self.model.id), fitxer, str(self.directori / 'runs'))
+        self.assertIn('Imported 3 experiments from 2 files (3 results, 3 additional information values).', sortida)
+        self.assertEqual(Inferencia.objects.filter(model=self.model).count(), 3)
+
+    def test_phase(self):
+        """Test that --fase T imports trainings"""
+        fitxer = self.write('emissions.csv', b'emissions,duration\n5,50\n')
+        self.call(str(self.model.id), fitxer, '--fase', Metrica.TRAIN)
+        self.assertEqual(Entrenament.objects.get(model=self.model).qualificacio_id, 'A')
+        self.assertFalse(Inferencia.objects.exists())
+
+    def test_errors(self):
+        """Test that an unknown model, path or tool is an error"""
+        fitxer = self.write('emissions.csv', csv_inferencies(1).getvalue())
+        with self.assertRaisesMessage(CommandError, 'Model 9999 does not exist.'):
+            self.call('9999', fitxer)
+        with self.assertRaisesMessage(CommandError, 'does not exist.'):
+            self.call(str(self.model.id), str(self.directori / 'missing.csv'))
+        with self.assertRaisesMessage(CommandError, 'The tool MLCO2 has no transformations for phase I.'):
+            self.call(str(self.model.id), fitxer, '--eina', 'MLCO2')
+        self.assertFalse(Inferencia.objects.exists())
+
+    def test_invalid_file_imports_nothing(self):
+        """Test that a file that is not UTF-8 is an error and the files before it are not imported"""
+        self.write('a.csv', csv_inferencies(1, 2).getvalue())
+        self.write('b.csv', CAPCALERA.encode() + b',\xff,0.1,A100\n')
+        with mock.patch.object(importacio, 'MIDA_LOT', 2), \
+                self.assertRaisesMessage(CommandError, 'Nothing was imported.'):
+            self.call(str(self.model.id), str(self.directori))
+        self.assertFalse(Inferencia.objects.exists())
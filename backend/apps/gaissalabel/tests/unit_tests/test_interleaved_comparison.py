@@ -0,0 +1,52 @@
+from django.test import SimpleTestCase
+
+from apps.gaissalabel.calculators.adaptive_repetition import STOP_CANCELLED
+from apps.gaissalabel.calculators.interleaved_comparison import compare_interleaved, round_order
+
+
+class DriftingMeasure:
+    """Two endpoints, the second using 40% less energy, on a machine whose energy use drifts up every measurement."""
+
+    def __init__(self, drift=0.1):
+        self.drift = drift
+        self.calls = []
+
+    def __call__(self, index, warmup):
+        self.calls.append((index, warmup))
+        factor = 1 + self.drift * len(self.calls)
+        return (10 if index == 0 else 6) * factor, (0.2 if index == 0 else 0.1)
+
+
+class InterleavedComparisonTest(SimpleTestCase):
+    """Unit tests for the interleaved comparison of endpoints, with a fake measurement"""
+
+    def test_round_order_rotates(self):
+        """Test that every round starts with a different endpoint"""
+        self.assertEqual([round_order(r, 2) for r in range(3)], [[0, 1], [1, 0], [0, 1]])
+        self.assertEqual(round_order(1, 3), [1, 2, 0])
+
+    def test_warmup_rounds_are_discarded(self):
+        """Test that the warm-up rounds are measured but not used"""
+        measure = DriftingMeasure()
+        report = compare_interleaved(measure, 2, rounds=4, warmup=1)
+        self.assertEqual(len(measure.calls), 10)
+        self.assertEqual([warmup for index, warmup in measure.calls[:2]], [True, True])
+        self.assertEqual(report['numRondes'], 4)
+
+    def test_interleaving_compensates_drift(self):
+        """Test that the measured reduction is close to the real one despite the drift"""
+        report = compare_interleaved(DriftingMeasure(drift=0.05), 2, rounds=10)
+        comparacio = report['comparacions'][0]
+        self.assertEqual(comparacio['endpoint'], 1)
+        self.assertAlmostEqual(comparacio['factorReduccio'], 0.4, delta=0.02)
+        self.assertLess(comparacio['reduccioPerRonda']['limitInferior'], comparacio['reduccioPerRonda']['estimacio'])
+        self.assertAlmostEqual(comparacio['valorBase'], report['endpoints'][0]['energiaPerInferencia']['estimacio'])
+        self.assertAlmostEqual(comparacio['reduccioLatencia'], 0.5)
+
+    def test_cancellation_keeps_complete_rounds(self):
+        """Test that a cancellation in the middle of a round leaves that round out"""
+        measure = DriftingMeasure()
+        report = compare_interleaved(measure, 2, rounds=5, cancelled=lambda: len(measure.calls) >= 5)
+        self.assertEqual(report['motiuAturada'], STOP_CANCELLED)
+        self.assertEqual(report['numRondes'], 2)
+        self.assertIsNotNone(report['comparacions'][0]['reduccioPerRonda']['limitSuperior'])
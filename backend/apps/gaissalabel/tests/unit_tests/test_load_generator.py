@@ -0,0 +1,103 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase
+
+from apps.gaissalabel.calculators.load_generator import LoadProfile, LoadResult, generate_load, CONSTANT, RAMP
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Inference endpoint stand-in: answers after a short delay, /error answers 500."""
+    protocol_version = 'HTTP/1.1'
+    delay = 0.01
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.delay)
+        self.server.peticions += 1
+        self.server.connexions.add(self.client_address)
+        body = b'{"output": "ok"}'
+        self.send_response(500 if self.path == '/error' else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LoadGeneratorTest(SimpleTestCase):
+    """Unit tests for the load generator against a local stand-in HTTP server"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.peticions = 0
+        self.server.connexions = set()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.endpoint = f'http://127.0.0.1:{self.server.server_port}/'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_request_count_is_respected(self):
+        """Test that exactly the requested number of requests is sent"""
+        result = generate_load(self.endpoint, {'input_text': 'x'}, LoadProfile(concurrency=4, requests=40, duration=30))
+        self.assertEqual(result.successes, 40)
+        self.assertEqual(result.errors, 0)
+        self.assertEqual(self.server.peticions, 40)
+
+    def test_session_reuses_connections(self):
+        """Test that the pooled session keeps one connection per thread"""
+        generate_load(self.endpoint, {'input_text': 'x'}, LoadProfile(concurrency=2, requests=20, duration=30))
+        self.assertLessEqual(len(self.server.connexions), 2)
+
+    def test_constant_rate_paces_requests(self):
+        """Test that a constant rate spreads the requests over time"""
+        result = generate_load(self.endpoint, {}, LoadProfile(concurrency=2, requests=10, duration=30, rate=20))
+        # The 10th request is due at 0.45 s
+        self.assertGreaterEqual(result.elapsed, 0.45)
+        self.assertEqual(result.successes, 10)
+
+    def test_duration_stops_the_load(self):
+        """Test that the load stops when the duration ends"""
+        result = generate_load(self.endpoint, {}, LoadProfile(concurrency=2, duration=1, rate=10))
+        self.assertLess(result.elapsed, 2)
+        self.assertLessEqual(result.successes, 11)
+        self.assertGreater(result.successes, 0)
+
+    def test_failed_requests_are_counted(self):
+        """Test that error responses and connection errors are counted, not raised"""
+        result = generate_load(self.endpoint + 'error', {}, LoadProfile(requests=3, duration=30))
+        self.assertEqual((result.successes, result.errors), (0, 3))
+        result = generate_load('http://127.0.0.1:1/', {}, LoadProfile(requests=2, duration=30), timeout=1)
+        self.assertEqual((result.successes, result.errors), (0, 2))
+
+    def test_ramp_send_times(self):
+        """Test that a ramp from 0 to 10 req/s over 10 s sends its 50 requests in that time"""
+        profile = LoadProfile(duration=10, rate=10, profile=RAMP)
+        self.assertEqual(profile.send_time(0), 0)
+        self.assertAlmostEqual(profile.send_time(50), 10)
+        self.assertAlmostEqual(profile.send_time(5), 10 ** 0.5)
+        self.assertAlmostEqual(LoadProfile(rate=4, profile=CONSTANT).send_time(6), 1.5)
+
+    def test_invalid_profiles(self):
+        """Test that unknown profiles and ramps without a rate are rejected"""
+        with self.assertRaises(ValueError):
+            LoadProfile(profile='sinus')
+        with self.assertRaises(ValueError):
+            LoadProfile(profile=RAMP)
+
+    def test_report(self):
+        """Test the throughput, latency percentiles and energy per request of the report"""
+        report = LoadResult([0.1, 0.2, 0.3, 0.4], errors=1, elapsed=2).report(energy=0.004, emissions=0.002)
+        self.assertEqual(report['numPeticions'], 5)
+        self.assertEqual(report['numErrors'], 1)
+        self.assertEqual(report['peticionsPerSegon'], 2)
+        self.assertAlmostEqual(report['latencia']['mitjana'], 0.25)
+        self.assertAlmostEqual(report['latencia']['p50'], 0.25)
+        self.assertAlmostEqual(report['energiaPerPeticio'], 0.001)
+        self.assertAlmostEqual(report['emissionsPerPeticio'], 0.0005)
+        self.assertIsNone(LoadResult([], errors=2, elapsed=1).report(energy=1)['energiaPerPeticio'])
@@ -0,0 +1,238 @@
+from concurrent.futures import Future
+from datetime import timedelta
+from unittest import mock
+
+import requests
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.gaissalabel import mesures
+from apps.gaissalabel.calculators.load_generator import LoadProfile
+from apps.gaissalabel.models import Model, Inferencia, MesuraInferencia
+from ..integration_tests.test_setup import GAISSALabelDataMixin
+
+CARREGA = {'concurrencia': 2, 'durada': 10, 'perfil': 'constant'}
+REPETICIONS = {
+    'escalfament': 1, 'midaLot': 3, 'ampladaRelativa': 0.1, 'confianca': 0.95, 'pressupostTemps': 100,
+    'minMostres': 3, 'maxMostres': 30,
+}
+COMPARACIO = {'endpoints': ['http://optimized/predict'], 'rondes': 3, 'escalfament': 1}
+
+
+class FakeExecutor:
+    """Executor that keeps the submitted jobs instead of running them"""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.fn, future.args = fn, args
+        self.futures.append(future)
+        return future
+
+
+class ImmediateExecutor:
+    """Executor that runs the submitted jobs before returning their future"""
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+class MesuresTest(GAISSALabelDataMixin, TestCase):
+    """Unit tests for the background efficiency measurements of inference endpoints"""
+
+    def setUp(self):
+        self.create_catalogue()
+        self.model = Model.objects.create(nom='bert-base')
+        # The test database connection is kept open by the test case
+        patcher = mock.patch.object(mesures, 'close_old_connections')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_measurement(self, **camps):
+        return MesuraInferencia.objects.create(
+            endpoint='http://localhost/predict', entrada='{"text": "hola"}', tempsMaxim=30, **camps
+        )
+
+    def executar(self, mesura, metode='calculateEfficiency', **kwargs):
+        with mock.patch.object(mesures, metode, **kwargs) as calcular:
+            mesures.executar(mesura.id)
+        mesura.refresh_from_db()
+        return calcular
+
+    def test_finished(self):
+        """Test that a measurement stores its results and, with a model, an inference with its rating"""
+        mesura = self.create_measurement(model=self.model)
+        calcular = self.executar(mesura, return_value={'energy': '5', 'accuracy': 0.9})
+        calcular.assert_called_once_with('http://localhost/predict', '{"text": "hola"}', timeout=30)
+
+        self.assertEqual(mesura.estat, MesuraInferencia.FINALITZADA)
+        self.assertEqual(mesura.resultats, {'energy': '5', 'accuracy': 0.9})
+        self.assertLessEqual(mesura.dataInici, mesura.dataFi)
+        inferencia = mesura.inferencia
+        self.assertEqual(inferencia.model, self.model)
+        self.assertEqual(inferencia.resultatsInferencia.get(metrica=self.energy).valor, 5)
+        self.assertEqual(inferencia.qualificacio_id, 'A')
+
+    def test_without_model(self):
+        """Test that a measurement without a model does not store an inference"""
+        mesura = self.create_measurement()
+        self.executar(mesura, return_value={'energy': 5})
+        self.assertEqual(mesura.estat, MesuraInferencia.FINALITZADA)
+        self.assertIsNone(mesura.inferencia)
+        self.assertFalse(Inferencia.objects.exists())
+
+    def test_errors(self):
+        """Test that a timeout of the endpoint and any other error finish the measurement with their state"""
+        mesura = self.create_measurement(model=self.model)
+        self.executar(mesura, side_effect=requests.Timeout())
+        self.assertEqual(mesura.estat, MesuraInferencia.TEMPS_ESGOTAT)
+        self.assertEqual(mesura.error, "L'endpoint no ha respost en 30 segons")
+
+        mesura = self.create_measurement(model=self.model)
+        self.executar(mesura, side_effect=ValueError('x' * 2000))
+        self.assertEqual(mesura.estat, MesuraInferencia.ERROR)
+        self.assertEqual(mesura.error, 'x' * 1000)
+        self.assertFalse(Inferencia.objects.exists())
+
+    def test_kinds_of_measurement(self):
+        """Test that a load profile, repetitions or a comparison run their own kind of measurement"""
+        mesura = self.create_measurement(carrega=CARREGA)
+        calcular = self.executar(mesura, 'calculateLoadEfficiency', return_value=({'energy': 1}, {'peticions': 20}))
+        perfil = calcular.call_args.args[2]
+        self.assertIsInstance(perfil, LoadProfile)
+        self.assertEqual((perfil.concurrency, perfil.duration, perfil.requests), (2, 10, None))
+        self.assertEqual(mesura.informeCarrega, {'peticions': 20})
+
+        mesura = self.create_measurement(repeticions=REPETICIONS)
+        calcular = self.executar(mesura, 'calculateRepeatedEfficiency', return_value=({'energy': 1}, None, {'mostres': 6}))
+        self.assertEqual(calcular.call_args.args[2].max_samples, 30)
+        self.assertEqual(mesura.informeRepeticions, {'mostres': 6})
+
+        mesura = self.create_measurement(comparacio=COMPARACIO)
+        calcular = self.executar(mesura, 'calculateComparedEfficiency', return_value=({'energy': 1}, {'reduccio': 0.2}))
+        self.assertEqual(calcular.call_args.args[:3], (
+            ['http://localhost/predict', 'http://optimized/predict'], '{"text": "hola"}', 3,
+        ))
+        self.assertEqual(calcular.call_args.kwargs['warmup'], 1)
+        self.assertEqual(mesura.informeComparacio, {'reduccio': 0.2})
+
+    def test_enviar(self):
+        """Test that a measurement is submitted once its transaction commits, and can be cancelled while queued"""
+        executor = FakeExecutor()
+        mesura = self.create_measurement()
+        with mock.patch.object(mesures, '_get_executor', return_value=executor):
+            with self.captureOnCommitCallbacks(execute=True):
+                mesures.enviar(mesura)
+                self.assertEqual(executor.futures, [])
+        future, = executor.futures
+        self.assertEqual((future.fn, future.args), (mesures.executar, (mesura.id,)))
+
+        self.assertIs(mesures._futures[mesura.id], future)
+
+        self.assertTrue(mesures.cancellar(mesura))
+        self.assertTrue(future.cancelled())
+        self.assertEqual(mesura.estat, MesuraInferencia.CANCELLADA)
+        self.assertNotIn(mesura.id, mesures._futures)
+        # Cancelled while queued: never run
+        calcular = self.executar(mesura)
+        calcular.assert_not_called()
+        self.assertEqual(mesura.estat, MesuraInferencia.CANCELLADA)
+
+    def test_enviar_finished_before_stored(self):
+        """Test that a measurement that finishes before its future is stored is not kept in the futures"""
+        mesura = self.create_measurement()
+        with mock.patch.object(mesures, '_get_executor', return_value=ImmediateExecutor()), \
+                mock.patch.object(mesures, 'calculateEfficiency', return_value={'energy': 5}):
+            with self.captureOnCommitCallbacks(execute=True):
+                mesures.enviar(mesura)
+        mesura.refresh_from_db()
+        self.assertEqual(mesura.estat, MesuraInferencia.FINALITZADA)
+        self.assertNotIn(mesura.id, mesures._futures)
+
+    def test_cancelled_while_running(self):
+        """Test that the result of a measurement cancelled while it runs is discarded"""
+        mesura = self.create_measurement(model=self.model)
+
+        def cancellar_i_mesurar(*args, **kwargs):
+            self.assertTrue(mesures.cancellar(MesuraInferencia.objects.get(pk=mesura.pk)))
+            return {'energy': 5}
+
+        self.executar(mesura, side_effect=cancellar_i_mesurar)
+        self.assertEqual(mesura.estat, MesuraInferencia.CANCELLADA)
+        self.assertIsNone(mesura.resultats)
+        self.assertFalse(Inferencia.objects.exists())
+
+    def test_repetitions_stop_when_cancelled(self):
+        """Test that the repetitions are told when the measurement is cancelled"""
+        mesura = self.create_measurement(repeticions=REPETICIONS)
+
+        def repetir(*args, cancelled, **kwargs):
+            self.assertFalse(cancelled())
+            mesures.cancellar(MesuraInferencia.objects.get(pk=mesura.pk))
+            self.assertTrue(cancelled())
+            return {'energy': 1}, None, {'mostres': 3}
+
+        self.executar(mesura, 'calculateRepeatedEfficiency', side_effect=repetir)
+        self.assertEqual(mesura.estat, MesuraInferencia.CANCELLADA)
+
+    def test_cancel_finished(self):
+        """Test that a finished measurement cannot be cancelled"""
+        mesura = self.create_measurement()
+        self.executar(mesura, return_value={'energy': 5})
+        self.assertFalse(mesures.cancellar(mesura))
+        self.assertEqual(mesura.estat, MesuraInferencia.FINALITZADA)
+
+    def test_caducar(self):
+        """Test that a running measurement not finished long after its maximum time is marked as timed out"""
+        fa_temps = timezone.now() - timedelta(seconds=30 + mesures.MARGE_TEMPS + 1)
+        mesura = self.create_measurement(estat=MesuraInferencia.EXECUCIO, dataInici=timezone.now())
+        MesuraInferencia.objects.filter(pk=mesura.pk).update(dataCreacio=fa_temps)
+        mesura.refresh_from_db()
+        # Counted from its start, not from its creation
+        self.assertEqual(mesures.caducar(mesura).estat, MesuraInferencia.EXECUCIO)
+
+        MesuraInferencia.objects.filter(pk=mesura.pk).update(dataInici=fa_temps)
+        mesura.refresh_from_db()
+        self.assertEqual(mesures.caducar(mesura).estat, MesuraInferencia.TEMPS_ESGOTAT)
+        self.assertIsNotNone(mesura.dataFi)
+
+        # Finished measurements are left as they are
+        acabada = self.create_measurement()
+        MesuraInferencia.objects.filter(pk=acabada.pk).update(dataCreacio=fa_temps, estat=MesuraInferencia.FINALITZADA)
+        acabada.refresh_from_db()
+        self.assertEqual(mesures.caducar(acabada).estat, MesuraInferencia.FINALITZADA)
+
+    @override_settings(MEASUREMENT_QUEUE_TTL=600)
+    def test_caducar_pending(self):
+        """Test that a pending measurement is only timed out after the queue TTL, and never while queued here"""
+        mesura = self.create_measurement()
+        # Queued behind measurements longer than its own maximum time
+        MesuraInferencia.objects.filter(pk=mesura.pk).update(
+            dataCreacio=timezone.now() - timedelta(seconds=30 + mesures.MARGE_TEMPS + 1)
+        )
+        mesura.refresh_from_db()
+        self.assertEqual(mesures.caducar(mesura).estat, MesuraInferencia.PENDENT)
+
+        MesuraInferencia.objects.filter(pk=mesura.pk).update(dataCreacio=timezone.now() - timedelta(seconds=601))
+        mesura.refresh_from_db()
+        executor = FakeExecutor()
+        with mock.patch.object(mesures, '_get_executor', return_value=executor):
+            with self.captureOnCommitCallbacks(execute=True):
+                mesures.enviar(mesura)
+        self.assertEqual(mesures.caducar(mesura).estat, MesuraInferencia.PENDENT)
+
+        # Its process is gone
+        executor.futures[0].cancel()
+        self.assertEqual(mesures.caducar(mesura).estat, MesuraInferencia.TEMPS_ESGOTAT)
+
+    def test_durada_maxima(self):
+        """Test the time a measurement can take with a load, repetitions and a comparison"""
+        self.assertEqual(mesures.durada_maxima(self.create_measurement()), 30)
+        self.assertEqual(mesures.durada_maxima(self.create_measurement(carrega=CARREGA)), 40)
+        self.assertEqual(mesures.durada_maxima(self.create_measurement(repeticions=REPETICIONS)), 130)
+        # (3 rounds + 1 warmup) * 2 endpoints
+        self.assertEqual(mesures.durada_maxima(self.create_measurement(comparacio=COMPARACIO)), 240)
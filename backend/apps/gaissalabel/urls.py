@@ -15,6 +15,8 @@ router.register(r'calculadors/inferencia', views.CalculadorInferenciaView, basen
 router.register(r'eines', views.EinesCalculView, basename='eines_calcul')
 router.register(r'sincronitzacio', views.SincroView, basename='sincro')
 router.register(r'estadistiques', views.EstadistiquesView, basename='estadistiques')
+router.register(r'comparacions', views.ComparacionsView, basename='comparacions')
+router.register(r'exportacio', views.ExportacioView, basename='exportacio')
 
 urlpatterns = [
     path('', include(router.urls)),
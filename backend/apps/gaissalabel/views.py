@@ -1,5 +1,10 @@
 import base64
+import csv
 import pytz
+from django.http import StreamingHttpResponse
+from datetime import datetime
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import viewsets, filters, status, mixins
 from rest_framework.response import Response
 from rest_framework.decorators import action
@@ -8,26 +13,47 @@ from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import (
     Model, Entrenament, Inferencia, Metrica, InfoAddicional, 
-    Qualificacio, Interval, EinaCalcul, TransformacioMetrica, 
-    TransformacioInformacio
+    Qualificacio, EinaCalcul, TransformacioMetrica, 
+    TransformacioInformacio, MesuraInferencia
 )
 from .serializers import (
     ModelSerializer, EntrenamentSerializer, InferenciaSerializer, 
     MetricaAmbLimitsSerializer, EntrenamentAmbResultatSerializer, 
     InferenciaAmbResultatSerializer, InfoAddicionalSerializer, 
-    QualificacioSerializer, IntervalBasicSerializer, MetricaSerializer, 
-    EinaCalculBasicSerializer, EinaCalculSerializer, TransformacioMetricaSerializer, 
-    TransformacioInformacioSerializer
+    QualificacioSerializer, MetricaSerializer, 
+    EinaCalculBasicSerializer, EinaCalculSerializer, IntervalEdicioSerializer,
+    TransformacioMetricaEdicioSerializer, TransformacioInformacioEdicioSerializer, MesuraInferenciaSerializer,
+    CarregaSerializer, RepeticionsSerializer, ComparacioSerializer
 )
+from .filters import ModelFilter
 from .calculators.rating_calculator import calculateRating
 from .calculators.label_generator import generateLabel
-from .calculators.efficiency_calculator import calculateEfficiency
-from apps.core.models import Configuracio
+from . import cataleg, estadistiques, consultes, exportacio, importacio, mesures
+from .cataleg import VERSIO_CATALEG
+from apps.core.configuration import get_configuracio
 from apps.core import permissions
+from apps.core.fieldsets import SparseFieldsetViewMixin
+from apps.core.versioning import VersionedCacheViewMixin
 from connectors import adaptador_huggingface
 
 
-class ModelsView(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+def importar_experiments(request, model_id, fase):
+    """Imports the uploaded CSV files of a calculation tool (``fitxers``) as experiments of the model."""
+    model = get_object_or_404(Model, id=model_id)
+    fitxers = request.FILES.getlist('fitxers')
+    if not fitxers:
+        return Response("Cal donar algun fitxer CSV a l'atribut fitxers!", status=status.HTTP_400_BAD_REQUEST)
+    eina = request.data.get('eina', importacio.EINA_PER_DEFECTE)
+    try:
+        resum = importacio.Importacio(model, fase, eina).importar(fitxers)
+    except importacio.EinaDesconeguda:
+        return Response(f"L'eina {eina} no té transformacions per a aquesta fase!", status=status.HTTP_400_BAD_REQUEST)
+    except (csv.Error, UnicodeDecodeError):
+        return Response("Els fitxers han de ser CSV en UTF-8!", status=status.HTTP_400_BAD_REQUEST)
+    return Response(resum, status=status.HTTP_201_CREATED)
+
+
+class ModelsView(SparseFieldsetViewMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
     """ViewSet for ML models in GAISSALabel."""
     queryset = Model.objects.all()
     serializer_class = ModelSerializer
@@ -35,26 +61,28 @@ class ModelsView(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.Create
     permission_classes = [permissions.IsGAISSALabelEnabled]
 
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = {
-        'id': ['exact', 'in'],
-        'nom': ['exact', 'in', 'contains'],
-    }
+    filterset_class = ModelFilter
     search_fields = ['nom']
-    ordering_fields = ['nom', 'dataCreacio']
+    ordering_fields = [
+        'nom', 'dataCreacio', 'numEntrenaments', 'numInferencies', 'ultimEntrenament', 'ultimaInferencia',
+        'qualificacioEntrenament', 'qualificacioInferencia', 'teAnalisiROI',
+    ]
 
     def get_queryset(self):
+        """Annotate the experiment summary of each model (single query, see consultes.anotar_models)."""
         queryset = super().get_queryset()
-        has_roi_analysis = self.request.query_params.get('has_roi_analysis')
-        if has_roi_analysis == 'true':
-            queryset = queryset.filter(gaissa_roi_analyses__isnull=False).distinct()
+        if self.action in ['list', 'retrieve']:
+            queryset = consultes.anotar_models(queryset)
         return queryset
 
 
-class EntrenamentsView(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+class EntrenamentsView(SparseFieldsetViewMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
     """ViewSet for training sessions in GAISSALabel."""
     models = Entrenament
     serializer_class = EntrenamentSerializer
     permission_classes = [permissions.IsGAISSALabelEnabled]
+    # Retrieve needs the full results to generate the Energy Label
+    sparse_fieldset_actions = ('list',)
 
     def get_queryset(self):
         # Get the model from the parameter
@@ -102,15 +130,24 @@ class EntrenamentsView(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
+        # Store the final rating once the results exist (keeps the rating distribution up to date)
+        estadistiques.actualitzar_qualificacio(serializer.instance)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
+    @action(detail=False, methods=['post'], url_path='importar')
+    def importar(self, request, model_id=None):
+        """Bulk import of CSV files of a calculation tool (CodeCarbon by default), one experiment per row."""
+        return importar_experiments(request, model_id, Metrica.TRAIN)
+
 
-class InferenciesView(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+class InferenciesView(SparseFieldsetViewMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
     """ViewSet for inference sessions in GAISSALabel."""
     models = Inferencia
     serializer_class = InferenciaSerializer
     permission_classes = [permissions.IsGAISSALabelEnabled]
+    # Retrieve needs the full results to generate the Energy Label
+    sparse_fieldset_actions = ('list',)
 
     def get_queryset(self):
         # Get the model from the parameter
@@ -158,12 +195,20 @@ class InferenciesView(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.C
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
+        # Store the final rating once the results exist (keeps the rating distribution up to date)
+        estadistiques.actualitzar_qualificacio(serializer.instance)
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
+    @action(detail=False, methods=['post'], url_path='importar')
+    def importar(self, request, model_id=None):
+        """Bulk import of CSV files of a calculation tool (CodeCarbon by default), one experiment per row."""
+        return importar_experiments(request, model_id, Metrica.INF)
+
 
-class QualificacionsView(mixins.ListModelMixin, viewsets.GenericViewSet):
+class QualificacionsView(VersionedCacheViewMixin, SparseFieldsetViewMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     """ViewSet for qualification/rating levels."""
+    version_name = VERSIO_CATALEG
     models = Qualificacio
     serializer_class = QualificacioSerializer
     queryset = Qualificacio.objects.all()
@@ -173,8 +218,9 @@ class QualificacionsView(mixins.ListModelMixin, viewsets.GenericViewSet):
     ordering_fields = ['ordre']
 
 
-class MetriquesView(viewsets.ModelViewSet):
+class MetriquesView(VersionedCacheViewMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for metrics configuration."""
+    version_name = VERSIO_CATALEG
     models = Metrica
     queryset = Metrica.objects.all()
     permission_classes = [permissions.IsAdminEditOthersRead & permissions.IsGAISSALabelEnabled]
@@ -190,13 +236,16 @@ class MetriquesView(viewsets.ModelViewSet):
     search_fields = ['nom', 'fase']
     ordering_fields = ['id', 'nom', 'fase', 'pes', 'influencia']
 
+    LEADERBOARD_DEFAULT_K = 50
+    LEADERBOARD_MAX_K = 500
+
     def get_queryset(self):
         """Optimize queryset to prevent N+1 queries."""
         queryset = super().get_queryset()
         
         # MetricaAmbLimitsSerializer uses nested IntervalBasicSerializer
-        # Need to prefetch intervals to avoid N+1 queries
-        if self.action in ['list', 'retrieve', 'update', 'partial_update']:
+        # Need to prefetch intervals to avoid N+1 queries (unless the client left them out)
+        if self.action in ['list', 'retrieve', 'update', 'partial_update'] and self.sparse_fieldset.embeds('intervals'):
             queryset = queryset.prefetch_related('intervals')
         
         return queryset
@@ -207,29 +256,65 @@ class MetriquesView(viewsets.ModelViewSet):
         else:
             return MetricaAmbLimitsSerializer
 
+    @action(detail=True, methods=['get'], url_path='leaderboard')
+    def leaderboard(self, request, pk=None):
+        """Top-k models for the metric (by their latest or best experiment)."""
+        metrica = self.get_object()
+
+        k = self.LEADERBOARD_DEFAULT_K
+        try:
+            k = min(max(int(request.query_params.get('k', k)), 1), self.LEADERBOARD_MAX_K)
+        except ValueError:
+            pass  # Use the default value
+        experiment = request.query_params.get('experiment', consultes.EXPERIMENT_LATEST)
+        if experiment not in (consultes.EXPERIMENT_LATEST, consultes.EXPERIMENT_BEST):
+            experiment = consultes.EXPERIMENT_LATEST
+
+        return Response({
+            'metrica': metrica.id,
+            'fase': metrica.fase,
+            'unitat': metrica.unitat,
+            'experiment': experiment,
+            'resultats': consultes.classificacio(metrica, k, experiment),
+        })
+
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         metrica = self.get_object()
         data = request.data.copy()
 
-        # Update intervals (get instance and modify with given values)
-        intervals = data.pop('intervals')
-        for intervalJSON in intervals:
-            interval = Interval.objects.get(metrica=metrica, qualificacio__id=intervalJSON['qualificacio'])
-            serializer = IntervalBasicSerializer(interval, data=intervalJSON, partial=True)
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
+        # Edited intervals ({qualificacio: limits}), validated before writing anything
+        edicio = IntervalEdicioSerializer(data=data.pop('intervals', []), many=True)
+        edicio.is_valid(raise_exception=True)
+        intervals = {interval.pop('qualificacio'): interval for interval in edicio.validated_data}
+        desconegudes = set(intervals) - set(Qualificacio.objects.filter(id__in=intervals).values_list('id', flat=True))
+        if desconegudes:
+            return Response(f"No existeixen les qualificacions {', '.join(sorted(desconegudes))}!", status=status.HTTP_400_BAD_REQUEST)
 
-        # Update metric (equivalent to super.update() with small modifications)
         serializer = self.get_serializer(metrica, data=data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
 
+        # Intervals (applied as a difference with the stored ones) and metric, in one transaction
+        try:
+            with cataleg.modificacio():
+                cataleg.aplicar_intervals(metrica, intervals)
+                self.perform_update(serializer)
+        except ValueError as qualificacio:
+            return Response(f"Cal donar els dos límits del nou interval de la qualificació {qualificacio}!", status=status.HTTP_400_BAD_REQUEST)
+
+        # The intervals prefetched by get_object are outdated
+        metrica._prefetched_objects_cache = {}
         return Response(serializer.data)
 
+    def perform_destroy(self, instance):
+        # Its intervals and results are deleted with it: the ratings are recomputed once, at the end
+        with cataleg.modificacio():
+            instance.delete()
 
-class InfoAddicionalsView(viewsets.ModelViewSet):
+
+class InfoAddicionalsView(VersionedCacheViewMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for additional information configuration."""
+    version_name = VERSIO_CATALEG
     model = InfoAddicional
     serializer_class = InfoAddicionalSerializer
     queryset = InfoAddicional.objects.all()
@@ -245,24 +330,73 @@ class InfoAddicionalsView(viewsets.ModelViewSet):
     ordering_fields = ['id', 'nom', 'fase']
 
 
-class CalculadorInferenciaView(mixins.CreateModelMixin, viewsets.GenericViewSet):
-    """ViewSet for inference calculator."""
+class CalculadorInferenciaView(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    ViewSet for inference efficiency measurements. They run in the background (see mesures.py):
+    create returns the measurement, whose state and results are polled with retrieve.
+    """
+    queryset = MesuraInferencia.objects.all()
+    serializer_class = MesuraInferenciaSerializer
     permission_classes = [permissions.IsGAISSALabelEnabled]
-    
-    def get_serializer_class(self):
-        pass
 
     def create(self, request, *args, **kwargs):
         endpoint = request.data.get('endpoint')
         data = request.data.get('input')
         if not endpoint or not data:
             return Response("Cal donar els atributs endpoint i input!", status=status.HTTP_400_BAD_REQUEST)
-        resultats = calculateEfficiency(endpoint, data)
-        return Response(resultats, status=status.HTTP_201_CREATED)
 
+        # Optional: measure the endpoint under a load profile instead of a single request
+        carrega = None
+        if request.data.get('carrega') is not None:
+            carrega_serializer = CarregaSerializer(data=request.data['carrega'])
+            carrega_serializer.is_valid(raise_exception=True)
+            carrega = carrega_serializer.validated_data
+        # Optional: repeat the measurement until the energy per inference is stable
+        repeticions = None
+        if request.data.get('repeticions') is not None:
+            repeticions_serializer = RepeticionsSerializer(data=request.data['repeticions'])
+            repeticions_serializer.is_valid(raise_exception=True)
+            repeticions = repeticions_serializer.validated_data
+        # Optional: compare the endpoint (baseline) with others, measured in interleaved rounds
+        comparacio = None
+        if request.data.get('comparacio') is not None:
+            if repeticions is not None:
+                return Response("No es poden combinar repeticions i comparació!", status=status.HTTP_400_BAD_REQUEST)
+            comparacio_serializer = ComparacioSerializer(data=request.data['comparacio'])
+            comparacio_serializer.is_valid(raise_exception=True)
+            comparacio = comparacio_serializer.validated_data
+
+        serializer = self.get_serializer(data={
+            'endpoint': endpoint,
+            'entrada': data,
+            'tempsMaxim': request.data.get('tempsMaxim', mesures.temps_per_defecte()),
+            'carrega': carrega,
+            'repeticions': repeticions,
+            'comparacio': comparacio,
+            # Optional: store the results as an inference of this model
+            'model': request.data.get('model'),
+        })
+        serializer.is_valid(raise_exception=True)
+        mesura = serializer.save()
+        mesures.enviar(mesura)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    def retrieve(self, request, *args, **kwargs):
+        mesura = mesures.caducar(self.get_object())
+        return Response(self.get_serializer(mesura).data)
 
-class EinesCalculView(viewsets.ModelViewSet):
+    @action(detail=True, methods=['post'], url_path='cancellar')
+    def cancellar(self, request, pk=None):
+        """Cancels a pending or running measurement."""
+        mesura = self.get_object()
+        if not mesures.cancellar(mesura):
+            return Response("La mesura ja ha acabat!", status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(mesura).data)
+
+
+class EinesCalculView(VersionedCacheViewMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """ViewSet for calculation tools configuration."""
+    version_name = VERSIO_CATALEG
     models = EinaCalcul
     queryset = EinaCalcul.objects.all()
     serializer_class = EinaCalculSerializer
@@ -273,14 +407,14 @@ class EinesCalculView(viewsets.ModelViewSet):
         queryset = super().get_queryset()
         
         # EinaCalculSerializer accesses transformacionsMetriques and transformacionsInformacions
-        # Need to prefetch these reverse ForeignKey relationships with nested select_related
+        # (only the foreign key ids of each one), so these reverse ForeignKey relationships are prefetched
+        # Each one is only prefetched if the client did not leave it out of the response
         if self.action in ['list', 'retrieve']:
-            queryset = queryset.prefetch_related(
-                'transformacionsMetriques',
-                'transformacionsMetriques__metrica',
-                'transformacionsInformacions',
-                'transformacionsInformacions__informacio'
-            )
+            fieldset = self.sparse_fieldset
+            if fieldset.embeds('transformacionsMetriques'):
+                queryset = queryset.prefetch_related('transformacionsMetriques')
+            if fieldset.embeds('transformacionsInformacions'):
+                queryset = queryset.prefetch_related('transformacionsInformacions')
         
         return queryset
 
@@ -295,33 +429,34 @@ class EinesCalculView(viewsets.ModelViewSet):
         eina = self.get_object()
         data = request.data.copy()
 
-        # Update metric transformations (get instance and modify with given values)
-        TransformacioMetrica.objects.filter(eina=eina).delete()
-        transfMetriques = data.pop('transformacionsMetriques', None)
-        if transfMetriques:
-            for transfMetricaJSON in transfMetriques:
-                metrica = get_object_or_404(Metrica, id=transfMetricaJSON['metrica'])
-                transfMetrica, created = TransformacioMetrica.objects.get_or_create(eina=eina, metrica=metrica)
-                serializer = TransformacioMetricaSerializer(transfMetrica, data=transfMetricaJSON, partial=True)
-                serializer.is_valid(raise_exception=True)
-                serializer.save()
-
-        # Update information transformations (get instance and modify with given values)
-        TransformacioInformacio.objects.filter(eina=eina).delete()
-        transfInformacions = data.pop('transformacionsInformacions', None)
-        if transfInformacions:
-            for transfInfoJSON in transfInformacions:
-                informacio = get_object_or_404(InfoAddicional, id=transfInfoJSON['informacio'])
-                transfInfo, created = TransformacioInformacio.objects.get_or_create(eina=eina, informacio=informacio)
-                serializer = TransformacioInformacioSerializer(transfInfo, data=transfInfoJSON, partial=True)
-                serializer.is_valid(raise_exception=True)
-                serializer.save()
-
-        # Update tool (equivalent to super.update() with small modifications)
+        # Edited transformations ({metrica/informacio: columna}), validated before writing anything.
+        # On partial updates the transformations that are not sent are kept
+        transformacions = []
+        for clau, edicio_class, model_desti, transformacio_model, camp in (
+            ('transformacionsMetriques', TransformacioMetricaEdicioSerializer, Metrica, TransformacioMetrica, 'metrica'),
+            ('transformacionsInformacions', TransformacioInformacioEdicioSerializer, InfoAddicional, TransformacioInformacio, 'informacio'),
+        ):
+            valors = data.pop(clau, None)
+            if valors is None and partial:
+                continue
+            edicio = edicio_class(data=valors or [], many=True)
+            edicio.is_valid(raise_exception=True)
+            columnes = {transformacio[camp]: transformacio['valor'] for transformacio in edicio.validated_data}
+            if model_desti.objects.filter(id__in=columnes).count() != len(columnes):
+                return Response(f"Alguna de les transformacions de {clau} no té destí!", status=status.HTTP_404_NOT_FOUND)
+            transformacions.append((transformacio_model, camp, columnes))
+
         serializer = self.get_serializer(eina, data=data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
 
+        # Transformations (applied as a difference with the stored ones) and tool, in one transaction
+        with cataleg.modificacio():
+            for transformacio_model, camp, columnes in transformacions:
+                cataleg.aplicar_transformacions(eina, transformacio_model, camp, columnes)
+            self.perform_update(serializer)
+
+        # The transformations prefetched by get_object are outdated
+        eina._prefetched_objects_cache = {}
         return Response(serializer.data)
 
 
@@ -333,7 +468,7 @@ class SincroView(mixins.ListModelMixin, mixins.CreateModelMixin, viewsets.Generi
         pass
 
     def list(self, request, *args, **kwargs):
-        ultimaSincro = Configuracio.objects.get(id=1).ultimaSincronitzacio
+        ultimaSincro = get_configuracio().ultimaSincronitzacio
         ultimaSincroFormatted = ultimaSincro.astimezone(pytz.timezone('Europe/Madrid')).strftime('%d-%m-%Y at %H:%M:%S')
         return Response({'Last update': ultimaSincroFormatted,
                          'Providers': ['Hugging Face']},
@@ -355,9 +490,71 @@ class EstadistiquesView(mixins.ListModelMixin, viewsets.GenericViewSet):
         pass
 
     def list(self, request, *args, **kwargs):
-        data = {
-            "numModels": Model.objects.count(),
-            "numEntrenaments": Entrenament.objects.count(),
-            "numInferencies": Inferencia.objects.count(),
-        }
-        return Response(data, status=status.HTTP_200_OK)
+        # Counters are maintained incrementally and served from a per-process snapshot (see estadistiques.py)
+        return Response(estadistiques.obtenir(), status=status.HTTP_200_OK)
+
+
+class ComparacionsView(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """ViewSet for side by side comparison of experiments."""
+    permission_classes = [permissions.IsGAISSALabelEnabled]
+    MAX_EXPERIMENTS = 20
+
+    def get_serializer_class(self):
+        pass
+
+    def list(self, request, *args, **kwargs):
+        fase = request.query_params.get('fase')
+        if fase not in (Metrica.TRAIN, Metrica.INF):
+            return Response("Cal donar la fase (T o I)!", status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids_experiments = [int(id) for id in request.query_params.get('experiments', '').split(',') if id.strip()]
+            baseline = int(request.query_params.get('baseline', ids_experiments[0] if ids_experiments else 0))
+        except ValueError:
+            return Response("Els identificadors dels experiments han de ser enters!", status=status.HTTP_400_BAD_REQUEST)
+        if not ids_experiments or len(ids_experiments) > self.MAX_EXPERIMENTS:
+            return Response(f"Cal donar entre 1 i {self.MAX_EXPERIMENTS} experiments!", status=status.HTTP_400_BAD_REQUEST)
+        if baseline not in ids_experiments:
+            return Response("El baseline ha de ser un dels experiments comparats!", status=status.HTTP_400_BAD_REQUEST)
+
+        comparacio = consultes.comparacio(fase, ids_experiments, baseline)
+        if comparacio is None:
+            return Response("Algun dels experiments no existeix!", status=status.HTTP_404_NOT_FOUND)
+        return Response(comparacio, status=status.HTTP_200_OK)
+
+
+class ExportacioView(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """ViewSet for the streaming export of models, experiments, results and additional information."""
+    permission_classes = [permissions.IsGAISSALabelEnabled]
+
+    def get_serializer_class(self):
+        pass
+
+    def _parse_data(self, valor):
+        # Accepts a date or a date and time (in the current time zone if it has none)
+        if not valor:
+            return None
+        data = parse_date(valor) or parse_datetime(valor)
+        if data is None:
+            raise ValueError(valor)
+        if isinstance(data, datetime) and timezone.is_naive(data):
+            data = timezone.make_aware(data)
+        return data
+
+    def list(self, request, *args, **kwargs):
+        tipus = request.query_params.get('tipus', exportacio.TIPUS_CSV)
+        if tipus not in exportacio.CONTENT_TYPES:
+            return Response(f"El tipus ha de ser un de: {', '.join(exportacio.CONTENT_TYPES)}!", status=status.HTTP_400_BAD_REQUEST)
+        fase = request.query_params.get('fase')
+        if fase and fase not in (Metrica.TRAIN, Metrica.INF):
+            return Response("La fase ha de ser T o I!", status=status.HTTP_400_BAD_REQUEST)
+        try:
+            models = [int(id) for id in request.query_params.get('models', '').split(',') if id.strip()]
+            des = self._parse_data(request.query_params.get('des'))
+            fins = self._parse_data(request.query_params.get('fins'))
+        except ValueError:
+            return Response("Filtres de models o dates incorrectes!", status=status.HTTP_400_BAD_REQUEST)
+
+        export = exportacio.Exportacio(fase=fase, models=models, des=des, fins=fins)
+        response = StreamingHttpResponse(export.contingut(tipus), content_type=exportacio.CONTENT_TYPES[tipus])
+        response['Content-Disposition'] = f'attachment; filename="gaissalabel.{tipus}"'
+        return response
@@ -1,25 +1,29 @@
+import asyncio
+import numbers
+import tempfile
 import time
 import pandas as pd
 import numpy as np
 import re
-import requests
 import ast
 import yaml
 import pytz
 import os
 
-from scipy import stats
-from requests.exceptions import JSONDecodeError
+from scipy import sparse
 from datetime import datetime
 
-from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
 from huggingface_hub import HfApi
 from huggingface_hub import ModelCard
-from huggingface_hub import hf_hub_url, get_hf_file_metadata
 
 # Import from new modular apps
 from apps.gaissalabel.models import Model, Entrenament, Metrica, InfoAddicional, ResultatEntrenament, ValorInfoEntrenament
 from apps.core.models import Configuracio
+from apps.gaissalabel import estadistiques
+from connectors.cache_huggingface import MetadataCache
+from connectors.client_huggingface import HubClient, DeadlineExceeded
+from connectors.scanner_huggingface import FIELDS as SCANNED_FIELDS, process_pool, scan_model_cards
 
 
 ########## PRIMERA PART: EXTRACTION FROM HUGGING FACE
@@ -119,6 +123,24 @@ def find_model_validation_metric(modelId, metric):
     except:
         return None
 
+    return find_validation_metric_in_text(modelCard_text, metric)
+
+
+def find_validation_metric_in_text(modelCard_text, metric):
+    """
+    Find the validation metric in the text of a model card.
+
+    Args:
+        modelCard_text: The text of the model card (None if it could not be loaded).
+        metric: The evaluation metric to search for.
+
+    Returns:
+        The validation metric value or None if not found.
+    """
+
+    if modelCard_text is None:
+        return None
+
     accuracy_regex = fr'{metric}\s*:\s*.*?(?=\n)'
 
 
@@ -160,23 +182,6 @@ def retrieve_model_tags(model):
     return tags
 
 
-def find_model_size(modelId):
-    """
-    Find the size of a model given its ID.
-
-    Args:
-        modelId: The ID of the model.
-
-    Returns:
-        The size of the model or None if not found.
-    """
-
-    try:
-        return get_hf_file_metadata(hf_hub_url(repo_id=modelId, filename="pytorch_model.bin")).size
-    except:
-        return None
-
-
 def retrieve_model_datasets(model):
     """
     Retrieve the datasets used by a given model.
@@ -199,32 +204,6 @@ def retrieve_model_datasets(model):
     return datasets
 
 
-def find_datasets_size(datasets):
-    """
-    Find the size of datasets used by a given model.
-
-    Args:
-        datasets: A list of datasets.
-
-    Returns:
-        The total size of the datasets or None if not found.
-    """
-
-    datasets_size = 0
-    if datasets is None:
-        return None
-
-    for dataset in datasets:
-        try:
-            api = HfApi()
-            datasets_size += api.dataset_info(dataset).cardData["dataset_info"]["dataset_size"]
-        except:
-            pass
-
-    return datasets_size
-
-
-
 def extract_from_model_index(model_index):
     """
     Extract evaluation metrics from a model index.
@@ -301,13 +280,14 @@ def extract_evaluation_from_modelcard(model):
     return accuracy, f1, loss, rouge1, rougeL
 
 
-def extract_evaluation_metrics(model, auto):
+def extract_evaluation_metrics(model, auto, card_text=None):
     """
     Extract evaluation metrics from a model with the option to use auto mode.
 
     Args:
         model: The model object.
         auto: A boolean flag to indicate if autotrain/autonlp tags should be considered.
+        card_text: The text of the model card, already loaded (None: it is loaded for every metric).
 
     Returns:
         A tuple containing accuracy, f1, loss, rouge1, and rougeL.
@@ -316,88 +296,77 @@ def extract_evaluation_metrics(model, auto):
     accuracy, f1, loss, rouge1, rougeL = extract_evaluation_from_modelcard(model)
 
     if auto:
+        if card_text is None:
+            find_metric = lambda metric: find_model_validation_metric(model.modelId, metric)
+        else:
+            find_metric = lambda metric: find_validation_metric_in_text(card_text, metric)
         if accuracy == None:
-            accuracy = find_model_validation_metric(model.modelId, 'Accuracy')
+            accuracy = find_metric('Accuracy')
         if f1 == None:
-            f1 = find_model_validation_metric(model.modelId, r'(F1|Macro F1)')
+            f1 = find_metric(r'(F1|Macro F1)')
         if loss == None:
-            loss = find_model_validation_metric(model.modelId, 'Loss')
+            loss = find_metric('Loss')
         if rouge1 == None:
-            rouge1 = find_model_validation_metric(model.modelId, 'Rouge1')
+            rouge1 = find_metric('Rouge1')
         if rougeL == None:
-            rougeL = find_model_validation_metric(model.modelId, 'RougeL')
+            rougeL = find_metric('RougeL')
 
     return accuracy, f1, loss, rouge1, rougeL
 
 
-def api_calls_parameters(model, datasets):
-
+async def fetch_or_none(coroutine, description):
     """
-    Get size, datasets size, and creation date from API calls.
+    Await a request of the Hugging Face client, returning None if it fails.
 
     Args:
-        model: The model object.
-        datasets: A list of datasets.
+        coroutine: The request.
+        description: What is requested, for the error message (None: no message).
 
     Returns:
-        A tuple containing size, datasets_size, and created_at.
+        The result of the request or None. DeadlineExceeded is raised, not returned.
     """
 
-
-    size = datasets_size = created_at = None
-    
-    # Get API token from environment variable
-    api_token = os.environ.get('HUGGINGFACE_API_TOKEN')
-    headers = {"authorization": f"Bearer {api_token}"} if api_token else {}
-
     try:
-        commits = requests.get(f'https://huggingface.co/api/models/{model.modelId}/commits/main', timeout=2, headers=headers)
-    except requests.exceptions.Timeout:
-        print(f'Timeout error for commits on model {model.modelId}')
-        created_at = None
-    except JSONDecodeError:
-        print(f'JSON decode error for commits on model {model.modelId}')
-        created_at = None
+        return await coroutine
+    except DeadlineExceeded:
+        raise
     except Exception as e:
-        print(f'Unexpected error for commits on model {model.modelId}: {e}')
-        created_at = None
-    else:
-        try:
-            created_at = commits.json()[-1]['date']
-        except Exception as e:
-            print(f'Error extracting "created_at" for model {model.modelId}')
-            created_at = None
-
-    return size, datasets_size, created_at
+        if description is not None:
+            print(f'Error for {description}: {e}')
+        return None
 
 
-def get_modelcard_text(model):
+async def find_datasets_size(client, datasets):
     """
-    Get the text of a model card.
+    Find the size of datasets used by a given model. Each dataset is requested once per synchronization,
+    however many models use it.
 
     Args:
-        model: The model object.
+        client: The HubClient.
+        datasets: A list of datasets.
 
     Returns:
-        The text of the model card or None if not found.
+        The total size of the datasets or None if not found.
     """
 
+    if datasets is None:
+        return None
 
-    card_text = None
-    try:
-        card_text = ModelCard.load(model.modelId).text
-    except:
-        pass
-    return card_text
-
+    if isinstance(datasets, str):
+        datasets = [datasets]
+    # Each distinct dataset of the model once (an entry can also be empty or not a name)
+    datasets = dict.fromkeys(dataset for dataset in datasets if isinstance(dataset, str) and dataset)
+    sizes = await asyncio.gather(*(fetch_or_none(client.dataset_sizes.size(dataset), None) for dataset in datasets))
+    return sum(size for size in sizes if isinstance(size, (int, float)))
 
 
-def process_model(model):
+async def process_model(client, model):
     """
-    Process a model and extract relevant information.
+    Process a model and extract relevant information. The requests to the Hub of a model are sent concurrently.
 
     Args:
-    model: A tuple containing the model object.
+    client: The HubClient.
+    model: A tuple containing the index and the model object.
 
     Returns:
         A dictionary containing the processed model information.
@@ -413,17 +382,25 @@ def process_model(model):
         datasets = retrieve_model_datasets(model)
         auto = 'autotrain' in tags or 'autonlp' in tags
         library_name = model.library_name if hasattr(model, 'library_name') else None
-        accuracy, f1, loss, rouge1, rougeL = extract_evaluation_metrics(model, auto)
 
-        size, datasets_size, created_at = api_calls_parameters(model, datasets)
-
-        card_text = get_modelcard_text(model)
         emissions = source = training_type = geographical_location = hardware_used = None
-
+        size = datasets_size = None
+        requests_model = [
+            fetch_or_none(client.created_at(model.modelId), f'commits on model {model.modelId}'),
+            fetch_or_none(client.model_card_text(model.modelId), None),
+        ]
         if hasattr(model, 'cardData') and "co2_eq_emissions" in model.cardData:
-            size = find_model_size(model.modelId)
-            datasets_size = find_datasets_size(datasets)
+            requests_model += [
+                fetch_or_none(client.file_size(model.modelId, "pytorch_model.bin"), None),
+                find_datasets_size(client, datasets),
+            ]
             emissions, source, training_type, geographical_location, hardware_used = retrieve_emission_parameters(model)
+        created_at, card_text, *sizes = await asyncio.gather(*requests_model)
+        if sizes:
+            size, datasets_size = sizes
+
+        # The card is loaded once, for the validation metrics of the autotrain models too
+        accuracy, f1, loss, rouge1, rougeL = extract_evaluation_metrics(model, auto, card_text=card_text or '')
 
         return {'modelId': model.modelId,
                 'tags': tags,
@@ -447,15 +424,183 @@ def process_model(model):
                 'lastModified': model.lastModified,
                 'created_at': created_at,
                 'modelcard_text': card_text}
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f'{model.modelId} could not be processed: ', str(e))
 
 
-def extraction():
+async def enrich_models(models, cutoff_date, processed):
+    """
+    Process the models modified since the cutoff as they are listed, concurrently with a shared Hugging Face
+    client, until its deadline. The listing is sorted by last modification (newest first), so it is consumed
+    lazily (no more pages are requested) and it stops at the first model older than the cutoff.
+
+    Args:
+        models: An iterator of the models, sorted by last modification (newest first).
+        cutoff_date: The date of the last synchronization.
+        processed: Where the information of each processed model is appended as soon as it is processed (in the
+            order they finish), e.g. a RawChunks that spills it to disk. It is not kept here.
+
+    Returns:
+        The date from which the next synchronization has to process the models (None if all the models since the
+        cutoff were processed).
+    """
+
+    # Cache of the metadata between synchronizations (conditional requests)
+    cache_path = getattr(settings, 'HF_SYNC_CACHE_PATH', None)
+    cache = None
+    if cache_path:
+        cache = MetadataCache(cache_path, max_bytes=getattr(settings, 'HF_SYNC_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+    running = {}  # Listed models being processed (task -> model_info)
+    pending_dates = []  # Last modification of the models cut by the deadline
+    counts = {'listed': 0, 'processed': 0}
+    try:
+        async with HubClient(
+            token=os.environ.get('HUGGINGFACE_API_TOKEN') or None,
+            concurrency_per_host=getattr(settings, 'HF_SYNC_CONCURRENCY_PER_HOST', 16),
+            timeout=getattr(settings, 'HF_SYNC_REQUEST_TIMEOUT', 10),
+            retries=getattr(settings, 'HF_SYNC_RETRIES', 3),
+            deadline=getattr(settings, 'HF_SYNC_DEADLINE', None),
+            cache=cache,
+        ) as client:
+            # Models listed but not processed yet: the listing waits when there are too many
+            in_flight = asyncio.Semaphore(getattr(settings, 'HF_SYNC_MAX_IN_FLIGHT', 256))
+
+            def model_done(task):
+                in_flight.release()
+                model_info = running.pop(task)
+                if task.cancelled() or isinstance(task.exception(), DeadlineExceeded):
+                    pending_dates.append(model_info.last_modified)
+                else:
+                    counts['processed'] += 1
+                    # None: the model could not be processed
+                    if task.result() is not None:
+                        processed.append(task.result())
+
+            async def list_models():
+                while True:
+                    await in_flight.acquire()
+                    # The pages of the listing are blocking requests
+                    model_info = await asyncio.to_thread(next, models, None)
+                    if model_info is None or model_info.last_modified < cutoff_date:
+                        in_flight.release()
+                        return
+                    task = asyncio.create_task(process_model(client, (counts['listed'], model_info)))
+                    running[task] = model_info
+                    task.add_done_callback(model_done)
+                    counts['listed'] += 1
+
+            producer = asyncio.create_task(list_models())
+            done, pending = await asyncio.wait([producer], timeout=client.remaining())
+            listed = producer in done
+            if listed:
+                producer.result()  # Errors of the listing are raised
+            else:
+                producer.cancel()
+            if running:
+                done, pending = await asyncio.wait(list(running), timeout=client.remaining())
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+    finally:
+        if cache is not None:
+            print(f'[SINCRO HF] metadata cache: {cache.hits} not modified, {cache.misses} downloaded')
+            cache.close()
+
+    print(f'[SINCRO HF] {counts["listed"]} models listed, {counts["processed"]} processed')
+
+    if not listed:
+        # The models not listed yet are older than the listed ones but can be newer than the cutoff
+        return cutoff_date
+    return min(pending_dates) if pending_dates else None
+
+
+class RawChunks:
+    """
+    Information of the extracted models, spilled to disk in chunks of chunk_size models as it is appended, so the
+    extraction never holds more than one chunk in memory. Iterating gives the chunks as DataFrames, each one read
+    (and removed) when it is needed.
+
+    The chunks get the dtypes the whole DataFrame would have: e.g. a numeric column is numeric in every chunk
+    (float if it has any missing value), even in the chunks where all its values are missing.
+    """
+
+    def __init__(self, tmpdir, chunk_size):
+        self.tmpdir = tmpdir
+        self.chunk_size = chunk_size
+        self.records = []
+        self.paths = []
+        self.count = 0
+        self.kinds = {}  # Kind of the values of each column: 'bool', 'int', 'float' or 'object'
+        self.missing = set()  # Columns with a missing value
+
+    def __len__(self):
+        return self.count
+
+    def append(self, record):
+        # Columns of other models that this one does not have: missing
+        self.missing.update(column for column in self.kinds if column not in record)
+        for column, value in record.items():
+            if value is None or (isinstance(value, float) and np.isnan(value)):
+                self.missing.add(column)
+                continue
+            if isinstance(value, (bool, np.bool_)):
+                kind = 'bool'
+            elif isinstance(value, numbers.Integral):
+                kind = 'int'
+            elif isinstance(value, numbers.Real):
+                kind = 'float'
+            else:
+                kind = 'object'
+            if column not in self.kinds and self.count:
+                self.missing.add(column)  # Not in the previous models
+            previous = self.kinds.setdefault(column, kind)
+            if previous != kind:
+                self.kinds[column] = 'float' if {previous, kind} == {'int', 'float'} else 'object'
+
+        self.records.append(record)
+        self.count += 1
+        if len(self.records) == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self.records:
+            path = os.path.join(self.tmpdir, f'raw_{len(self.paths)}.pkl')
+            pd.DataFrame(self.records).to_pickle(path)
+            self.paths.append(path)
+            self.records = []
+
+    def dtype(self, column, kind):
+        if column in self.missing:
+            kind = {'int': 'float', 'bool': 'object'}.get(kind, kind)
+        return {'bool': 'bool', 'int': 'int64', 'float': 'float64', 'object': 'object'}[kind]
+
+    def __iter__(self):
+        self.flush()
+        for path in self.paths:
+            df = pd.read_pickle(path)
+            os.remove(path)
+            for column, kind in self.kinds.items():
+                if column not in df:
+                    df[column] = None
+                df[column] = df[column].astype(self.dtype(column, kind))
+            yield df
+
+
+def extraction(processed):
+    """
+    Extract the information of the models modified since the last synchronization into ``processed`` (see
+    enrich_models). Returns the date from which the next synchronization has to process the models.
+    """
     api = HfApi()
 
-    # Retrieve models info through HfApi call
-    models = list(api.list_models(
+    # Ens quedem només amb els nous
+    cutoff_date = Configuracio.objects.get(id=1).ultimaSincronitzacio
+
+    # Retrieve models info through HfApi call (lazily: the listing stops at the cutoff)
+    models = iter(api.list_models(
         emissions_thresholds=(0, 10000000000000000000),
         cardData=True,
         full=True,
@@ -465,56 +610,55 @@ def extraction():
         limit=20000,
     ))
 
-    print(len(models))
-
-    models = [(idx, model) for idx, model in enumerate(models)]
-
     start = time.time()
 
-    # Set the number of threads you want to use for parallel processing
-    num_threads = 8 # adjust threads
-
-    # Ens quedem només amb els nous
-    cutoff_date = Configuracio.objects.get(id=1).ultimaSincronitzacio
-    models_to_process = [(index, model_info) for index, model_info in models if model_info.last_modified >= cutoff_date]
+    # Les peticions al Hub es fan de manera asíncrona (limitades pel servei, no per fils)
+    next_cutoff = asyncio.run(enrich_models(models, cutoff_date, processed))
+    if next_cutoff is not None:
+        print(f'[SINCRO HF] models since {next_cutoff} left for the next synchronization (deadline exceeded)')
 
-    # Use ThreadPoolExecutor for parallel processing
-    with ThreadPoolExecutor(max_workers=num_threads) as executor:
-        models_information = list(executor.map(process_model, models_to_process))
-
-
-    models_information = [model for model in models_information if model is not None]
-    df = pd.DataFrame(models_information)
     end = time.time()
     print(end - start)
-    return df
+    return next_cutoff
 
 
 ########## SEGONA PART: PREPROCESSING
 
-def split_df(df):
-    if len(df) % 2 != 0:  # Handling `df` with `odd` number of rows
-        df = df.iloc[:-1, :]
-    df1, df2, df3, df4 = np.array_split(df, 4)
-    return df1, df2, df3, df4
-
-def select_top_tags(df, n):
-    not_tags = [col for col in df.columns if not col.startswith('is_')]
-    tags_names = [col for col in df.columns if col.startswith('is_')]
-    relevant_tags = df[tags_names].sum(axis=0) > n
-    relevant_tags = [index for index, value in zip(relevant_tags.index, relevant_tags.values) if value]
-    df = df[not_tags + relevant_tags]
-    return df
-
-
-def one_hot_tags(df):
-    df_onehot = df.drop('tags', axis=1).join(
-        pd.get_dummies(
-            pd.DataFrame(df.tags.tolist(), df.index).stack(),
-            prefix='is', prefix_sep='_'
-        ).astype(int).groupby(level=0).sum()
-    )
-    return df_onehot
+class TagVocabulary:
+    # Vocabulari de les etiquetes compartit per tots els trossos de les dades (etiqueta -> columna)
+
+    def __init__(self):
+        self.index = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def encode(self, tags_lists):
+        """
+        Encode the tags of the models as a sparse matrix (models x vocabulary) with the occurrences of each tag.
+        The new tags are added to the vocabulary.
+
+        Args:
+            tags_lists: An iterable of lists of tags.
+
+        Returns:
+            A CSR matrix with a column for every tag of the vocabulary so far.
+        """
+
+        indptr = [0]
+        indices = []
+        for tags in tags_lists:
+            for tag in tags:
+                column = self.index.get(tag)
+                if column is None:
+                    column = self.index[tag] = len(self.index)
+                indices.append(column)
+            indptr.append(len(indices))
+        matrix = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=np.int64), indices, indptr), shape=(len(indptr) - 1, len(self.index))
+        )
+        matrix.sum_duplicates()
+        return matrix
 
 
 def enlarge_tag_to_domain_dict(tag, tag_to_domain):
@@ -572,6 +716,17 @@ def set_library(library_name, tags, libraries_list):
     library_name = list(set(libraries + [library_name])) if not isinstance(library_name, list) else list(set(libraries + library_name))
     return [library for library in library_name if library is not None and not pd.isnull(library)]
 
+def set_library_column(library_name, tags, libraries_list):
+    # Com set_library per a tota la columna (llibreries ordenades). Les etiquetes són llistes: es busquen en un
+    # conjunt, sense crear una sèrie per fila com apply(axis=1)
+    libraries_set = set(libraries_list)
+    libraries = []
+    for name, model_tags in zip(library_name, tags):
+        found = {tag for tag in model_tags if tag in libraries_set}
+        found.update(name if isinstance(name, list) else [name])
+        libraries.append(sorted(library for library in found if library is not None and not pd.isnull(library)))
+    return pd.Series(libraries, index=library_name.index, dtype=object)
+
 def set_language(tags, languages_list):
     languages = [tag for tag in tags if tag in languages_list]
     return list(set(languages))
@@ -580,26 +735,6 @@ def set_license(tags, licenses_list):
     licenses = [tag for tag in tags if tag in licenses_list]
     return list(set(licenses))
 
-def concat_dataset_splits(df1,df2,df3,df4):
-    all_columns = set(df1.columns).union(df2.columns).union(df3.columns).union(df4.columns)
-
-    # Concatenate the DataFrames vertically with an outer join
-    df = pd.concat([df1, df2, df3, df4], axis=0, join='outer', ignore_index=True)
-
-    # Find the non-shared columns
-    dfs = [df1, df2, df3, df4]
-    non_shared_columns = set()
-
-    for i, df1 in enumerate(dfs):
-        for df2 in dfs[i + 1:]:
-            non_shared_columns = non_shared_columns.union(set(df1.columns).symmetric_difference(df2.columns))
-
-    # Fill NaN values with zeros only for non-shared columns
-    for col in non_shared_columns:
-        df[col] = df[col].fillna(0)
-
-    return df
-
 def normalize_performance_metric(metric, metric_name):
     if isinstance(metric, float):
         if metric_name in ['f1', 'accuracy']:
@@ -624,6 +759,42 @@ def normalize_performance_metric(metric, metric_name):
         print(metric, metric_name)
     return float(metric)
 
+def is_text(series):
+    return series.map(type).eq(str)
+
+def metric_from_dict(metric, metric_name):
+    try:
+        metric = ast.literal_eval(metric)
+    except (ValueError, SyntaxError):
+        return np.nan
+    return float(metric[metric_name]) if isinstance(metric, dict) and metric_name in metric else np.nan
+
+def parse_floats(strings):
+    # float() de cada text, NaN si no és un número (pd.to_numeric no sempre arrodoneix igual que float())
+    valid = pd.to_numeric(strings, errors='coerce').notna()
+    floats = np.full(len(strings), np.nan)
+    floats[valid.to_numpy()] = strings[valid].astype(float)
+    return floats
+
+def normalize_performance_metric_column(series, metric_name):
+    # Com normalize_performance_metric per a tota la columna. Els valors que no es poden llegir són NaN
+    # (normalize_performance_metric llença una excepció)
+    text = is_text(series).to_numpy()
+    metric = pd.to_numeric(series.where(~text), errors='coerce').to_numpy(dtype=float, copy=True)
+    if text.any():
+        strings = series[text]
+        # Percentatges i comes decimals (un text amb totes dues coses no és un número vàlid)
+        parsed = parse_floats(strings.str.replace('%', '', regex=False).str.replace(',', '.', regex=False))
+        # Els diccionaris (p.ex. "{'f1': 0.9}") són pocs: es llegeixen un a un
+        dicts = strings.str.contains('{', regex=False).to_numpy()
+        parsed[dicts] = [metric_from_dict(value, metric_name) for value in strings[dicts]]
+        parsed[strings.str.contains('[', regex=False).to_numpy()] = np.nan
+        metric[text] = parsed
+
+    if metric_name in ['f1', 'accuracy']:
+        metric = np.where(metric > 1, metric / 100, metric)
+    return pd.Series(metric, index=series.index, name=series.name)
+
 
 def extract_context_info(text):
     patterns = {
@@ -648,31 +819,38 @@ def extract_context_info(text):
 
     return results
 
-def context_metrics_treatment(df):
+NULL_PHRASES = ['Unknown', 'unknown', 'needed', 'Needed']
+
+def fill_with_context(column, context):
+    # Els valors que falten, amb els de la model card que no diuen que es desconeixen (p.ex. "More information needed")
+    null = context.astype(str).str.contains('|'.join(NULL_PHRASES))
+    return column.where(column.notna() | null, context)
+
+def context_metrics_treatment(df, executor=None):
     if 'modelcard_text' in df:
-        context_info_results = [extract_context_info(text) for text in df['modelcard_text']]
-
-
-        null_phrases = ['Unknown', 'unknown', 'needed', 'Needed']
-        df['hardware_used'] = [context_info_results[idx]['hardware_type']
-                               if pd.isnull(x) and all([phrase not in str(context_info_results[idx]['hardware_type']) for phrase in null_phrases]) else x
-                               for idx, x in enumerate(df['hardware_used'])]
-        df['geographical_location'] = [context_info_results[idx]['compute_region']
-                                       if pd.isnull(x) and all([phrase not in str(context_info_results[idx]['compute_region']) for phrase in null_phrases]) else x
-                                       for idx, x in enumerate(df['geographical_location'])]
-        df['co2_eq_emissions'] = [context_info_results[idx]['carbon_emitted']
-                                  if pd.isnull(x) and all([phrase not in str(context_info_results[idx]['carbon_emitted']) for phrase in null_phrases]) else x
-                                  for idx, x in enumerate(df['co2_eq_emissions'])]
-        df['hours_used'] = [context_dict['hours_used'] for context_dict in context_info_results]
-        df['cloud_provider'] = [context_dict['cloud_provider'] for context_dict in context_info_results]
+        texts = df['modelcard_text'].tolist()
+        # Enviar els textos als processos té un cost: el pool només s'utilitza amb molt de text
+        chars = sum(len(text) for text in texts if isinstance(text, str))
+        if chars < getattr(settings, 'HF_SYNC_SCAN_PARALLEL_CHARS', 16000000):
+            executor = None
+        context_info_results = pd.DataFrame(
+            scan_model_cards(texts, getattr(settings, 'HF_SYNC_CARD_MAX_CHARS', 100000), executor),
+            index=df.index, columns=list(SCANNED_FIELDS),
+        )
+
+        df['hardware_used'] = fill_with_context(df['hardware_used'], context_info_results['hardware_type'])
+        df['geographical_location'] = fill_with_context(df['geographical_location'], context_info_results['compute_region'])
+        df['co2_eq_emissions'] = fill_with_context(df['co2_eq_emissions'], context_info_results['carbon_emitted'])
+        df['hours_used'] = context_info_results['hours_used']
+        df['cloud_provider'] = context_info_results['cloud_provider']
 
     return df
 
 def performance_metrics_treatment(df):
-    df['f1'] = df['f1'].apply(lambda x: normalize_performance_metric(x, 'f1')) if 'f1' in df.keys() else None
-    df['accuracy'] = df['accuracy'].apply(lambda x: normalize_performance_metric(x, 'accuracy')) if 'accuracy' in df.keys() else None
-    df['rouge1'] = df['rouge1'].apply(lambda x: normalize_performance_metric(x, 'rouge1')) if 'rouge1' in df.keys() else None
-    df['rougeL'] = df['rougeL'].apply(lambda x: normalize_performance_metric(x, 'rougeL')) if 'rougeL' in df.keys() else None
+    df['f1'] = normalize_performance_metric_column(df['f1'], 'f1') if 'f1' in df.keys() else None
+    df['accuracy'] = normalize_performance_metric_column(df['accuracy'], 'accuracy') if 'accuracy' in df.keys() else None
+    df['rouge1'] = normalize_performance_metric_column(df['rouge1'], 'rouge1') if 'rouge1' in df.keys() else None
+    df['rougeL'] = normalize_performance_metric_column(df['rougeL'], 'rougeL') if 'rougeL' in df.keys() else None
     return df
 
 
@@ -690,41 +868,74 @@ def harmonize_co2(co2):
 
     return float(co2_found.group(0))
 
+def harmonize_co2_column(series):
+    # Com harmonize_co2 per a tota la columna: els números es mantenen i dels textos es llegeix el número inicial
+    text = is_text(series)
+    co2 = pd.to_numeric(series.where(~text), errors='coerce')
+    if text.any():
+        co2 = co2.astype(float)
+        co2[text] = series[text].str.extract(r'^(\d+\.\d+|\d+)', expand=False).astype(float)
+    return co2
 
-def min_max_normalize(series):
-    return (series - series.min()) / (series.max() - series.min())
 
-def performance_score(df):
-    metrics = ['accuracy', 'f1', 'rouge1', 'rougeL']
+PERFORMANCE_METRICS = ['accuracy', 'f1', 'rouge1', 'rougeL']
 
-    df['f1'] = min_max_normalize(df['f1'])
-    df['accuracy'] = min_max_normalize(df['accuracy'])
-    df['rouge1'] = min_max_normalize(df['rouge1'])
-    df['rougeL'] = min_max_normalize(df['rougeL'])
-    return df.apply(lambda row: stats.hmean([row[metric] for metric in metrics if not np.isnan(row[metric])]), axis=1)
 
+def min_max_normalize(series, minimum=None, maximum=None):
+    # Per defecte, el mínim i el màxim de la sèrie (en un tros de les dades, els de totes)
+    minimum = series.min() if minimum is None else minimum
+    maximum = series.max() if maximum is None else maximum
+    return (series - minimum) / (maximum - minimum)
 
-def preprocessing_rawData(df):
-    pd.options.mode.chained_assignment = None
+def performance_score(df, bounds=None):
+    metrics = PERFORMANCE_METRICS
+    bounds = bounds or {}
+
+    for metric in metrics:
+        df[metric] = min_max_normalize(df[metric].astype(float), *bounds.get(metric, (None, None)))
+    return harmonic_mean_present(df[metrics].to_numpy(dtype=float), df.index)
+
+def harmonic_mean_present(values, index):
+    # Mitjana harmònica dels valors de cada fila que no són NaN, com stats.hmean: 0 si algun és 0 i NaN si no n'hi ha cap
+    present = ~np.isnan(values)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverses = np.where(present, 1 / values, 0)
+        return pd.Series(1 / (inverses.sum(axis=1) / present.sum(axis=1)), index=index)
 
+
+TOP_TAGS_MIN_COUNT = 100
+
+
+def iter_chunks(df, chunk_size):
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size].copy()
+
+
+def load_tags_metadata():
     with open('connectors/tags_metadata.yaml') as file:
-        tags_metadata = yaml.safe_load(file)
+        return yaml.safe_load(file)
 
 
+def preprocess_chunk(df, tags_metadata, executor=None):
+    # Part del preprocessament que només depèn de cada fila (es pot fer per trossos)
+    # (executor: pool de processos per a les model cards dels trossos grans)
+    pd.options.mode.chained_assignment = None
+
     df = performance_metrics_treatment(df)
-    df = context_metrics_treatment(df)
+    df = context_metrics_treatment(df, executor)
 
     #Curation
     df['modelName'] = df['modelId'].apply(lambda x: x.split('/')[1] if len(x.split('/')) > 1 else x) #remove author from modelId
     df['modelAuthor'] = df['modelId'].apply(lambda x: x.split('/')[0] if len(x.split('/')) > 1 else None) #remove name from modelId
-    df['co2_eq_emissions'] = df['co2_eq_emissions'].apply(lambda co2: harmonize_co2(co2)) #harmonize plenty of co2 values
+    df['co2_eq_emissions'] = harmonize_co2_column(df['co2_eq_emissions']) #harmonize plenty of co2 values
     df['tags'] = df['tags'].apply(lambda tags: tags_treatment(tags, tags_metadata)) # filter and treat tags
     df['lastModified'] = pd.to_datetime(df['lastModified']) # convert the 'lastModified' column to datetime objects
     df['created_at'] = pd.to_datetime(df['created_at']) # convert the 'lastModified' column to datetime objects
-    df['library_name'] = df.apply(lambda row: set_library(row['library_name'], row['tags'], tags_metadata['libraries']), axis=1) # adds libraries used by model
+    df['library_name'] = set_library_column(df['library_name'], df['tags'], tags_metadata['libraries']) # adds libraries used by model
     df["datasets_size"] = df["datasets_size"].replace(0, np.nan)
     df = df[df['co2_eq_emissions'] != 0]
-
+    if df.empty:
+        return df
 
     #Feature Engineering
     df['co2_reported'] = df['co2_eq_emissions'].apply(lambda x: 0 if pd.isnull(x) or x is None else 1)
@@ -733,15 +944,95 @@ def preprocessing_rawData(df):
     df['domain'] = df['tags'].apply(lambda tags: assign_model_domain(tags, tags_metadata['tags_to_domain']))
     df['year_month'] = df['created_at'].apply(lambda x: x.strftime('%Y-%m')) #  column 'year_month' to group the data monthly
     df['size_efficency'] = df['size'] / df['co2_eq_emissions']
-    df['performance_score'] = performance_score(df)
+    return df
 
-    # we split, one hot and then combine splits to avoid memory overflow if we one-hot'ed with the whole dataset alltogether
-    df1,df2,df3,df4 = split_df(df)
-    df1,df2,df3,df4 = one_hot_tags(df1), one_hot_tags(df2), one_hot_tags(df3), one_hot_tags(df4)
-    df1,df2,df3,df4 = select_top_tags(df1, 100), select_top_tags(df2, 100), select_top_tags(df3, 100), select_top_tags(df4, 100)
-    df = concat_dataset_splits(df1,df2,df3,df4)
 
-    return df
+class PreprocessingStats:
+    # Estadístiques de totes les dades, acumulades tros a tros en la primera passada
+
+    def __init__(self):
+        self.bounds = {}
+        self.vocabulary = TagVocabulary()
+        self.tag_counts = np.zeros(0, dtype=np.int64)  # Aparicions de cada etiqueta del vocabulari
+
+    def update(self, df):
+        """Accumulate the statistics of a chunk. Returns the sparse encoding of its tags."""
+        for metric in PERFORMANCE_METRICS:
+            values = df[metric].astype(float)
+            if values.notna().any():
+                minimum, maximum = self.bounds.get(metric, (np.inf, -np.inf))
+                self.bounds[metric] = (min(minimum, values.min()), max(maximum, values.max()))
+
+        tags = self.vocabulary.encode(df['tags'])
+        counts = np.zeros(len(self.vocabulary), dtype=np.int64)
+        counts[:len(self.tag_counts)] = self.tag_counts
+        self.tag_counts = counts + np.asarray(tags.sum(axis=0)).ravel()
+        return tags
+
+    def top_tags(self, n):
+        """Tags with more than n occurrences in all the data, sorted like the columns of get_dummies, and their columns."""
+        tags = {column: tag for tag, column in self.vocabulary.index.items()}
+        selected = sorted((tags[column], column) for column in np.flatnonzero(self.tag_counts > n))
+        return [tag for tag, column in selected], [column for tag, column in selected]
+
+
+def finish_chunk(df, tags, stats, top_tags):
+    # Part del preprocessament que depèn de totes les dades (segona passada)
+    df['performance_score'] = performance_score(df, stats.bounds)
+
+    # Només es densifiquen les columnes de les etiquetes més freqüents. La matriu del tros no té les columnes
+    # de les etiquetes que han aparegut per primer cop en trossos posteriors: són zeros
+    names, columns = top_tags
+    tags.resize((tags.shape[0], len(stats.vocabulary)))
+    dense = tags[:, columns].toarray()
+    return df.join(pd.DataFrame(dense, columns=['is_' + tag for tag in names], index=df.index))
+
+
+def preprocessing_rawData_chunks(chunks, tmpdir):
+    """
+    Preprocess the extracted data in chunks, in bounded memory.
+
+    Args:
+        chunks: An iterable of DataFrames with the extracted data.
+        tmpdir: A directory where the chunks are kept between the two passes.
+
+    Returns:
+        A generator of the preprocessed chunks. They all have the same columns and, together, are the same as
+        preprocessing all the data at once.
+    """
+
+    tags_metadata = load_tags_metadata()
+
+    # Primera passada: preprocessament de cada fila i estadístiques de totes les dades
+    # (les etiquetes de cada tros es desen codificades com a matriu dispersa)
+    stats = PreprocessingStats()
+    paths = []
+    with process_pool(getattr(settings, 'HF_SYNC_SCAN_WORKERS', None)) as executor:
+        for chunk in chunks:
+            chunk = preprocess_chunk(chunk, tags_metadata, executor)
+            if chunk.empty:
+                continue
+            tags = stats.update(chunk)
+            path = os.path.join(tmpdir, f'preRaw_{len(paths)}')
+            chunk.drop('tags', axis=1).to_pickle(path + '.pkl')
+            sparse.save_npz(path + '.npz', tags)
+            paths.append(path)
+
+    # Segona passada: puntuació de rendiment (normalitzada amb totes les dades) i etiquetes més freqüents
+    top_tags = stats.top_tags(TOP_TAGS_MIN_COUNT)
+    for path in paths:
+        yield finish_chunk(pd.read_pickle(path + '.pkl'), sparse.load_npz(path + '.npz'), stats, top_tags)
+        os.remove(path + '.pkl')
+        os.remove(path + '.npz')
+
+
+def preprocessing_rawData(df, chunk_size=None):
+    chunk_size = chunk_size or getattr(settings, 'HF_SYNC_CHUNK_SIZE', 2000)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        chunks = list(preprocessing_rawData_chunks(iter_chunks(df, chunk_size), tmpdir))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
 
 """## Preprocessing of CO2 data
 
@@ -841,10 +1132,32 @@ def create_performance_metrics(row):
     return {'accuracy': row['accuracy'], 'f1': row['f1'], 'rouge1': row['rouge1'], 'rougeL': row['rougeL']}
 
 
-def preprocessing_co2(df):
+# Versions per a columnes senceres de combine_sources i create_performance_metrics (np.select: la primera
+# condició que es compleix dona el valor, com l'ordre dels if)
+
+def contains(series, text):
+    return series.str.contains(text, regex=False).fillna(False).astype(bool)
+
+def combine_sources_column(source, auto):
+    conditions = [
+        auto.astype(bool),
+        source == 'code carbon',
+        contains(source, 'mlco2') | contains(source, 'ML CO2'),
+        contains(source, 'BLOOM'),
+        contains(source, 'Google Cloud'),
+    ]
+    choices = ['AutoTrain', 'Code Carbon', 'MLCO2', 'Article', 'Google Cloud Footprint']
+    return pd.Series(np.select(conditions, choices, default='Not Specified'), index=source.index, dtype=object)
+
+def create_performance_metrics_column(df):
+    return pd.Series(df[PERFORMANCE_METRICS].to_dict(orient='records'), index=df.index, dtype=object)
+
+
+def preprocessing_co2(df, df_clean=None):
     df = read_df_processed(df)
 
-    df_clean = read_df_clean()
+    if df_clean is None:
+        df_clean = read_df_clean()
 
     df = df[df['co2_reported'] == True]
 
@@ -859,7 +1172,7 @@ def preprocessing_co2(df):
     df['geographical_location'] = df['geographical_location'].fillna('Not Specified')
     df['hardware_used'] = df['hardware_used'].fillna('Not Specified')
 
-    df['source'] = df.apply(lambda row: combine_sources(row['source'], row['auto']), axis=1)
+    df['source'] = combine_sources_column(df['source'], df['auto'])
     df['geographical_location'] = df['geographical_location'].apply(lambda location: combine_location(location))
     df['training_type'] = df['training_type'].apply(lambda training_type: combine_training_type(training_type))
     df['size_efficency'] = df['size'] / df['co2_eq_emissions']
@@ -873,7 +1186,7 @@ def preprocessing_co2(df):
 
     df['lastModified'] = pd.to_datetime(df['lastModified'])
     df['lastModified'] = df['lastModified'].dt.date
-    df['performance_metrics'] = df.apply(create_performance_metrics, axis=1)
+    df['performance_metrics'] = create_performance_metrics_column(df)
 
     wanted_columns = ['modelName', 'modelAuthor', 'datasets', 'datasets_size', 'co2_eq_emissions', 'co2_reported', 'source', 'training_type', 'geographical_location', 'hardware_used', 'performance_metrics', 'performance_score',
                       'downloads', 'likes', 'library_name', 'domain', 'size', 'created_at', 'lastModified', 'size_efficency', 'datasets_size_efficency']
@@ -916,6 +1229,8 @@ def inicialitzar_entrenament(entrenament, model_info):
                 valor=model_info[informacio.id]
             )
 
+    estadistiques.actualitzar_qualificacio(entrenament)
+
 
 def crear_model(model_info):
     model = Model.objects.create(
@@ -959,6 +1274,8 @@ def actualitzar_model(model, model_info):
                 info.valor = model_info[informacio.id]
                 info.save()
 
+        estadistiques.actualitzar_qualificacio(entrenament)
+
     # En cas que no hi hagi data o no coincideixi amb cap entrenament del model, en crearem un de nou.
     except Entrenament.DoesNotExist:
         entrenament = Entrenament.objects.create(
@@ -993,29 +1310,42 @@ def sincro_huggingFace():
         updated = []
 
         print('[SINCRO HF] starting hugging face synchronization')
-        df_extracted = extraction()
-        print('[SINCRO HF] extraction done')
-        if len(df_extracted) == 0:
-            print('[SINCRO HF] no models to process')
-        else:
-            df_preprocessed_raw = preprocessing_rawData(df_extracted)
-            print('[SINCRO HF] pre raw done')
-            df_preprocessed_raw.to_csv('./hf_preRaw.csv', index=False)
-            # df_preprocessed_raw = pd.read_csv('./hf_preRaw.csv')
-
-            df_final = preprocessing_co2(df_preprocessed_raw)
-            print('[SINCRO HF] pre co2 done')
-            df_final.to_csv('./hf_sincro.csv', index=False)
-            # df_final = pd.read_csv('./hf_sincro.csv')
-
-            df_json_records = df_final.to_json(orient='records')
-            json_list = pd.read_json(df_json_records, orient='records').to_dict(orient='records')
-            json_list_replaced = replace_none(json_list)
-
-            created, updated = modify_database(json_list_replaced)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # Els models extrets es desen a disc per trossos a mesura que es processen (mai no són tots en memòria)
+            extracted = RawChunks(tmpdir, getattr(settings, 'HF_SYNC_CHUNK_SIZE', 2000))
+            next_cutoff = extraction(extracted)
+            print('[SINCRO HF] extraction done')
+            if len(extracted) == 0:
+                print('[SINCRO HF] no models to process')
+            else:
+                # Preprocessament per trossos: els fitxers es van escrivint i la BD es va actualitzant tros a tros
+                df_clean = read_df_clean()
+                first_raw = first_final = True
+                for df_preprocessed_raw in preprocessing_rawData_chunks(extracted, tmpdir):
+                    df_preprocessed_raw.to_csv('./hf_preRaw.csv', index=False, mode='w' if first_raw else 'a', header=first_raw)
+                    first_raw = False
+                    if not (df_preprocessed_raw['co2_reported'] == True).any():
+                        continue
+
+                    df_final = preprocessing_co2(df_preprocessed_raw, df_clean)
+                    df_final.to_csv('./hf_sincro.csv', index=False, mode='w' if first_final else 'a', header=first_final)
+                    first_final = False
+
+                    df_json_records = df_final.to_json(orient='records')
+                    json_list = pd.read_json(df_json_records, orient='records').to_dict(orient='records')
+                    json_list_replaced = replace_none(json_list)
+
+                    created_chunk, updated_chunk = modify_database(json_list_replaced)
+                    created += created_chunk
+                    updated += updated_chunk
+            print('[SINCRO HF] preprocessing done')
 
         configuracio = Configuracio.objects.get(id=1)
-        configuracio.ultimaSincronitzacio = datetime.now(pytz.timezone('Europe/Madrid'))
+        if next_cutoff is not None:
+            # Els models que no s'han pogut processar a temps entren a la propera sincronització
+            configuracio.ultimaSincronitzacio = next_cutoff
+        else:
+            configuracio.ultimaSincronitzacio = datetime.now(pytz.timezone('Europe/Madrid'))
         configuracio.save()
 
         return created, updated
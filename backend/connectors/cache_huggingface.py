@@ -0,0 +1,126 @@
+"""
+On-disk cache of the Hugging Face Hub metadata, for conditional requests.
+
+Most of the metadata requested in a synchronization (commits, model cards, dataset infos) has not changed
+since the previous one. The responses are stored in SQLite by URL with their validators (ETag and
+Last-Modified), so the next request is sent with If-None-Match / If-Modified-Since and a 304 answer is
+served from the stored copy: a round trip instead of the payload. The cache has a size limit, over which
+the least recently used responses are evicted.
+"""
+import sqlite3
+import time
+
+# Writes between two commits to disk (the cache is also committed when closed)
+COMMIT_EVERY = 200
+# On eviction, the cache is reduced to this fraction of its limit, so not every write evicts
+EVICTION_TARGET = 0.9
+
+
+class CachedResponse:
+    def __init__(self, body, etag, last_modified):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def conditional_headers(self):
+        """Headers of the request that revalidates the stored response."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class MetadataCache:
+    """
+    Args:
+    path : SQLite file of the cache (created if needed)
+    max_bytes : maximum size of the stored bodies
+    """
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._writes = 0
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB NOT NULL, size INTEGER NOT NULL, '
+            'last_access REAL NOT NULL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+        self.size = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._connection.commit()
+        self._connection.close()
+
+    def _written(self):
+        self._writes += 1
+        if self._writes % COMMIT_EVERY == 0:
+            self._connection.commit()
+
+    def get(self, url):
+        """Stored response of the URL (CachedResponse) or None."""
+        row = self._connection.execute(
+            'SELECT body, etag, last_modified FROM responses WHERE url = ?', (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        return CachedResponse(*row)
+
+    def hit(self, url):
+        """The stored response of the URL is still valid (304): it becomes the most recently used."""
+        self.hits += 1
+        self._connection.execute('UPDATE responses SET last_access = ? WHERE url = ?', (time.time(), url))
+        self._written()
+
+    def store(self, url, body, etag, last_modified):
+        """Stores a response of the URL, if it has validators (otherwise it could never be revalidated)."""
+        self.misses += 1
+        if not etag and not last_modified:
+            self.discard(url)
+            return
+        size = len(body)
+        if size > self.max_bytes:
+            self.discard(url)
+            return
+        previous = self._connection.execute('SELECT size FROM responses WHERE url = ?', (url,)).fetchone()
+        self._connection.execute(
+            'INSERT OR REPLACE INTO responses (url, etag, last_modified, body, size, last_access) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (url, etag, last_modified, body, size, time.time()),
+        )
+        self.size += size - (previous[0] if previous else 0)
+        self._written()
+        if self.size > self.max_bytes:
+            self.evict(int(self.max_bytes * EVICTION_TARGET))
+
+    def discard(self, url):
+        stored = self._connection.execute('SELECT size FROM responses WHERE url = ?', (url,)).fetchone()
+        if stored:
+            self._connection.execute('DELETE FROM responses WHERE url = ?', (url,))
+            self.size -= stored[0]
+            self._written()
+
+    def evict(self, target):
+        """Removes the least recently used responses until the stored bodies take at most ``target`` bytes."""
+        evicted = []
+        freed = 0
+        for url, size in self._connection.execute('SELECT url, size FROM responses ORDER BY last_access'):
+            if self.size - freed <= target:
+                break
+            evicted.append((url,))
+            freed += size
+        self._connection.executemany('DELETE FROM responses WHERE url = ?', evicted)
+        self._connection.commit()
+        self.size -= freed
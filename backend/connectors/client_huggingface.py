@@ -0,0 +1,217 @@
+"""
+Asynchronous client of the Hugging Face Hub for the enrichment of the synchronized models.
+
+All the requests share one pool of connections (httpx.AsyncClient, kept alive between requests). The
+concurrent requests to each host are limited, transient errors (timeouts, connection errors, 429 and 5xx)
+are retried with jittered exponential backoff, and the client has a deadline: once it is over no request
+is started or retried and the running ones are cut short (DeadlineExceeded). With a MetadataCache (see
+cache_huggingface.py), the metadata GETs are conditional requests revalidating the stored responses.
+The sizes of the datasets are resolved once per client (DatasetSizeResolver), since many models share them.
+"""
+import asyncio
+import random
+import time
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+from huggingface_hub import ModelCard, hf_hub_url
+from huggingface_hub.utils import build_hf_headers
+
+HF_ENDPOINT = 'https://huggingface.co'
+RETRY_STATUS = (429, 500, 502, 503, 504)
+MAX_RELATIVE_REDIRECTS = 5
+
+
+class DeadlineExceeded(Exception):
+    """The deadline of the client is over."""
+
+
+class HubClient:
+    """
+    Args:
+    token : Hugging Face token (None: the one saved by huggingface_hub, if any)
+    concurrency_per_host : maximum concurrent requests to each host
+    timeout : seconds of each request
+    retries : retries of a request after a transient error
+    backoff : base seconds of the backoff (doubled on every retry, with random jitter)
+    max_delay : maximum seconds between two attempts, also for the Retry-After of the server
+    deadline : seconds from the creation of the client after which no more requests are done (None: no limit)
+    cache : MetadataCache of the GET responses (None: no cache)
+    transport : httpx transport of the requests (None: the network)
+    """
+
+    def __init__(self, token=None, concurrency_per_host=16, timeout=10, retries=3, backoff=0.5, max_delay=30,
+                 deadline=None, cache=None, transport=None):
+        self.headers = build_hf_headers(token=token)
+        self.concurrency_per_host = concurrency_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.deadline = None if deadline is None else time.monotonic() + deadline
+        self.cache = cache
+        self.transport = transport
+        self.dataset_sizes = DatasetSizeResolver(self)
+        self._semaphores = {}
+        self._client = None
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=self.concurrency_per_host),
+            transport=self.transport,
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+
+    def remaining(self):
+        """Seconds until the deadline (None: no deadline)."""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def _semaphore(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.concurrency_per_host)
+        return self._semaphores[host]
+
+    def _delay(self, attempt, response):
+        # Retry-After of the server (in seconds) or exponential backoff with full jitter, at most max_delay
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after is not None and retry_after.isdigit():
+            return min(float(retry_after), self.max_delay)
+        return random.uniform(0, min(self.backoff * 2 ** attempt, self.max_delay))
+
+    async def request(self, method, url, **kwargs):
+        """
+        Sends a request, retrying transient errors. Returns the last response (which can be an error one)
+        or raises the last connection error, or DeadlineExceeded.
+        """
+        for attempt in range(self.retries + 1):
+            response = error = None
+            async with self._semaphore(url):
+                # Checked once the request can be sent (waiting for the host can take long)
+                remaining = self.remaining()
+                if remaining is not None and remaining <= 0:
+                    raise DeadlineExceeded(url)
+                try:
+                    response = await asyncio.wait_for(self._client.request(method, url, **kwargs), remaining)
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded(url)
+                except httpx.TransportError as exception:
+                    error = exception
+            if response is not None and response.status_code not in RETRY_STATUS:
+                return response
+            if attempt == self.retries:
+                break
+
+            delay = self._delay(attempt, response)
+            remaining = self.remaining()
+            if remaining is not None and delay >= remaining:
+                raise DeadlineExceeded(url)
+            await asyncio.sleep(delay)
+
+        if error is not None:
+            raise error
+        return response
+
+    async def get(self, url, **kwargs):
+        """GET request, revalidating the cached response if there is one (a 304 is answered from the cache)."""
+        if self.cache is None:
+            return await self.request('GET', url, **kwargs)
+
+        cached = self.cache.get(url)
+        headers = dict(kwargs.pop('headers', None) or {})
+        if cached is not None:
+            headers.update(cached.conditional_headers())
+        response = await self.request('GET', url, headers=headers, **kwargs)
+        if response.status_code == 304 and cached is not None:
+            self.cache.hit(url)
+            # The stored body is already decoded, so none of the headers of the 304 (e.g. Content-Encoding) apply
+            return httpx.Response(200, content=cached.body, request=response.request)
+        if response.status_code == 200:
+            self.cache.store(url, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response
+
+    async def get_json(self, url):
+        response = await self.get(url)
+        response.raise_for_status()
+        return response.json()
+
+    async def created_at(self, model_id):
+        """Date of the first commit of the model."""
+        commits = await self.get_json(f'{HF_ENDPOINT}/api/models/{model_id}/commits/main')
+        return commits[-1]['date']
+
+    async def model_card_text(self, model_id):
+        """Text of the model card (without its metadata), like ModelCard.load(model_id).text."""
+        response = await self.get(hf_hub_url(repo_id=model_id, filename='README.md'), follow_redirects=True)
+        response.raise_for_status()
+        return ModelCard(response.text).text
+
+    async def file_size(self, model_id, filename):
+        """Size of a file of the model, like get_hf_file_metadata(hf_hub_url(model_id, filename)).size."""
+        url = hf_hub_url(repo_id=model_id, filename=filename)
+        headers = {'Accept-Encoding': 'identity'}  # The real size of the file, not the compressed one
+        response = await self.request('HEAD', url, headers=headers)
+        # Only relative redirects are followed (e.g. renamed repositories): the absolute ones go to the
+        # storage of the file, and the headers of the Hub already have its size
+        for _ in range(MAX_RELATIVE_REDIRECTS):
+            location = response.headers.get('Location')
+            if not response.is_redirect or location is None or urlsplit(location).netloc:
+                break
+            response = await self.request('HEAD', urljoin(str(response.url), location), headers=headers)
+        if not response.is_redirect:
+            response.raise_for_status()
+        size = response.headers.get('X-Linked-Size') or response.headers.get('Content-Length')
+        return int(size) if size is not None else None
+
+    async def dataset_size(self, dataset):
+        """Size of a dataset declared in its card, like HfApi().dataset_info(dataset).cardData[...]."""
+        info = await self.get_json(f'{HF_ENDPOINT}/api/datasets/{dataset}')
+        return info['cardData']['dataset_info']['dataset_size']
+
+
+class DatasetSizeResolver:
+    """
+    Sizes of the datasets, shared by the models processed with a client. Concurrent lookups of a dataset
+    share a single request and the results are kept ``ttl`` seconds (the failures, ``failure_ttl``).
+
+    Args:
+    client : HubClient that requests the sizes
+    """
+
+    def __init__(self, client, ttl=3600, failure_ttl=60, clock=time.monotonic):
+        self.client = client
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.clock = clock
+        self.requests = 0
+        self._lookups = {}  # dataset: (task, expiry or None while running)
+
+    def _done(self, dataset, task):
+        if task.cancelled() or isinstance(task.exception(), DeadlineExceeded):
+            expiry = self.clock()  # Not a result of the dataset: it is looked up again
+        elif task.exception() is not None:
+            print(f'Error for dataset {dataset}: {task.exception()!r}')
+            expiry = self.clock() + self.failure_ttl
+        else:
+            expiry = self.clock() + self.ttl
+        self._lookups[dataset] = (task, expiry)
+
+    def _lookup(self, dataset):
+        self.requests += 1
+        task = asyncio.ensure_future(self.client.dataset_size(dataset))
+        self._lookups[dataset] = (task, None)
+        task.add_done_callback(lambda task: self._done(dataset, task))
+        return task
+
+    async def size(self, dataset):
+        """Size of the dataset. Raises the error of its lookup (the same for all who wait for it)."""
+        task, expiry = self._lookups.get(dataset, (None, None))
+        if task is None or (expiry is not None and self.clock() >= expiry):
+            task = self._lookup(dataset)
+        # The lookup is not cancelled if one of the models waiting for it is
+        return await asyncio.shield(task)
@@ -0,0 +1,126 @@
+"""
+Scanner of the context of the training written in the model cards (hardware, hours used, cloud provider, compute
+region, carbon emitted and training type), for the preprocessing of the Hugging Face synchronization.
+
+extract_context_info (adaptador_huggingface.py) searches the whole text once per field. The scanner finds the
+names of all the fields in a single pass with one combined pattern, and reads the value of a field with its own
+precompiled pattern where its name is found (or at the next occurrence of the name, if there is no value there).
+It stops as soon as all the fields have a value. The values are the same as those of extract_context_info.
+
+The model cards can be very long: only their first ``max_chars`` characters are scanned (cut at the last line
+break within them, or in the middle of the line if there is none). Large batches of model cards can be scanned in a pool of processes (see process_pool): this module does not
+import Django, so its processes start quickly and without the state of the server.
+"""
+import contextlib
+import functools
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Nom de cada camp i patró del seu valor, a continuació del nom (com els patrons de extract_context_info)
+FIELDS = {
+    'hardware_type': ('hardware', r'(?:\s*type)*\s*:+\s*(.+)'),
+    'hours_used': ('hours used', r'\s*:+\s*(.+)'),
+    'cloud_provider': ('cloud provider', r'\s*:+\s*(.+)'),
+    'compute_region': ('compute region', r'\s*:+\s*(.+)'),
+    'carbon_emitted': ('carbon emitted', r'\s*:+\s*(.+)'),
+    'training_type': ('training', r'(?:\s*type)*\s*:+\s*(.+)'),
+}
+# Un sol patró per als noms de tots els camps. La primera lletra al davant permet descartar de seguida les posicions
+# on no comença cap nom, en lloc de provar-hi cada alternativa
+NAMES = re.compile(
+    '(?=[%s])(?:%s)' % (
+        ''.join(sorted({name[0] for name, value in FIELDS.values()})),
+        '|'.join(f'(?P<{field}>{re.escape(name)})' for field, (name, value) in FIELDS.items()),
+    ),
+    re.IGNORECASE,
+)
+VALUES = {field: re.compile(value, re.IGNORECASE) for field, (name, value) in FIELDS.items()}
+
+# Model cards scanned by each task of the pool
+BATCH_SIZE = 200
+
+
+def truncate(text, max_chars):
+    # Els primers max_chars caràcters, tallats a l'últim salt de línia dins del límit (o a mitja línia si no n'hi ha cap)
+    if len(text) <= max_chars:
+        return text
+    end = text.rfind('\n', 0, max_chars)
+    return text[:end + 1] if end >= 0 else text[:max_chars]
+
+
+def scan_model_card(text, max_chars=None):
+    """
+    Context of the training in the text of a model card, like extract_context_info.
+
+    Args:
+        text: The text of the model card (None or NaN: no context).
+        max_chars: Characters of the text that are scanned (None: all).
+
+    Returns:
+        A dictionary with the value of every field (None if it is not found).
+    """
+
+    context = dict.fromkeys(FIELDS)
+    if not isinstance(text, str):
+        return context
+    if max_chars is not None:
+        text = truncate(text, max_chars)
+
+    pending = set(FIELDS)
+    for name in NAMES.finditer(text):
+        field = name.lastgroup
+        if field not in pending:
+            continue
+        value = VALUES[field].match(text, name.end())
+        if value:
+            context[field] = value.group(1)
+            pending.discard(field)
+            if not pending:
+                break
+    return context
+
+
+def scan_batch(texts, max_chars=None):
+    return [scan_model_card(text, max_chars) for text in texts]
+
+
+def scan_model_cards(texts, max_chars=None, executor=None):
+    """
+    Context of the training in the texts of a batch of model cards.
+
+    Args:
+        texts: A list of texts of model cards.
+        max_chars: Characters of each text that are scanned (None: all).
+        executor: A pool of processes where the texts are scanned (None: in this process).
+
+    Returns:
+        A list with the context of each model card, in the order of the texts.
+    """
+
+    if executor is None:
+        return scan_batch(texts, max_chars)
+    batches = [texts[start:start + BATCH_SIZE] for start in range(0, len(texts), BATCH_SIZE)]
+    try:
+        scanned = executor.map(functools.partial(scan_batch, max_chars=max_chars), batches)
+        return [context for batch in scanned for context in batch]
+    except BrokenProcessPool as e:
+        # P.ex. el mòdul principal del programa no es pot importar en els processos: s'analitzen en aquest
+        print(f'Model cards scanned without processes: {e}')
+        return scan_batch(texts, max_chars)
+
+
+def process_pool(workers):
+    """
+    Pool of processes for scan_model_cards, as a context manager (a null context, without a pool, for less than
+    two workers; None: one per CPU). The processes are started with spawn: the synchronization runs in a thread of
+    the server, and a fork would copy the locks held by its other threads.
+    """
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 2:
+        return contextlib.nullcontext()
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
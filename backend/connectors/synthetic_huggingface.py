@@ -0,0 +1,100 @@
+"""
+Synthetic data of the Hugging Face synchronization, for the tests and benchmarks of the preprocessing.
+
+The rows have the columns of the models extracted by extraction() (adaptador_huggingface.py) and the variety of
+formats found in the model cards: metrics as numbers, percentages, decimal commas, dictionaries and lists;
+emissions as numbers or texts with units; model cards with and without the context of the training.
+"""
+import random
+
+import pandas as pd
+
+TAGS = [f'tag{i}' for i in range(400)] + [
+    'pytorch', 'transformers', 'jax', 'en', 'es', 'license:mit', 'text-classification', 'autotrain', 'Some Tag',
+]
+
+
+def _metric(rnd, name):
+    r = rnd.random()
+    if r < 0.4:
+        return None
+    if r < 0.6:
+        return rnd.uniform(0, 1)
+    if r < 0.7:
+        return rnd.uniform(1, 100)
+    if r < 0.8:
+        return f'{rnd.uniform(1, 99):.2f}%'
+    if r < 0.9:
+        return f'0,{rnd.randint(1, 99)}'
+    if r < 0.95:
+        return str(rnd.uniform(0, 1))
+    if r < 0.98:
+        return '[0.5, 0.7]'
+    return '{"%s": %s}' % (name, rnd.uniform(0, 1))
+
+
+def _co2(rnd):
+    r = rnd.random()
+    if r < 0.45:
+        return None
+    if r < 0.5:
+        return 0
+    if r < 0.6:
+        return rnd.randint(1, 500)
+    if r < 0.8:
+        return rnd.uniform(0.1, 1000)
+    if r < 0.95:
+        return f'{rnd.uniform(1, 99):.1f} g'
+    return 'unknown'
+
+
+def _model_card(rnd):
+    if rnd.random() < 0.2:
+        return None
+    lines = ['# Model card']
+    if rnd.random() < 0.3:
+        lines.append('- Hardware Type: ' + rnd.choice(['A100', 'V100', 'More information needed']))
+    if rnd.random() < 0.3:
+        lines.append(f'- Hours used: {rnd.randint(1, 100)}')
+    if rnd.random() < 0.2:
+        lines.append('- Cloud Provider: ' + rnd.choice(['AWS', 'GCP']))
+    if rnd.random() < 0.3:
+        lines.append('- Compute Region: ' + rnd.choice(['us-east', 'Unknown']))
+    if rnd.random() < 0.2:
+        lines.append(f'- Carbon Emitted: {rnd.uniform(0.1, 50):.2f} kg')
+    lines += ['Lorem ipsum dolor sit amet.'] * rnd.randint(0, 50)
+    return '\n'.join(lines) + '\n'
+
+
+def synthetic_extraction(n, seed=0):
+    """DataFrame of n synthetic models, like all the chunks of the models extracted by extraction()."""
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        tags = [rnd.choice(TAGS) if rnd.random() < 0.5 else rnd.choice(TAGS[:20] + TAGS[-9:])
+                for _ in range(rnd.randint(0, 8))]
+        rows.append({
+            'modelId': f'author{i % 50}/model{i}' if rnd.random() < 0.9 else f'model{i}',
+            'tags': tags,
+            'datasets': [rnd.choice(['glue', 'squad', ''])],
+            'datasets_size': rnd.choice([0, 100, None, 12345]),
+            'co2_eq_emissions': _co2(rnd),
+            'source': rnd.choice([None, 'code carbon', 'mlco2', 'ML CO2 calculator', 'BLOOM', 'Google Cloud', 'AutoTrain']),
+            'training_type': rnd.choice([None, 'fine-tuning', 'pretraining', 'other']),
+            'geographical_location': rnd.choice([None, 'East US', 'East US 2', 'Frankfurt an Main, Germany (500-600 gCO2eq/kWh)']),
+            'hardware_used': rnd.choice([None, 'V100']),
+            'accuracy': _metric(rnd, 'accuracy'),
+            'loss': _metric(rnd, 'loss'),
+            'f1': _metric(rnd, 'f1'),
+            'rouge1': _metric(rnd, 'rouge1'),
+            'rougeL': _metric(rnd, 'rougeL'),
+            'size': rnd.choice([None, 1000, 250000000]),
+            'auto': 'autotrain' in tags,
+            'downloads': rnd.randint(0, 10000),
+            'likes': rnd.randint(0, 100),
+            'library_name': rnd.choice([None, 'transformers', 'timm', ['transformers', 'pytorch']]),
+            'lastModified': f'2024-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}T10:00:00.000Z',
+            'created_at': f'2023-0{rnd.randint(1, 9)}-0{rnd.randint(1, 9)}T12:00:00.000Z',
+            'modelcard_text': _model_card(rnd),
+        })
+    return pd.DataFrame(rows)
@@ -67,14 +67,59 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django.middleware.gzip.GZipMiddleware',
+    'apps.core.middleware.CompressionMiddleware',
 ]
 
+# Responses below this size (in bytes) are sent uncompressed
+COMPRESSION_MIN_SIZE = 1024
+
+# Seconds the configuration snapshot is served by a process before checking its version in the database
+CONFIGURATION_SNAPSHOT_TTL = 5
+
+# Background efficiency measurements of inference endpoints: parallel measurements per process (the
+# emissions tracker measures the whole machine, so parallel measurements would distort each other) and
+# default seconds allowed for the request to the endpoint
+MEASUREMENT_WORKERS = 1
+MEASUREMENT_TIMEOUT = 300
+# Seconds a measurement can wait in the queue of a process that is not this one (e.g. a stopped one)
+# before it is marked as timed out
+MEASUREMENT_QUEUE_TTL = 24 * 3600
+
+# Hugging Face synchronization: concurrent requests per host, seconds and retries of each request, and
+# seconds after which the models left are processed in the next synchronization (None: no limit)
+HF_SYNC_CONCURRENCY_PER_HOST = 16
+HF_SYNC_REQUEST_TIMEOUT = 10
+HF_SYNC_RETRIES = 3
+HF_SYNC_DEADLINE = 3600
+# Models listed and waiting to be processed, over which the listing of the Hub waits
+HF_SYNC_MAX_IN_FLIGHT = 256
+# Cache of the Hugging Face metadata between synchronizations (None: no cache) and its size limit in bytes
+HF_SYNC_CACHE_PATH = BASE_DIR / 'hf_cache.sqlite3'
+HF_SYNC_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Models preprocessed at a time after the extraction (bounds the memory of the preprocessing)
+HF_SYNC_CHUNK_SIZE = 2000
+# Model cards: characters scanned of each one (None: all), processes that scan those of a chunk (None: one per
+# CPU, 1: no processes) and characters of a chunk from which they are used
+HF_SYNC_CARD_MAX_CHARS = 100000
+HF_SYNC_SCAN_WORKERS = None
+HF_SYNC_SCAN_PARALLEL_CHARS = 16000000
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-    ]
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'apps.core.renderers.MessagePackRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'apps.core.parsers.MessagePackParser',
+    ],
 }
 
 ROOT_URLCONF = 'gaissalabel.urls'
@@ -1,5 +1,13 @@
 import axios from "@/controllers/backend"
 
+// Estats de les mesures que ja no canviaran
+const ESTATS_FINALS = ['F', 'C', 'X', 'T']
+const INTERVAL_CONSULTA = 1000
+
+function esperar(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms))
+}
+
 export default {
     async calcularEficienciaInferencia(endpoint, input) {
         const data = {
@@ -10,6 +18,31 @@ export default {
         await axios.post(`/api/gaissalabel/calculadors/inferencia/`, data)
             .then(response => responseCalculador = response)
             .catch(error => responseCalculador = error)
-        return responseCalculador
+        if (responseCalculador.status !== 202) return responseCalculador
+
+        // La mesura s'executa en segon pla: es consulta fins que acaba
+        let mesura = responseCalculador.data
+        while (!ESTATS_FINALS.includes(mesura.estat)) {
+            await esperar(INTERVAL_CONSULTA)
+            const response = await this.getMesura(mesura.id)
+            if (response.status !== 200) return response
+            mesura = response.data
+        }
+        if (mesura.estat !== 'F') return {status: 500, data: mesura}
+        return {status: 201, data: mesura.resultats}
+    },
+    async getMesura(id) {
+        let responseMesura = null
+        await axios.get(`/api/gaissalabel/calculadors/inferencia/${id}/`)
+            .then(response => responseMesura = response)
+            .catch(error => responseMesura = error)
+        return responseMesura
+    },
+    async cancellarMesura(id) {
+        let responseMesura = null
+        await axios.post(`/api/gaissalabel/calculadors/inferencia/${id}/cancellar/`)
+            .then(response => responseMesura = response)
+            .catch(error => responseMesura = error)
+        return responseMesura
     }
-}
\ No newline at end of file
+}